@@ -1,15 +1,17 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.user import User
+from app.services.principal_cache import Principal, principal_cache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 security = HTTPBearer()
 
 
@@ -21,6 +23,11 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True si el hash fue generado con un costo distinto al configurado"""
+    return pwd_context.needs_update(hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -32,27 +39,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciales inválidas",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_user_id(token: str) -> int:
+    """Decodifica el JWT y retorna el id del usuario"""
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
+        subject = payload.get("sub")
+        if subject is None:
+            raise _credentials_exception()
+        # El claim "sub" debe ser string según el estándar JWT
+        return int(subject)
+    except (JWTError, ValueError):
+        raise _credentials_exception()
+
+
+def ensure_active_user(user: Optional[Union[User, Principal]]) -> Union[User, Principal]:
+    """Valida que el usuario autenticado exista y esté activo"""
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     if user.status != "active":
         raise HTTPException(
@@ -63,8 +74,84 @@ def get_current_user(
     return user
 
 
-def get_user_limits(user: User) -> dict:
+def _load_current_user(db: Session, token: str, options: tuple) -> User:
+    user_id = decode_user_id(token)
+    user = ensure_active_user(db.query(User).options(*options).filter(User.id == user_id).first())
+    principal_cache.put(Principal.from_user(user, get_user_limits(user)))
+    return user
+
+
+async def _load_current_user_async(db: AsyncSession, token: str, options: tuple) -> User:
+    user_id = decode_user_id(token)
+    user = ensure_active_user(await db.get(User, user_id, options=options))
+    principal_cache.put(Principal.from_user(user, get_user_limits(user)))
+    return user
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Usuario autenticado leído siempre de la base, sin ledger_balance"""
+    return _load_current_user(db, credentials.credentials, ())
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Versión async de get_current_user"""
+    return await _load_current_user_async(db, credentials.credentials, ())
+
+
+def get_current_user_with_balance(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """get_current_user con ledger_balance cargado (operaciones que dependen del balance)"""
+    return _load_current_user(db, credentials.credentials, (undefer(User.ledger_balance),))
+
+
+async def get_current_user_with_balance_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Versión async de get_current_user_with_balance"""
+    return await _load_current_user_async(db, credentials.credentials, (undefer(User.ledger_balance),))
+
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """Usuario autenticado desde el cache de principals; solo consulta la base ante un miss"""
+    user_id = decode_user_id(credentials.credentials)
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = ensure_active_user(db.query(User).filter(User.id == user_id).first())
+        principal = Principal.from_user(user, get_user_limits(user))
+        principal_cache.put(principal)
+    return ensure_active_user(principal)
+
+
+async def get_current_principal_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Versión async de get_current_principal"""
+    user_id = decode_user_id(credentials.credentials)
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = ensure_active_user(await db.get(User, user_id))
+        principal = Principal.from_user(user, get_user_limits(user))
+        principal_cache.put(principal)
+    return ensure_active_user(principal)
+
+
+def get_user_limits(user: Union[User, Principal]) -> dict:
     """Retorna los límites según el nivel de verificación del usuario"""
+    if isinstance(user, Principal):
+        return user.limits
     if user.verification_level == "premium":
         return settings.limits_premium
     elif user.verification_level == "verified":
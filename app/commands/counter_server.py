@@ -0,0 +1,51 @@
+"""
+Servidor de contadores en memoria compartido por los workers del host: con
+COUNTER_SERVER_SOCKET apuntando al mismo socket, todos los workers aplican las reglas
+de velocidad y el rate limiting sobre los mismos contadores. Levantar antes que los
+workers; si se cae, cada worker sigue contando en proceso hasta que vuelva.
+
+Uso:
+    python -m app.commands.counter_server [--socket PATH]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from app.config import settings
+from app.services.shared_counters import CounterServer
+from app.services.rate_limit import TokenBuckets, serve_rate_limit
+from app.services.velocity import VelocityEngine, serve_velocity
+
+
+def build_server() -> CounterServer:
+    server = CounterServer()
+    server.register("velocity", serve_velocity(
+        VelocityEngine(settings.velocity_rules, settings.velocity_buckets, settings.velocity_max_keys)
+    ))
+    server.register("rate_limit", serve_rate_limit(TokenBuckets(settings.rate_limit_max_keys)))
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor de contadores compartido")
+    parser.add_argument("--socket", default=settings.counter_server_socket, help="Ruta del socket Unix")
+    args = parser.parse_args(argv)
+    if not args.socket:
+        parser.error("indicar --socket o COUNTER_SERVER_SOCKET")
+
+    # Socket de una ejecución anterior
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    print(f"Servidor de contadores en {args.socket}", flush=True)
+    try:
+        asyncio.run(build_server().serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
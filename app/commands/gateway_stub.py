@@ -0,0 +1,134 @@
+"""
+Gateway de pagos de prueba para pruebas de carga sin red externa.
+
+Expone POST /authorize y POST /authorize/batch con el contrato que usa
+HttpGateway. La latencia de cada llamada sigue una log-normal (mediana y
+dispersión configurables) con una fracción de llamadas lentas para generar
+cola, más un costo por ítem en los lotes; --max-concurrent-calls limita las
+llamadas simultáneas como el límite de conexiones de un gateway real. El
+resultado se sortea según las proporciones indicadas y se deduplica por
+Idempotency-Key.
+
+Uso:
+    python -m app.commands.gateway_stub [--port 9100] [--latency-ms 50] [--sigma 0.3]
+        [--slow-rate 0.01] [--slow-ms 1000] [--approve-rate 0.85] [--decline-rate 0.10]
+        [--failure-rate 0.0] [--item-ms 0.5] [--max-concurrent-calls 0]
+
+Con el gateway HTTP activo en la API:
+    PAYMENT_GATEWAY=http GATEWAY_URL=http://127.0.0.1:9100 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import math
+import random
+import sys
+from collections import OrderedDict
+from fastapi import FastAPI, Header
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+MESSAGES = {
+    "approved": "Pago aprobado exitosamente",
+    "declined": "Tarjeta rechazada por fondos insuficientes",
+    "error": "Error de comunicación con el procesador",
+}
+
+
+class AuthorizeRequest(BaseModel):
+    amount: float
+    currency: str
+    card_type: str
+
+
+class AuthorizeBatchRequest(BaseModel):
+    items: list[AuthorizeRequest]
+
+
+def create_stub_app(latency_ms: float = 50.0, sigma: float = 0.3, slow_rate: float = 0.0, slow_ms: float = 1000.0,
+                    approve_rate: float = 0.85, decline_rate: float = 0.10, failure_rate: float = 0.0,
+                    item_ms: float = 0.5, max_concurrent_calls: int = 0, max_keys: int = 100_000) -> FastAPI:
+    app = FastAPI(title="Gateway de prueba")
+    # Respuestas por Idempotency-Key (los hedges y reintentos no cobran dos veces)
+    responses: OrderedDict[str, object] = OrderedDict()
+    slots = asyncio.Semaphore(max_concurrent_calls) if max_concurrent_calls > 0 else None
+    stats = {"calls": 0, "items": 0}
+
+    def latency() -> float:
+        if random.random() < slow_rate:
+            return slow_ms / 1000
+        return latency_ms / 1000 * math.exp(random.gauss(0, sigma))
+
+    def outcome() -> dict:
+        rand = random.random()
+        if rand < approve_rate:
+            status = "approved"
+        elif rand < approve_rate + decline_rate:
+            status = "declined"
+        else:
+            status = "error"
+        return {"status": status, "message": MESSAGES[status]}
+
+    async def call(items: int, idempotency_key: str, build):
+        if slots is not None:
+            await slots.acquire()
+        try:
+            stats["calls"] += 1
+            stats["items"] += items
+            await asyncio.sleep(latency() + item_ms * items / 1000)
+        finally:
+            if slots is not None:
+                slots.release()
+        if random.random() < failure_rate:
+            return JSONResponse({"detail": "Falla simulada"}, status_code=503)
+        if idempotency_key and idempotency_key in responses:
+            return responses[idempotency_key]
+        result = build()
+        if idempotency_key:
+            responses[idempotency_key] = result
+            if len(responses) > max_keys:
+                responses.popitem(last=False)
+        return result
+
+    @app.post("/authorize")
+    async def authorize(request: AuthorizeRequest, idempotency_key: str = Header(None)):
+        return await call(1, idempotency_key, outcome)
+
+    @app.post("/authorize/batch")
+    async def authorize_batch(request: AuthorizeBatchRequest, idempotency_key: str = Header(None)):
+        return await call(len(request.items), idempotency_key, lambda: {"results": [outcome() for _ in request.items]})
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gateway de pagos de prueba")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mediana de latencia")
+    parser.add_argument("--sigma", type=float, default=0.3, help="Dispersión de la log-normal")
+    parser.add_argument("--slow-rate", type=float, default=0.01, help="Fracción de requests lentos")
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--approve-rate", type=float, default=0.85)
+    parser.add_argument("--decline-rate", type=float, default=0.10)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--item-ms", type=float, default=0.5, help="Costo adicional por ítem de un lote")
+    parser.add_argument("--max-concurrent-calls", type=int, default=0, help="Llamadas simultáneas (0 sin límite)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    app = create_stub_app(
+        latency_ms=args.latency_ms, sigma=args.sigma, slow_rate=args.slow_rate, slow_ms=args.slow_ms,
+        approve_rate=args.approve_rate, decline_rate=args.decline_rate, failure_rate=args.failure_rate,
+        item_ms=args.item_ms, max_concurrent_calls=args.max_concurrent_calls
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""
+Mantenimiento de la tabla idempotency_keys.
+
+Uso:
+    python -m app.commands.idempotency purge
+"""
+import argparse
+import sys
+from app.database import new_session
+from app.services.idempotency import purge_expired
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Idempotency keys vencidas")
+    parser.add_argument("action", choices=["purge"])
+    parser.parse_args(argv)
+
+    db = new_session()
+    try:
+        deleted = purge_expired(db)
+        print(f"Keys vencidas eliminadas: {deleted}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
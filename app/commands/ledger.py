@@ -0,0 +1,68 @@
+"""
+Libro mayor (ledger_entries) y snapshots de saldos.
+
+- open: pasa al libro mayor los saldos de users.balance y los deja en 0 (correr al
+  actualizar, antes de levantar los workers: no arrancan con saldos sin abrir; se
+  puede repetir)
+- snapshot: una pasada del snapshotter (el worker la corre cada ledger_snapshot_interval)
+- verify: replay de los asientos contra los snapshots, saldos negativos y saldos sin abrir
+- balance: saldo de una cuenta como último snapshot + cola
+
+Uso:
+    python -m app.commands.ledger open [--batch-size 1000]
+    python -m app.commands.ledger snapshot [--min-entries N]
+    python -m app.commands.ledger verify [--user-id ID]
+    python -m app.commands.ledger balance --user-id ID
+"""
+import argparse
+import json
+import sys
+from app.config import settings
+from app.database import new_session
+from app.models.user import User
+from app.services.ledger import USER, LedgerSnapshotter, account_balance, open_accounts, verify_ledger
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Libro mayor y snapshots de saldos")
+    parser.add_argument("action", choices=["open", "snapshot", "verify", "balance"])
+    parser.add_argument("--user-id", type=int, default=None, help="Limitar a un usuario")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Usuarios por transacción (open)")
+    parser.add_argument("--min-entries", type=int, default=settings.ledger_snapshot_min_entries,
+                        help="Asientos desde el último snapshot para escribir otro")
+    args = parser.parse_args(argv)
+
+    if args.action == "snapshot":
+        written = LedgerSnapshotter(new_session, 0, args.min_entries).run_once()
+        print(f"Snapshots escritos: {written}")
+        return 0
+
+    db = new_session()
+    try:
+        if args.action == "open":
+            print(f"Cuentas abiertas: {open_accounts(db, args.batch_size)}")
+            return 0
+
+        if args.action == "balance":
+            if args.user_id is None:
+                parser.error("balance requiere --user-id")
+            current = account_balance(db, USER, args.user_id)
+            user = db.get(User, args.user_id)
+            current["users_balance"] = user.balance if user else None
+            print(json.dumps(current))
+            return 0
+
+        mismatches = verify_ledger(db, args.user_id)
+        for mismatch in mismatches:
+            print(json.dumps(mismatch))
+        if mismatches:
+            print(f"Inconsistencias encontradas: {len(mismatches)}", file=sys.stderr)
+            return 1
+        print("Libro mayor consistente")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Crea o verifica el esquema declarado en los modelos (tablas e índices).
+La app no crea tablas al arrancar: correr este comando en cada deploy, antes
+de levantar los workers. Con --check solo informa; sale con código 1 si falta algo.
+
+Uso:
+    python -m app.commands.migrate [--check]
+"""
+import argparse
+import sys
+from app.database import get_engine
+from app.services.schema import schema_status, migrate
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Crea o verifica el esquema de la base")
+    parser.add_argument("--check", action="store_true", help="Solo verificar, sin crear nada")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    missing = schema_status(engine) if args.check else migrate(engine)
+    for table in missing["missing_tables"]:
+        print(f"tabla {table}: {'FALTA' if args.check else 'creada'}")
+    for index in missing["missing_indexes"]:
+        print(f"índice {index}: {'FALTA' if args.check else 'creado'}")
+    # Cambiar el tipo requiere copiar filas: lo hace el comando de migración de montos
+    for money_column in missing["legacy_money_columns"]:
+        print(f"columna {money_column}: FLOAT, ejecutar python -m app.commands.money_migration")
+    if not any(missing.values()):
+        print("Esquema al día")
+        return 0
+    return 1 if args.check or missing["legacy_money_columns"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Migración en línea de montos FLOAT a enteros en unidades menores (BIGINT).
+
+1. backfill: con la versión anterior de la app funcionando, agrega una columna
+   <columna>_minor y la llena en lotes cortos por id (se puede repetir).
+2. finalize: con las escrituras detenidas, copia lo que cambió desde el backfill
+   y reemplaza las columnas FLOAT. Después se levanta la versión nueva.
+
+Uso:
+    python -m app.commands.money_migration status
+    python -m app.commands.money_migration backfill [--batch-size 1000] [--pause 0.0]
+    python -m app.commands.money_migration finalize [--batch-size 1000]
+"""
+import argparse
+import sys
+import time
+from app.database import get_engine
+from app.services.money_migration import (
+    legacy_money_columns, add_shadow_columns, backfill_column, pending_rows, finalize
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Montos FLOAT a enteros en unidades menores")
+    parser.add_argument("action", choices=["status", "backfill", "finalize"])
+    parser.add_argument("--batch-size", type=int, default=1000, help="Filas por transacción")
+    parser.add_argument("--pause", type=float, default=0.0, help="Segundos entre lotes (backfill)")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    legacy = legacy_money_columns(engine)
+    if not legacy:
+        print("Montos ya en unidades menores")
+        return 0
+
+    if args.action == "status":
+        for qualified in legacy:
+            pending = pending_rows(engine, qualified)
+            print(f"{qualified}: FLOAT, " + ("sin backfill" if pending is None else f"{pending} filas sin copiar"))
+        return 1
+
+    if args.action == "backfill":
+        for added in add_shadow_columns(engine):
+            print(f"columna {added}: creada")
+        for qualified in legacy:
+            started = time.perf_counter()
+            written = backfill_column(engine, qualified, args.batch_size, args.pause)
+            print(f"{qualified}: {written} filas copiadas en {time.perf_counter() - started:.1f} s")
+        return 0
+
+    for qualified, copied in finalize(engine, args.batch_size).items():
+        print(f"{qualified}: {copied} filas en la última pasada, columna reemplazada")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+Mantenimiento de los contadores de gasto (user_spend_windows).
+
+Uso:
+    python -m app.commands.spend_counters rebuild [--user-id ID]
+    python -m app.commands.spend_counters check [--user-id ID]
+"""
+import argparse
+import json
+import sys
+from app.database import new_session
+from app.services.spend_counters import rebuild_spend_counters, check_spend_counters
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Contadores de gasto diario/mensual")
+    parser.add_argument("action", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, default=None, help="Limitar a un usuario")
+    args = parser.parse_args(argv)
+
+    db = new_session()
+    try:
+        if args.action == "rebuild":
+            written = rebuild_spend_counters(db, args.user_id)
+            print(f"Contadores reconstruidos: {written} filas")
+            return 0
+
+        mismatches = check_spend_counters(db, args.user_id)
+        for mismatch in mismatches:
+            print(json.dumps(mismatch))
+        if mismatches:
+            print(f"Inconsistencias encontradas: {len(mismatches)}", file=sys.stderr)
+            return 1
+        print("Contadores consistentes")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
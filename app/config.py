@@ -1,8 +1,146 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     database_url: str
+    # Modo async: routers async def sobre AsyncEngine/AsyncSession
+    async_mode: bool = False
+    # Por defecto se deriva de database_url (aiosqlite, asyncpg, aiomysql)
+    async_database_url: Optional[str] = None
+    # Cache en proceso del usuario autenticado (0 desactiva)
+    principal_cache_size: int = 10000
+    principal_cache_ttl: float = 30.0
+    # Hashing de contraseñas en pool de procesos (0 workers = uno por CPU). Los routers
+    # síncronos ocupan un thread del threadpool por hash pendiente: 0 pendientes = un
+    # cuarto del threadpool de anyio
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 0
+    password_hash_max_pending: int = 0
+    password_hash_retry_after: int = 2
+    # Arrancar los procesos de bcrypt al iniciar el worker en lugar de en el primer login
+    password_hash_warmup: bool = False
+    # Paginación por cursor de historiales
+    default_page_size: int = 100
+    max_page_size: int = 500
+    # Máximo de ítems por request en los endpoints batch
+    max_payment_batch_size: int = 500
+    max_transfer_batch_size: int = 5000
+    # Reintentos ante deadlock / serialization failure al mover saldos
+    balance_retry_attempts: int = 5
+    balance_retry_base_delay: float = 0.01
+    # Idempotency-Key: LRU en proceso + tabla idempotency_keys (segundos)
+    idempotency_cache_size: int = 10000
+    idempotency_ttl: float = 86400.0
+    idempotency_lock_timeout: float = 60.0
+    idempotency_wait_timeout: float = 10.0
+    idempotency_poll_interval: float = 0.05
+    # Gateway de pagos: "simulated" (en proceso) o "http" (cliente async contra gateway_url)
+    payment_gateway: str = "simulated"
+    gateway_url: str = "http://127.0.0.1:9100"
+    gateway_timeout: float = 2.0
+    gateway_connect_timeout: float = 0.5
+    # Llamadas en vuelo = conexiones, repartidas en varios pools
+    gateway_max_connections: int = 100
+    gateway_pool_shards: int = 10
+    gateway_max_attempts: int = 2
+    # Segundos sin respuesta antes de lanzar una llamada duplicada (0 desactiva)
+    gateway_hedge_delay: float = 0.25
+    gateway_breaker_failures: int = 5
+    gateway_breaker_reset: float = 30.0
+    # Micro-batching de autorizaciones: ventana en segundos (0 desactiva) y tamaño máximo
+    gateway_batch_window: float = 0.0
+    gateway_max_batch_size: int = 50
+    # Group commit de pagos y transferencias: un writer confirma juntas las escrituras
+    # de requests concurrentes cada group_commit_window segundos
+    group_commit: bool = False
+    group_commit_window: float = 0.002
+    group_commit_max_size: int = 200
+    # Perfil de base de datos: "default" o "production" (SQLite en WAL con pragmas afinados)
+    database_profile: str = "default"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456
+    # Negativo: KiB de cache de páginas por conexión
+    sqlite_cache_size: int = -65536
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_temp_store: str = "MEMORY"
+    # Mantenimiento periódico en segundos (0 desactiva): checkpoint del WAL y PRAGMA optimize
+    sqlite_checkpoint_interval: float = 60.0
+    sqlite_optimize_interval: float = 3600.0
+    # Pool de conexiones de PostgreSQL / MySQL (recycle -1 desactiva)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Réplica de lectura opcional (la URL async por defecto se deriva de la síncrona)
+    read_database_url: Optional[str] = None
+    async_read_database_url: Optional[str] = None
+    # Segundos que las lecturas de un usuario van al primario después de escribir
+    read_your_writes_window: float = 5.0
+    # Segundos sin usar la réplica después de una falla de conexión
+    replica_retry_interval: float = 10.0
+    # Instrumentación por request y GET /metrics (formato Prometheus)
+    metrics_enabled: bool = True
+    # Segundos a partir de los cuales se loguea el request con sus sentencias SQL (0 desactiva)
+    slow_request_threshold: float = 0.0
+    slow_request_max_statements: int = 100
+    # Listados serializados directo a JSON (orjson si está instalado) sin revalidar cada fila
+    fast_serialization: bool = False
+    # Arranque de cada worker: verificar el esquema (sin tablas no arranca) y precalentar
+    # los pools (conexiones por engine, hasta pool_size) y la cache de sentencias compiladas
+    startup_schema_check: bool = True
+    startup_warmup: bool = True
+    db_pool_warmup: int = 2
+    # Dinero en unidades menores (BIGINT): decimales por moneda, 2 si no figura. Saldos,
+    # límites y contadores de gasto se llevan en la moneda de la cuenta
+    account_currency: str = "USD"
+    default_currency_exponent: int = 2
+    currency_exponents: dict = {
+        "JPY": 0, "KRW": 0, "CLP": 0, "PYG": 0, "VND": 0, "ISK": 0,
+        "BHD": 3, "KWD": 3, "OMR": 3, "JOD": 3, "TND": 3
+    }
+    # Libro mayor (ledger_entries): snapshot de una cuenta cuando acumula
+    # ledger_snapshot_min_entries asientos, revisado cada ledger_snapshot_interval segundos (0 desactiva)
+    ledger_snapshot_interval: float = 60.0
+    ledger_snapshot_min_entries: int = 100
+    # Reglas de velocidad: máximo `limit` operaciones por sujeto (user, card, receiver) en
+    # `window` segundos, con ventanas deslizantes de velocity_buckets buckets en memoria.
+    # operation: payment, transfer, any (ambas) o payment_batch / transfer_batch: cada
+    # lote cuenta una vez, sin importar cuántos ítems tenga
+    velocity_enabled: bool = True
+    velocity_rules: dict[str, dict] = {
+        "card_burst": {"scope": "card", "operation": "payment", "limit": 20, "window": 60},
+        "user_payments": {"scope": "user", "operation": "payment", "limit": 120, "window": 60},
+        "user_transfers": {"scope": "user", "operation": "transfer", "limit": 60, "window": 60},
+        "receiver_fan_in": {"scope": "receiver", "operation": "transfer", "limit": 5000, "window": 60},
+        "user_payment_batches": {"scope": "user", "operation": "payment_batch", "limit": 10, "window": 60},
+        "user_transfer_batches": {"scope": "user", "operation": "transfer_batch", "limit": 10, "window": 60},
+    }
+    velocity_buckets: int = 12
+    velocity_max_keys: int = 200_000
+    # Servidor de contadores compartido por los workers del host (app.commands.counter_server).
+    # Vacío: cada worker cuenta en memoria propia. Si no responde, se cuenta en proceso
+    # durante counter_server_retry_interval segundos
+    counter_server_socket: str = ""
+    counter_server_timeout: float = 0.05
+    counter_server_retry_interval: float = 10.0
+    # Rate limiting con token buckets por usuario autenticado: uno por ruta ("MÉTODO /ruta",
+    # rate_limit_routes o rate_limit_default) y uno por usuario para todas las rutas.
+    # capacity: ráfaga máxima; rate: tokens por segundo. Requests sin token no se limitan
+    rate_limit_enabled: bool = True
+    rate_limit_default: dict = {"capacity": 60, "rate": 20.0}
+    rate_limit_user: dict = {"capacity": 200, "rate": 50.0}
+    rate_limit_routes: dict[str, dict] = {
+        # Cuatro agregados por llamada
+        "GET /users/me/limits": {"capacity": 10, "rate": 2.0},
+        "POST /payments/": {"capacity": 30, "rate": 10.0},
+        "POST /payments/batch": {"capacity": 5, "rate": 1.0},
+        "POST /transfers/batch": {"capacity": 5, "rate": 1.0},
+        "GET /payments/export": {"capacity": 2, "rate": 0.1},
+        "GET /transfers/export": {"capacity": 2, "rate": 0.1},
+    }
+    rate_limit_max_keys: int = 200_000
     secret_key: str = "dev-secret-key"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
@@ -1,24 +1,355 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
+import threading
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.config import settings
+from app.services.read_routing import read_router, token_subject
+from app.services.instrumentation import instrument_engine
 
-# Detectar si es SQLite para configuración especial
-if settings.database_url.startswith("sqlite"):
-    engine = create_engine(
-        settings.database_url,
-        connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(settings.database_url)
+# Driver async equivalente a cada backend síncrono
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+
+def is_sqlite(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+
+def sqlite_pragmas() -> list[str]:
+    """Pragmas por conexión del perfil production: WAL para que las lecturas no esperen a las escrituras"""
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size={settings.sqlite_cache_size}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA temp_store={settings.sqlite_temp_store}",
+    ]
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def pool_options(database_url: str) -> dict:
+    """Dimensionamiento explícito del pool para PostgreSQL / MySQL (SQLite usa el pool por defecto)"""
+    if is_sqlite(database_url):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def configure_engine(sync_engine) -> None:
+    """Aplica el perfil de base de datos a cada conexión nueva del engine"""
+    if settings.database_profile == "production" and sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+
+
+def _sqlite_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def _replica_error(context):
+    # Conexión perdida con la réplica: las lecturas vuelven al primario por un tiempo
+    if context.is_disconnect:
+        read_router.mark_replica_down()
+
+
+def configure_read_engine(sync_engine) -> None:
+    """La réplica solo lee (query_only en SQLite; en PostgreSQL vía postgresql_readonly)"""
+    configure_engine(sync_engine)
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _sqlite_query_only)
+    event.listen(sync_engine, "handle_error", _replica_error)
+
+
+def read_engine_options(database_url: str) -> dict:
+    options = pool_options(database_url)
+    if make_url(database_url).get_backend_name() == "postgresql":
+        options["execution_options"] = {"postgresql_readonly": True}
+    return options
+
+
+def _create_sync_engine(database_url: str, options: dict):
+    if is_sqlite(database_url):
+        return create_engine(database_url, connect_args={"check_same_thread": False})
+    return create_engine(database_url, **options)
+
+
+class Database:
+    """
+    Engines y sessionmakers de un proceso: primario, réplica de lectura opcional y, en
+    modo async, sus equivalentes async. Se crean con create_database en el proceso que
+    los usa (el worker, después del fork), nunca al importar.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.engine = _create_sync_engine(settings.database_url, pool_options(settings.database_url))
+        configure_engine(self.engine)
+        instrument_engine(self.engine, "primary")
+        self.sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        # Réplica de lectura opcional: sin read_database_url las lecturas usan el primario
+        self.read_engine = None
+        self.read_sessions = None
+        if settings.read_database_url:
+            self.read_engine = _create_sync_engine(
+                settings.read_database_url, read_engine_options(settings.read_database_url)
+            )
+            configure_read_engine(self.read_engine)
+            instrument_engine(self.read_engine, "replica")
+            self.read_sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.read_engine)
+
+        # El engine async solo se crea en modo async: el driver (aiosqlite, asyncpg...) es opcional
+        self.async_engine = None
+        self.async_sessions = None
+        self.async_read_engine = None
+        self.async_read_sessions = None
+        if settings.async_mode:
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+            async_database_url = get_async_database_url(settings.database_url, settings.async_database_url)
+            self.async_engine = create_async_engine(async_database_url, **pool_options(async_database_url))
+            configure_engine(self.async_engine.sync_engine)
+            instrument_engine(self.async_engine.sync_engine, "primary_async")
+            # expire_on_commit=False: los objetos siguen legibles tras el commit sin I/O implícito
+            self.async_sessions = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+
+            if settings.read_database_url:
+                async_read_database_url = get_async_database_url(
+                    settings.read_database_url, settings.async_read_database_url
+                )
+                self.async_read_engine = create_async_engine(
+                    async_read_database_url, **read_engine_options(async_read_database_url)
+                )
+                configure_read_engine(self.async_read_engine.sync_engine)
+                instrument_engine(self.async_read_engine.sync_engine, "replica_async")
+                self.async_read_sessions = async_sessionmaker(
+                    self.async_read_engine, autoflush=False, expire_on_commit=False
+                )
+
+    def sync_engines(self) -> list:
+        """Engines del proceso (de los async, su sync_engine)"""
+        candidates = [self.engine, self.read_engine, self.async_engine, self.async_read_engine]
+        return [getattr(e, "sync_engine", e) for e in candidates if e is not None]
+
+    def abandon(self) -> None:
+        """
+        Suelta los pools heredados de otro proceso sin cerrar sus conexiones: siguen
+        siendo del proceso padre, que las usa (close=False no envía nada por el socket)
+        """
+        for sync_engine in self.sync_engines():
+            sync_engine.dispose(close=False)
+
+    async def dispose(self) -> None:
+        """Cierra las conexiones de todos los pools (al apagar el worker)"""
+        for sync_engine in (self.engine, self.read_engine):
+            if sync_engine is not None:
+                sync_engine.dispose()
+        for current in (self.async_engine, self.async_read_engine):
+            if current is not None:
+                await current.dispose()
+
+
+def create_database() -> Database:
+    return Database()
+
+
+_database: Optional[Database] = None
+_database_lock = threading.Lock()
+
+
+def get_database() -> Database:
+    """
+    Engines del proceso actual. Se crean en el lifespan del worker (init_database) o en
+    el primer uso (comandos, benchmarks, tests); un proceso forkeado que hereda los del
+    padre los descarta y crea los propios.
+    """
+    global _database
+    database = _database
+    if database is not None and database.pid == os.getpid():
+        return database
+    with _database_lock:
+        if _database is not None and _database.pid != os.getpid():
+            _database.abandon()
+            _database = None
+        if _database is None:
+            _database = create_database()
+        return _database
+
+
+def init_database() -> Database:
+    """Crea los engines del worker al arrancar (lifespan de create_app)"""
+    return get_database()
+
+
+async def close_database() -> None:
+    """Cierra los pools del proceso; un uso posterior crea engines nuevos"""
+    global _database
+    with _database_lock:
+        database, _database = _database, None
+    if database is not None and database.pid == os.getpid():
+        await database.dispose()
+
+
+def get_engine():
+    """Engine del primario del proceso actual"""
+    return get_database().engine
+
+
+def new_session() -> Session:
+    """Sesión nueva contra el primario; el llamador la cierra"""
+    return get_database().sessions()
+
+
+def new_async_session():
+    """Sesión async nueva contra el primario (solo en modo async)"""
+    return get_database().async_sessions()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
 def get_db():
-    db = SessionLocal()
+    db = new_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def open_read_session(authorization: Optional[str] = None):
+    """
+    Sesión de lectura para el autor del header Authorization: réplica si está configurada
+    y disponible, primario si escribió hace poco (read-your-writes) o la réplica falla.
+    El llamador la cierra.
+    """
+    database = get_database()
+    if database.read_sessions is None:
+        return database.sessions()
+    if read_router.is_pinned(token_subject(authorization)):
+        read_router.record("pinned")
+        return database.sessions()
+    if read_router.replica_available():
+        db = database.read_sessions()
+        try:
+            # Tomar la conexión acá: si la réplica no responde se usa el primario
+            # antes de entrar al endpoint
+            db.connection()
+            read_router.record("replica")
+            return db
+        except DBAPIError:
+            db.close()
+            read_router.mark_replica_down()
+    read_router.record("fallback")
+    return database.sessions()
+
+
+def get_read_db(request: Request):
+    """Sesión para endpoints de solo lectura (ver open_read_session)"""
+    db = open_read_session(request.headers.get("authorization"))
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_async_database_url(database_url: str, async_database_url: Optional[str] = None) -> str:
+    """Retorna la URL async configurada o la deriva de la URL síncrona"""
+    if async_database_url:
+        return async_database_url
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver async para {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+async def get_async_db():
+    async with new_async_session() as db:
+        yield db
+
+
+async def open_async_read_session(authorization: Optional[str] = None):
+    """Versión async de open_read_session"""
+    database = get_database()
+    if database.async_read_sessions is None:
+        return database.async_sessions()
+    if read_router.is_pinned(token_subject(authorization)):
+        read_router.record("pinned")
+        return database.async_sessions()
+    if read_router.replica_available():
+        db = database.async_read_sessions()
+        try:
+            await db.connection()
+            read_router.record("replica")
+            return db
+        except DBAPIError:
+            await db.close()
+            read_router.mark_replica_down()
+    read_router.record("fallback")
+    return database.async_sessions()
+
+
+async def get_async_read_db(request: Request):
+    """Versión async de get_read_db"""
+    db = await open_async_read_session(request.headers.get("authorization"))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def _warm_up_count(sync_engine, connections: int) -> int:
+    pool = sync_engine.pool
+    return min(connections, pool.size()) if hasattr(pool, "size") else min(connections, 1)
+
+
+def warm_up_pools(connections: int) -> int:
+    """Abre hasta `connections` conexiones por engine síncrono (sin superar pool_size) y las deja en el pool"""
+    database = get_database()
+    opened = 0
+    for sync_engine in (database.engine, database.read_engine):
+        if sync_engine is None:
+            continue
+        conns = [sync_engine.connect() for _ in range(_warm_up_count(sync_engine, connections))]
+        for conn in conns:
+            conn.close()
+        opened += len(conns)
+    return opened
+
+
+async def warm_up_async_pools(connections: int) -> int:
+    """Versión async de warm_up_pools para los engines async"""
+    database = get_database()
+    opened = 0
+    for current in (database.async_engine, database.async_read_engine):
+        if current is None:
+            continue
+        conns = [await current.connect() for _ in range(_warm_up_count(current.sync_engine, connections))]
+        for conn in conns:
+            await conn.close()
+        opened += len(conns)
+    return opened
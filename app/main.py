@@ -1,27 +1,91 @@
-from fastapi import FastAPI
-from app.database import engine, Base
-from app.models import User, Card, Payment, Transfer
-from app.routers import users, cards, payments, transfers
-
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.engine import make_url
 from app.config import settings
-print("DATABASE_URL:", settings.database_url)
+from app.database import init_database
+from app.services.db_maintenance import db_maintenance
+from app.services.ledger import ledger_snapshotter
+from app.services.read_routing import ReadYourWritesMiddleware
+from app.services.instrumentation import MetricsMiddleware
+from app.services.metrics import registry
+from app.services.rate_limit import RateLimitHeadersMiddleware, rate_limit
+from app.services.startup import startup, shutdown
 
-# Crear las tablas
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title="Payments API",
-    description="API de simulación de pagos con tarjeta de crédito y transferencias",
-    version="1.0.0"
-)
 
-# Registrar routers
-app.include_router(users.router)
-app.include_router(cards.router)
-app.include_router(payments.router)
-app.include_router(transfers.router)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Base de datos: %s", make_url(settings.database_url).render_as_string(hide_password=True))
+    # Engines y pools propios del worker, creados acá y no al importar
+    app.state.database = init_database()
+    # Verificación del esquema y precalentamiento de pools y cache de sentencias
+    await startup()
+    # Checkpoint del WAL y PRAGMA optimize periódicos (perfil production de SQLite)
+    db_maintenance.start(app.state.database.engine)
+    # Snapshots incrementales de saldos del libro mayor
+    ledger_snapshotter.start()
+    yield
+    ledger_snapshotter.stop()
+    db_maintenance.stop()
+    await shutdown()
 
 
-@app.get("/", tags=["health"])
 def health_check():
-    return {"status": "ok", "message": "Payments API funcionando"}
\ No newline at end of file
+    return {"status": "ok", "message": "Payments API funcionando"}
+
+
+async def metrics():
+    # async: los gauges del threadpool se leen desde el event loop
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def create_app() -> FastAPI:
+    """
+    Arma la aplicación sin crear engines, abrir conexiones ni crear tablas: los engines
+    se crean en el lifespan de cada worker, después del fork (init_database). El esquema se crea con python -m app.commands.migrate.
+
+    Uso:
+        uvicorn --factory app.main:create_app
+    """
+    # Routers async (AsyncSession) o síncronos (threadpool) según configuración
+    if settings.async_mode:
+        from app.routers.aio import users, cards, payments, transfers
+    else:
+        from app.routers import users, cards, payments, transfers
+
+    app = FastAPI(
+        title="Payments API",
+        description="API de simulación de pagos con tarjeta de crédito y transferencias",
+        version="1.0.0",
+        lifespan=lifespan,
+        # Token buckets por usuario y ruta, antes de resolver las dependencias de cada ruta
+        dependencies=[Depends(rate_limit)]
+    )
+
+    # Headers RateLimit-* sobre la respuesta final (streaming, replays idempotentes incluidos)
+    app.add_middleware(RateLimitHeadersMiddleware)
+
+    # Con réplica de lectura: las lecturas del autor de una escritura van al primario por un tiempo
+    if settings.read_database_url:
+        app.add_middleware(ReadYourWritesMiddleware)
+
+    # Métricas por request (duración por ruta, sentencias SQL, tiempo en la base)
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+
+    # Registrar routers
+    app.include_router(users.router)
+    app.include_router(cards.router)
+    app.include_router(payments.router)
+    app.include_router(transfers.router)
+
+    app.add_api_route("/", health_check, methods=["GET"], tags=["health"])
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+    return app
+
+
+# Para `uvicorn app.main:app`: construirla no toca la base
+app = create_app()
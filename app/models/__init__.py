@@ -2,3 +2,6 @@ from app.models.user import User
 from app.models.card import Card
 from app.models.payment import Payment
 from app.models.transfer import Transfer
+from app.models.spend_window import UserSpendWindow
+from app.models.idempotency_key import IdempotencyKey
+from app.models.ledger import LedgerEntry, LedgerSnapshot
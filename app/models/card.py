@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -18,4 +18,9 @@ class Card(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="cards")
-    payments = relationship("Payment", back_populates="card")
\ No newline at end of file
+    payments = relationship("Payment", back_populates="card")
+
+    __table_args__ = (
+        # Conteo de tarjetas activas (validate_card_limit)
+        Index("ix_cards_user_status", "user_id", "status"),
+    )
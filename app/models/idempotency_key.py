@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, UniqueConstraint, Index
+from datetime import datetime
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Respuesta almacenada de un POST con Idempotency-Key, por usuario y endpoint"""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    scope = Column(String(50), nullable=False)  # payments, transfers
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # in_progress: vence el bloqueo del request original; completed: vence la respuesta
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "scope", "key", name="uq_idempotency_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -0,0 +1,82 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, UniqueConstraint, Index, select, func
+from datetime import datetime
+from app.database import Base
+
+# BIGINT en PostgreSQL y MySQL; en SQLite solo INTEGER PRIMARY KEY es autoincremental
+LedgerId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class LedgerEntry(Base):
+    """
+    Asiento del libro mayor (solo inserciones). Cada movimiento (`journal`) escribe una
+    pata por cuenta y sus montos suman 0: positivo acredita la cuenta, negativo la debita.
+    """
+    __tablename__ = "ledger_entries"
+
+    id = Column(LedgerId, primary_key=True)
+    # deposit:<uuid>, transfer:<id>, payment:<id>, opening:<user_id>
+    journal = Column(String(48), nullable=False)
+    account_type = Column(String(10), nullable=False)  # user, card, funding, gateway, opening
+    account_id = Column(Integer, nullable=False)  # 0 en las cuentas del sistema
+    # Unidades menores de la moneda de la cuenta
+    amount = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Una pata por cuenta y movimiento: un movimiento no se puede asentar dos veces
+        UniqueConstraint("journal", "account_type", "account_id", name="uq_ledger_entry"),
+        # Saldo desde el último snapshot (cola de la cuenta) y replay por cuenta
+        Index("ix_ledger_entries_account", "account_type", "account_id", "id"),
+    )
+
+
+class LedgerSnapshot(Base):
+    """Saldo de una cuenta de usuario hasta el asiento last_entry_id inclusive"""
+    __tablename__ = "ledger_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_type = Column(String(10), nullable=False)
+    account_id = Column(Integer, nullable=False)
+    last_entry_id = Column(LedgerId, nullable=False)
+    balance = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # También resuelve el último snapshot de la cuenta (max last_entry_id)
+        UniqueConstraint("account_type", "account_id", "last_entry_id", name="uq_ledger_snapshot"),
+    )
+
+
+def balance_expression(account_type: str, account_id):
+    """
+    Saldo de la cuenta como expresión SQL, la misma cuenta que account_balance: último
+    snapshot más la cola de asientos posteriores. Con una columna como account_id queda
+    correlacionada (User.ledger_balance).
+    """
+    last_entry_id = (
+        select(func.coalesce(func.max(LedgerSnapshot.last_entry_id), 0))
+        .where(LedgerSnapshot.account_type == account_type, LedgerSnapshot.account_id == account_id)
+        .correlate_except(LedgerSnapshot)
+        .scalar_subquery()
+    )
+    snapshot = (
+        select(func.coalesce(func.max(LedgerSnapshot.balance), 0))
+        .where(
+            LedgerSnapshot.account_type == account_type,
+            LedgerSnapshot.account_id == account_id,
+            LedgerSnapshot.last_entry_id == last_entry_id
+        )
+        .correlate_except(LedgerSnapshot)
+        .scalar_subquery()
+    )
+    tail = (
+        select(func.coalesce(func.sum(LedgerEntry.amount), 0))
+        .where(
+            LedgerEntry.account_type == account_type,
+            LedgerEntry.account_id == account_id,
+            LedgerEntry.id > last_entry_id
+        )
+        .correlate_except(LedgerEntry)
+        .scalar_subquery()
+    )
+    return snapshot + tail
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -10,11 +10,19 @@ class Payment(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     card_id = Column(Integer, ForeignKey("cards.id"), nullable=False)
-    amount = Column(Float, nullable=False)
+    # Unidades menores de `currency` (ver app/services/money.py)
+    amount = Column(BigInteger, nullable=False)
     currency = Column(String, default="USD")
     status = Column(String, default="pending")  # pending, approved, declined, refunded
     description = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="payments")
-    card = relationship("Card", back_populates="payments")
\ No newline at end of file
+    card = relationship("Card", back_populates="payments")
+
+    __table_args__ = (
+        # Límites diarios/mensuales y listado por usuario y estado
+        Index("ix_payments_user_status_created", "user_id", "status", "created_at"),
+        # Historial paginado por (created_at, id)
+        Index("ix_payments_user_created", "user_id", "created_at", "id"),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, Date, DateTime, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+
+class UserSpendWindow(Base):
+    """Acumulado de gasto (pagos aprobados + transferencias completadas) por usuario y período"""
+    __tablename__ = "user_spend_windows"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    period = Column(String(5), nullable=False)  # day, month
+    period_start = Column(Date, nullable=False)
+    # Unidades menores de la moneda de la cuenta
+    amount = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "period", "period_start", name="uq_spend_window"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, CheckConstraint
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -10,7 +10,8 @@ class Transfer(Base):
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    amount = Column(Float, nullable=False)
+    # Unidades menores de `currency` (ver app/services/money.py)
+    amount = Column(BigInteger, nullable=False)
     currency = Column(String(3), default="USD")
     status = Column(String(20), default="pending")
     description = Column(String(255))
@@ -23,4 +24,9 @@ class Transfer(Base):
     __table_args__ = (
         CheckConstraint('sender_id != receiver_id', name='chk_different_users'),
         CheckConstraint('amount > 0', name='chk_positive_amount'),
-    )
\ No newline at end of file
+        # Límites del emisor y listados de enviadas/recibidas
+        Index("ix_transfers_sender_status_created", "sender_id", "status", "created_at"),
+        Index("ix_transfers_receiver_created", "receiver_id", "created_at"),
+        # Historial de enviadas paginado por (created_at, id)
+        Index("ix_transfers_sender_created", "sender_id", "created_at", "id"),
+    )
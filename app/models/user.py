@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from sqlalchemy.orm import relationship, column_property
 from datetime import datetime
 from app.database import Base
+from app.models.ledger import balance_expression
 
 
 class User(Base):
@@ -11,10 +12,22 @@ class User(Base):
     email = Column(String(255), unique=True, index=True, nullable=False)
     name = Column(String(255), nullable=False)
     password_hash = Column(String(255), nullable=False)
-    balance = Column(Float, default=0.0)
+    # Saldo anterior al libro mayor, en unidades menores de la moneda de la cuenta
+    # (settings.account_currency). Los movimientos no lo actualizan: python -m
+    # app.commands.ledger open lo asienta como apertura y lo deja en 0
+    balance = Column(BigInteger, default=0)
+    # Saldo disponible: último snapshot más la cola del libro mayor (ver account_balance).
+    # Diferido: solo lo cargan las lecturas que lo piden con undefer(User.ledger_balance),
+    # no la autenticación ni el login
+    ledger_balance = column_property(balance_expression("user", id), deferred=True)
     status = Column(String(20), default="active")  # active, blocked, suspended
     verification_level = Column(String(20), default="basic")  # basic, verified, premium
     created_at = Column(DateTime, default=datetime.utcnow)
 
     cards = relationship("Card", back_populates="user")
-    payments = relationship("Payment", back_populates="user")
\ No newline at end of file
+    payments = relationship("Payment", back_populates="user")
+
+
+def user_columns() -> list[str]:
+    """Atributos columna de User, ledger_balance incluido: Session.refresh sin nombres no carga los diferidos"""
+    return User.__mapper__.column_attrs.keys()
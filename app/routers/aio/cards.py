@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, get_async_read_db
+from app.models.card import Card
+from app.services.principal_cache import Principal
+from app.schemas.card import CardCreate, CardResponse, CardStatusUpdate
+from app.auth import get_current_principal_async
+from app.routers.cards import mask_card_number
+from app.services.validators import validate_card_limit_async
+from app.services.serialization import CARD_COLUMNS, list_response
+
+router = APIRouter(prefix="/cards", tags=["cards"])
+
+
+async def _get_own_card(card_id: int, user: Principal, db: AsyncSession) -> Card:
+    result = await db.execute(select(Card).where(Card.id == card_id, Card.user_id == user.id))
+    card = result.scalar_one_or_none()
+    if not card:
+        raise HTTPException(status_code=404, detail="Tarjeta no encontrada")
+    return card
+
+
+@router.post("/", response_model=CardResponse, status_code=201)
+async def add_card(card: CardCreate, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_principal_async)):
+    # Validar límite de tarjetas
+    await validate_card_limit_async(current_user, db)
+    
+    db_card = Card(
+        user_id=current_user.id,
+        card_number_masked=mask_card_number(card.card_number),
+        card_type=card.card_type.lower(),
+        expiration_month=card.expiration_month,
+        expiration_year=card.expiration_year,
+        holder_name=card.holder_name
+    )
+    db.add(db_card)
+    await db.commit()
+    await db.refresh(db_card)
+    return db_card
+
+
+@router.get("/", response_model=list[CardResponse])
+async def list_my_cards(db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
+    result = await db.execute(select(*CARD_COLUMNS).where(Card.user_id == current_user.id))
+    return list_response(result.all())
+
+
+@router.get("/{card_id}", response_model=CardResponse)
+async def get_card(card_id: int, db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
+    return await _get_own_card(card_id, current_user, db)
+
+
+@router.patch("/{card_id}/status", response_model=CardResponse)
+async def update_card_status(
+    card_id: int,
+    data: CardStatusUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    card = await _get_own_card(card_id, current_user, db)
+    
+    if card.status == "expired":
+        raise HTTPException(status_code=400, detail="No se puede cambiar el estado de una tarjeta expirada")
+    
+    card.status = data.status
+    await db.commit()
+    await db.refresh(card)
+    return card
+
+
+@router.delete("/{card_id}", status_code=204)
+async def delete_card(card_id: int, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_principal_async)):
+    card = await _get_own_card(card_id, current_user, db)
+    await db.delete(card)
+    await db.commit()
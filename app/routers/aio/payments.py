@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import get_async_db, get_async_read_db
+from app.models.user import User
+from app.services.principal_cache import Principal
+from app.models.card import Card
+from app.models.payment import Payment
+from app.schemas.payment import PaymentCreate, PaymentResponse, PaymentPage, PaymentBatchCreate, PaymentBatchResponse
+from app.services.gateway import payment_gateway
+from app.services.validators import validate_all_payment_limits_async
+from app.services.history import payments_page_stmt
+from app.services.serialization import page_response
+from app.services.idempotency import IdempotencyClaim, run_idempotent_async
+from app.services.group_commit import write_and_commit_async
+from app.services.write_jobs import payment_write_job
+from app.services.batch_payments import prepare_payment_batch, authorization_requests, finish_payment_batch, summarize_batch
+from app.services.velocity import PAYMENT_BATCH, record_velocity_async
+from app.services.export import PAYMENT_COLUMNS, MEDIA_TYPES, payment_export_stmts, stream_export_async
+from app.auth import get_current_user_async, get_current_principal_async
+
+router = APIRouter(prefix="/payments", tags=["payments"])
+
+
+@router.post("/", response_model=PaymentResponse, status_code=201)
+async def create_payment(
+    payment: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    # Con Idempotency-Key un reintento devuelve la respuesta original sin reprocesar
+    return await run_idempotent_async(
+        db, current_user.id, "payments", idempotency_key, payment,
+        lambda claim: _create_payment(payment, db, current_user, claim)
+    )
+
+
+async def _create_payment(payment: PaymentCreate, db: AsyncSession, current_user: User, claim: Optional[IdempotencyClaim]):
+    # Verificar que la tarjeta existe y pertenece al usuario
+    result = await db.execute(select(Card).where(
+        Card.id == payment.card_id,
+        Card.user_id == current_user.id
+    ))
+    card = result.scalar_one_or_none()
+    if not card:
+        raise HTTPException(status_code=404, detail="Tarjeta no encontrada")
+    
+    # Ejecutar todas las validaciones
+    await validate_all_payment_limits_async(current_user, card, payment.account_amount, db)
+    
+    # Autorizar con el gateway (simulado o HTTP según configuración)
+    result = await payment_gateway.authorize_async(payment.amount, payment.currency, card.card_type)
+    
+    # Inserción y commit en la sesión del request o en el writer de group commit
+    return await write_and_commit_async(db, payment_write_job(current_user.id, payment, result["status"], claim))
+
+
+@router.post("/batch", response_model=PaymentBatchResponse)
+async def create_payment_batch(batch: PaymentBatchCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    """Procesa un lote de pagos; el resultado de cada ítem se informa por separado"""
+    # Validación e inserción son síncronas sobre Session (greenlet de la sesión async);
+    # la autorización se espera fuera para no bloquear el event loop
+    results, pending = await db.run_sync(prepare_payment_batch, current_user, batch.items)
+    outcomes = await payment_gateway.authorize_many_async(authorization_requests(pending)) if pending else []
+    user_id = current_user.id
+    results = await db.run_sync(finish_payment_batch, user_id, results, pending, outcomes)
+    await db.commit()
+    summary = summarize_batch(results)
+    if summary["created"]:
+        await record_velocity_async(PAYMENT_BATCH, {"user": user_id})
+    return summary
+
+
+@router.get("/", response_model=PaymentPage)
+async def list_my_payments(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    stmt = payments_page_stmt(current_user.id, status, created_from, created_to, cursor, limit)
+    return page_response((await db.execute(stmt)).all(), limit)
+
+
+@router.get("/export")
+async def export_my_payments(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    """Exporta el historial completo de pagos en streaming (NDJSON o CSV)"""
+    stmts = payment_export_stmts(current_user.id, status, created_from, created_to)
+    return StreamingResponse(
+        stream_export_async(stmts, PAYMENT_COLUMNS, fmt, request.headers.get("authorization")),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="payments.{fmt}"'}
+    )
+
+
+@router.get("/{payment_id}", response_model=PaymentResponse)
+async def get_payment(payment_id: int, db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
+    result = await db.execute(select(Payment).where(
+        Payment.id == payment_id,
+        Payment.user_id == current_user.id
+    ))
+    payment = result.scalar_one_or_none()
+    if not payment:
+        raise HTTPException(status_code=404, detail="Pago no encontrado")
+    return payment
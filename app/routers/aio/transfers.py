@@ -0,0 +1,178 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from app.config import settings
+from app.database import get_async_db, get_async_read_db
+from app.models.user import User
+from app.services.principal_cache import Principal
+from app.models.transfer import Transfer
+from app.schemas.transfer import TransferCreate, TransferResponse, TransferDetail, TransferPage, TransferBatchCreate, TransferBatchResponse
+from app.services.validators import validate_all_transfer_limits_async
+from app.services.history import transfers_page_stmt, merge_transfer_rows
+from app.services.serialization import page_response
+from app.services.batch_transfers import process_transfer_batch
+from app.services.idempotency import IdempotencyClaim, run_idempotent_async
+from app.services.batch_payments import summarize_batch
+from app.services.velocity import TRANSFER_BATCH, record_velocity_async
+from app.services.balances import run_with_retries_async
+from app.services.group_commit import write_and_commit_async
+from app.services.write_jobs import transfer_write_job
+from app.services.export import TRANSFER_COLUMNS, MEDIA_TYPES, transfer_export_stmts, stream_export_async
+from app.auth import get_current_user_async, get_current_user_with_balance_async, get_current_principal_async
+
+router = APIRouter(prefix="/transfers", tags=["transfers"])
+
+
+@router.post("/", response_model=TransferResponse, status_code=201)
+async def create_transfer(
+    transfer: TransferCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_with_balance_async)
+):
+    # Con Idempotency-Key un reintento devuelve la respuesta original sin reprocesar
+    return await run_idempotent_async(
+        db, current_user.id, "transfers", idempotency_key, transfer,
+        lambda claim: _create_transfer(transfer, db, current_user, claim)
+    )
+
+
+async def _create_transfer(transfer: TransferCreate, db: AsyncSession, current_user: User, claim: Optional[IdempotencyClaim]):
+    # No puede transferirse a sí mismo
+    if transfer.receiver_id == current_user.id:
+        raise HTTPException(status_code=400, detail="No puedes transferirte a ti mismo")
+    
+    # Verificar que el receptor existe
+    receiver = await db.get(User, transfer.receiver_id)
+    if not receiver:
+        raise HTTPException(status_code=404, detail="Usuario receptor no encontrado")
+    
+    # Ejecutar todas las validaciones
+    await validate_all_transfer_limits_async(current_user, receiver, transfer.account_amount, db)
+    
+    # Ids capturados antes: ante un reintento las instancias ORM expiran y el job
+    # puede correr en otra sesión
+    sender_id, receiver_id = current_user.id, receiver.id
+
+    # Débito, crédito e inserción en la sesión del request o en el writer de group commit
+    return await write_and_commit_async(db, transfer_write_job(sender_id, receiver_id, transfer, claim))
+
+
+@router.post("/batch", response_model=TransferBatchResponse)
+async def create_transfer_batch(batch: TransferBatchCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    """Pago masivo de un emisor a muchos receptores (all_or_nothing o best_effort)"""
+    # La lógica del lote es síncrona sobre Session: se ejecuta en el greenlet de la sesión async
+    async def execute():
+        results = await db.run_sync(process_transfer_batch, current_user, batch.items, batch.mode)
+        await db.commit()
+        return results
+
+    user_id = current_user.id
+    summary = summarize_batch(await run_with_retries_async(db, execute))
+    # Fuera de los reintentos: el lote cuenta una vez, ya confirmado
+    if summary["created"]:
+        await record_velocity_async(TRANSFER_BATCH, {"user": user_id})
+    return summary
+
+
+@router.get("/", response_model=TransferPage)
+async def list_my_transfers(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    # Enviadas y recibidas por separado (cada una usa su índice) y merge en memoria
+    args = (current_user.id, status, created_from, created_to, cursor, limit)
+    sent = (await db.execute(transfers_page_stmt(Transfer.sender_id, *args))).all()
+    received = (await db.execute(transfers_page_stmt(Transfer.receiver_id, *args))).all()
+    return page_response(merge_transfer_rows(sent, received, limit), limit)
+
+
+@router.get("/sent", response_model=TransferPage)
+async def get_sent_transfers(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    stmt = transfers_page_stmt(Transfer.sender_id, current_user.id, status, created_from, created_to, cursor, limit)
+    return page_response((await db.execute(stmt)).all(), limit)
+
+
+@router.get("/received", response_model=TransferPage)
+async def get_received_transfers(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    stmt = transfers_page_stmt(Transfer.receiver_id, current_user.id, status, created_from, created_to, cursor, limit)
+    return page_response((await db.execute(stmt)).all(), limit)
+
+
+@router.get("/export")
+async def export_my_transfers(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    direction: str = Query("all", pattern="^(all|sent|received)$"),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    """
+    Exporta el historial de transferencias en streaming (NDJSON o CSV).
+    Con direction=all se envían primero las enviadas y luego las recibidas,
+    cada bloque en orden cronológico.
+    """
+    stmts = transfer_export_stmts(current_user.id, direction, status, created_from, created_to)
+    return StreamingResponse(
+        stream_export_async(stmts, TRANSFER_COLUMNS, fmt, request.headers.get("authorization")),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="transfers.{fmt}"'}
+    )
+
+
+@router.get("/{transfer_id}", response_model=TransferDetail)
+async def get_transfer(transfer_id: int, db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
+    # En async no hay lazy loading: cargar emisor y receptor en la misma consulta
+    result = await db.execute(
+        select(Transfer)
+        .options(joinedload(Transfer.sender), joinedload(Transfer.receiver))
+        .where(Transfer.id == transfer_id)
+    )
+    transfer = result.scalar_one_or_none()
+    if not transfer:
+        raise HTTPException(status_code=404, detail="Transferencia no encontrada")
+    
+    # Solo puede ver transferencias donde participa
+    if transfer.sender_id != current_user.id and transfer.receiver_id != current_user.id:
+        raise HTTPException(status_code=403, detail="No tienes acceso a esta transferencia")
+    
+    return TransferDetail(
+        id=transfer.id,
+        sender_id=transfer.sender_id,
+        receiver_id=transfer.receiver_id,
+        amount=transfer.amount,
+        currency=transfer.currency,
+        status=transfer.status,
+        description=transfer.description,
+        created_at=transfer.created_at,
+        completed_at=transfer.completed_at,
+        sender_name=transfer.sender.name,
+        receiver_name=transfer.receiver.name
+    )
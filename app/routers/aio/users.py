@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from app.database import get_async_db, get_async_read_db
+from app.models.user import User, user_columns
+from app.services.principal_cache import Principal
+from app.schemas.user import UserCreate, UserResponse, UserLogin, Token, UserLimits, BalanceUpdate
+from app.auth import password_needs_rehash, create_access_token, get_current_user_with_balance_async, get_user_limits, get_current_principal_async
+from app.services.spend_counters import get_spend_totals_async
+from app.services.password_hasher import password_hasher
+from app.services.balances import apply_deposit_async, run_with_retries_async
+from app.services.money import account_to_major, limit_minor
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+@router.post("/register", response_model=UserResponse, status_code=201)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == user.email))
+    if result.scalar_one_or_none():
+        raise HTTPException(status_code=400, detail="Email ya registrado")
+    
+    db_user = User(
+        email=user.email,
+        name=user.name,
+        password_hash=await password_hasher.hash_async(user.password)
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user, user_columns())
+    return db_user
+
+
+@router.post("/login", response_model=Token)
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == credentials.email))
+    user = result.scalar_one_or_none()
+    
+    if not user or not await password_hasher.verify_async(credentials.password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    
+    if user.status != "active":
+        raise HTTPException(status_code=403, detail=f"Usuario {user.status}")
+    
+    # Si cambió el costo de bcrypt, regenerar el hash aprovechando la contraseña en claro
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await password_hasher.hash_async(credentials.password)
+        await db.commit()
+    
+    access_token = create_access_token(data={"sub": str(user.id)})
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/me", response_model=UserResponse)
+async def get_me(current_user: User = Depends(get_current_user_with_balance_async)):
+    return current_user
+
+
+@router.get("/me/limits", response_model=UserLimits)
+async def get_my_limits(current_user: Principal = Depends(get_current_principal_async), db: AsyncSession = Depends(get_async_read_db)):
+    limits = get_user_limits(current_user)
+    # Uso diario y mensual desde los contadores incrementales
+    daily_used, monthly_used = await get_spend_totals_async(db, current_user.id)
+    
+    return UserLimits(
+        max_cards=limits["max_cards"],
+        max_transaction=limits["max_transaction"],
+        daily_limit=limits["daily_limit"],
+        monthly_limit=limits["monthly_limit"],
+        daily_used=account_to_major(daily_used),
+        monthly_used=account_to_major(monthly_used),
+        daily_remaining=account_to_major(max(0, limit_minor(limits["daily_limit"]) - daily_used)),
+        monthly_remaining=account_to_major(max(0, limit_minor(limits["monthly_limit"]) - monthly_used))
+    )
+
+
+@router.post("/me/deposit", response_model=UserResponse)
+async def deposit(data: BalanceUpdate, current_user: User = Depends(get_current_user_with_balance_async), db: AsyncSession = Depends(get_async_db)):
+    """Depositar dinero en la cuenta (simula carga de saldo)"""
+    user_id = current_user.id
+
+    async def execute():
+        await apply_deposit_async(db, user_id, data.account_amount)
+        await db.commit()
+
+    await run_with_retries_async(db, execute)
+    await db.refresh(current_user, user_columns())
+    return current_user
+
+
+@router.get("/{user_id}", response_model=UserResponse)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
+    user = await db.get(User, user_id, options=[undefer(User.ledger_balance)])
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return user
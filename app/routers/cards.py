@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.card import Card
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.schemas.card import CardCreate, CardResponse, CardStatusUpdate
-from app.auth import get_current_user
+from app.auth import get_current_principal
 from app.services.validators import validate_card_limit
+from app.services.serialization import CARD_COLUMNS, list_response
 
 router = APIRouter(prefix="/cards", tags=["cards"])
 
@@ -15,7 +17,7 @@ def mask_card_number(card_number: str) -> str:
 
 
 @router.post("/", response_model=CardResponse, status_code=201)
-def add_card(card: CardCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def add_card(card: CardCreate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
     # Validar límite de tarjetas
     validate_card_limit(current_user, db)
     
@@ -34,12 +36,12 @@ def add_card(card: CardCreate, db: Session = Depends(get_db), current_user: User
 
 
 @router.get("/", response_model=list[CardResponse])
-def list_my_cards(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(Card).filter(Card.user_id == current_user.id).all()
+def list_my_cards(db: Session = Depends(get_read_db), current_user: Principal = Depends(get_current_principal)):
+    return list_response(db.execute(select(*CARD_COLUMNS).where(Card.user_id == current_user.id)).all())
 
 
 @router.get("/{card_id}", response_model=CardResponse)
-def get_card(card_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_card(card_id: int, db: Session = Depends(get_read_db), current_user: Principal = Depends(get_current_principal)):
     card = db.query(Card).filter(Card.id == card_id, Card.user_id == current_user.id).first()
     if not card:
         raise HTTPException(status_code=404, detail="Tarjeta no encontrada")
@@ -51,7 +53,7 @@ def update_card_status(
     card_id: int,
     data: CardStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     card = db.query(Card).filter(Card.id == card_id, Card.user_id == current_user.id).first()
     if not card:
@@ -67,7 +69,7 @@ def update_card_status(
 
 
 @router.delete("/{card_id}", status_code=204)
-def delete_card(card_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_card(card_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
     card = db.query(Card).filter(Card.id == card_id, Card.user_id == current_user.id).first()
     if not card:
         raise HTTPException(status_code=404, detail="Tarjeta no encontrada")
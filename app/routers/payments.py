@@ -1,19 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db
 from app.models.user import User
+from app.services.principal_cache import Principal
 from app.models.card import Card
 from app.models.payment import Payment
-from app.schemas.payment import PaymentCreate, PaymentResponse
-from app.services.payment_processor import simulate_payment
+from app.schemas.payment import PaymentCreate, PaymentResponse, PaymentPage, PaymentBatchCreate, PaymentBatchResponse
+from app.services.gateway import payment_gateway
 from app.services.validators import validate_all_payment_limits
-from app.auth import get_current_user
+from app.services.history import payments_page_stmt
+from app.services.serialization import page_response
+from app.services.idempotency import IdempotencyClaim, run_idempotent
+from app.services.group_commit import write_and_commit
+from app.services.write_jobs import payment_write_job
+from app.services.batch_payments import process_payment_batch, summarize_batch
+from app.services.velocity import PAYMENT_BATCH, record_velocity
+from app.services.export import PAYMENT_COLUMNS, MEDIA_TYPES, payment_export_stmts, stream_export
+from app.auth import get_current_user, get_current_principal
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 
 @router.post("/", response_model=PaymentResponse, status_code=201)
-def create_payment(payment: PaymentCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_payment(
+    payment: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Con Idempotency-Key un reintento devuelve la respuesta original sin reprocesar
+    return run_idempotent(
+        db, current_user.id, "payments", idempotency_key, payment,
+        lambda claim: _create_payment(payment, db, current_user, claim)
+    )
+
+
+def _create_payment(payment: PaymentCreate, db: Session, current_user: User, claim: Optional[IdempotencyClaim]):
     # Verificar que la tarjeta existe y pertenece al usuario
     card = db.query(Card).filter(
         Card.id == payment.card_id,
@@ -23,41 +49,61 @@ def create_payment(payment: PaymentCreate, db: Session = Depends(get_db), curren
         raise HTTPException(status_code=404, detail="Tarjeta no encontrada")
     
     # Ejecutar todas las validaciones
-    validate_all_payment_limits(current_user, card, payment.amount, db)
+    validate_all_payment_limits(current_user, card, payment.account_amount, db)
     
-    # Simular procesamiento del pago
-    result = simulate_payment(payment.amount, card.card_type)
+    # Autorizar con el gateway (simulado o HTTP según configuración)
+    result = payment_gateway.authorize_blocking(payment.amount, payment.currency, card.card_type)
     
-    db_payment = Payment(
-        user_id=current_user.id,
-        card_id=payment.card_id,
-        amount=payment.amount,
-        currency=payment.currency,
-        status=result["status"],
-        description=payment.description
-    )
-    db.add(db_payment)
+    # Inserción y commit en la sesión del request o en el writer de group commit
+    return write_and_commit(db, payment_write_job(current_user.id, payment, result["status"], claim))
+
+
+@router.post("/batch", response_model=PaymentBatchResponse)
+def create_payment_batch(batch: PaymentBatchCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Procesa un lote de pagos; el resultado de cada ítem se informa por separado"""
+    user_id = current_user.id
+    results = process_payment_batch(db, current_user, batch.items)
     db.commit()
-    db.refresh(db_payment)
-    return db_payment
+    summary = summarize_batch(results)
+    if summary["created"]:
+        record_velocity(PAYMENT_BATCH, {"user": user_id})
+    return summary
 
 
-@router.get("/", response_model=list[PaymentResponse])
+@router.get("/", response_model=PaymentPage)
 def list_my_payments(
-    status: str = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
-    query = db.query(Payment).filter(Payment.user_id == current_user.id)
-    if status:
-        query = query.filter(Payment.status == status)
-    return query.offset(skip).limit(limit).all()
+    stmt = payments_page_stmt(current_user.id, status, created_from, created_to, cursor, limit)
+    return page_response(db.execute(stmt).all(), limit)
+
+
+@router.get("/export")
+def export_my_payments(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Exporta el historial completo de pagos en streaming (NDJSON o CSV)"""
+    stmts = payment_export_stmts(current_user.id, status, created_from, created_to)
+    return StreamingResponse(
+        stream_export(stmts, PAYMENT_COLUMNS, fmt, request.headers.get("authorization")),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="payments.{fmt}"'}
+    )
 
 
 @router.get("/{payment_id}", response_model=PaymentResponse)
-def get_payment(payment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_payment(payment_id: int, db: Session = Depends(get_read_db), current_user: Principal = Depends(get_current_principal)):
     payment = db.query(Payment).filter(
         Payment.id == payment_id,
         Payment.user_id == current_user.id
@@ -1,18 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db
 from app.models.user import User
+from app.services.principal_cache import Principal
 from app.models.transfer import Transfer
-from app.schemas.transfer import TransferCreate, TransferResponse, TransferDetail
+from app.schemas.transfer import TransferCreate, TransferResponse, TransferDetail, TransferPage, TransferBatchCreate, TransferBatchResponse
 from app.services.validators import validate_all_transfer_limits
-from app.auth import get_current_user
+from app.services.history import transfers_page_stmt, merge_transfer_rows
+from app.services.serialization import page_response
+from app.services.batch_transfers import process_transfer_batch
+from app.services.idempotency import IdempotencyClaim, run_idempotent
+from app.services.batch_payments import summarize_batch
+from app.services.velocity import TRANSFER_BATCH, record_velocity
+from app.services.balances import run_with_retries
+from app.services.group_commit import write_and_commit
+from app.services.write_jobs import transfer_write_job
+from app.services.export import TRANSFER_COLUMNS, MEDIA_TYPES, transfer_export_stmts, stream_export
+from app.auth import get_current_user, get_current_user_with_balance, get_current_principal
 
 router = APIRouter(prefix="/transfers", tags=["transfers"])
 
 
 @router.post("/", response_model=TransferResponse, status_code=201)
-def create_transfer(transfer: TransferCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_transfer(
+    transfer: TransferCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_with_balance)
+):
+    # Con Idempotency-Key un reintento devuelve la respuesta original sin reprocesar
+    return run_idempotent(
+        db, current_user.id, "transfers", idempotency_key, transfer,
+        lambda claim: _create_transfer(transfer, db, current_user, claim)
+    )
+
+
+def _create_transfer(transfer: TransferCreate, db: Session, current_user: User, claim: Optional[IdempotencyClaim]):
     # No puede transferirse a sí mismo
     if transfer.receiver_id == current_user.id:
         raise HTTPException(status_code=400, detail="No puedes transferirte a ti mismo")
@@ -23,55 +50,102 @@ def create_transfer(transfer: TransferCreate, db: Session = Depends(get_db), cur
         raise HTTPException(status_code=404, detail="Usuario receptor no encontrado")
     
     # Ejecutar todas las validaciones
-    validate_all_transfer_limits(current_user, receiver, transfer.amount, db)
-    
-    # Realizar la transferencia
-    current_user.balance -= transfer.amount
-    receiver.balance += transfer.amount
+    validate_all_transfer_limits(current_user, receiver, transfer.account_amount, db)
     
-    db_transfer = Transfer(
-        sender_id=current_user.id,
-        receiver_id=transfer.receiver_id,
-        amount=transfer.amount,
-        currency=transfer.currency,
-        status="completed",
-        description=transfer.description,
-        completed_at=datetime.utcnow()
-    )
-    db.add(db_transfer)
-    db.commit()
-    db.refresh(db_transfer)
-    return db_transfer
+    # Ids capturados antes: ante un reintento las instancias ORM expiran y el job
+    # puede correr en otra sesión
+    sender_id, receiver_id = current_user.id, receiver.id
+
+    # Débito, crédito e inserción en la sesión del request o en el writer de group commit
+    return write_and_commit(db, transfer_write_job(sender_id, receiver_id, transfer, claim))
 
 
-@router.get("/", response_model=list[TransferResponse])
+@router.post("/batch", response_model=TransferBatchResponse)
+def create_transfer_batch(batch: TransferBatchCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Pago masivo de un emisor a muchos receptores (all_or_nothing o best_effort)"""
+    def execute():
+        results = process_transfer_batch(db, current_user, batch.items, batch.mode)
+        db.commit()
+        return results
+
+    user_id = current_user.id
+    summary = summarize_batch(run_with_retries(db, execute))
+    # Fuera de los reintentos: el lote cuenta una vez, ya confirmado
+    if summary["created"]:
+        record_velocity(TRANSFER_BATCH, {"user": user_id})
+    return summary
+
+
+@router.get("/", response_model=TransferPage)
 def list_my_transfers(
-    status: str = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
-    query = db.query(Transfer).filter(
-        (Transfer.sender_id == current_user.id) | (Transfer.receiver_id == current_user.id)
-    )
-    if status:
-        query = query.filter(Transfer.status == status)
-    return query.offset(skip).limit(limit).all()
+    # Enviadas y recibidas por separado (cada una usa su índice) y merge en memoria
+    args = (current_user.id, status, created_from, created_to, cursor, limit)
+    sent = db.execute(transfers_page_stmt(Transfer.sender_id, *args)).all()
+    received = db.execute(transfers_page_stmt(Transfer.receiver_id, *args)).all()
+    return page_response(merge_transfer_rows(sent, received, limit), limit)
 
 
-@router.get("/sent", response_model=list[TransferResponse])
-def get_sent_transfers(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(Transfer).filter(Transfer.sender_id == current_user.id).all()
+@router.get("/sent", response_model=TransferPage)
+def get_sent_transfers(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    stmt = transfers_page_stmt(Transfer.sender_id, current_user.id, status, created_from, created_to, cursor, limit)
+    return page_response(db.execute(stmt).all(), limit)
 
 
-@router.get("/received", response_model=list[TransferResponse])
-def get_received_transfers(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(Transfer).filter(Transfer.receiver_id == current_user.id).all()
+@router.get("/received", response_model=TransferPage)
+def get_received_transfers(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    stmt = transfers_page_stmt(Transfer.receiver_id, current_user.id, status, created_from, created_to, cursor, limit)
+    return page_response(db.execute(stmt).all(), limit)
+
+
+@router.get("/export")
+def export_my_transfers(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    direction: str = Query("all", pattern="^(all|sent|received)$"),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Exporta el historial de transferencias en streaming (NDJSON o CSV).
+    Con direction=all se envían primero las enviadas y luego las recibidas,
+    cada bloque en orden cronológico.
+    """
+    stmts = transfer_export_stmts(current_user.id, direction, status, created_from, created_to)
+    return StreamingResponse(
+        stream_export(stmts, TRANSFER_COLUMNS, fmt, request.headers.get("authorization")),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="transfers.{fmt}"'}
+    )
 
 
 @router.get("/{transfer_id}", response_model=TransferDetail)
-def get_transfer(transfer_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_transfer(transfer_id: int, db: Session = Depends(get_read_db), current_user: Principal = Depends(get_current_principal)):
     transfer = db.query(Transfer).filter(Transfer.id == transfer_id).first()
     if not transfer:
         raise HTTPException(status_code=404, detail="Transferencia no encontrada")
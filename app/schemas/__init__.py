@@ -1,4 +1,4 @@
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.card import CardCreate, CardResponse
-from app.schemas.payment import PaymentCreate, PaymentResponse
-from app.schemas.transfer import TransferCreate, TransferResponse, TransferDetail
\ No newline at end of file
+from app.schemas.payment import PaymentCreate, PaymentResponse, PaymentPage
+from app.schemas.transfer import TransferCreate, TransferResponse, TransferDetail, TransferPage
\ No newline at end of file
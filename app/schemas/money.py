@@ -0,0 +1,42 @@
+from pydantic import BaseModel, PrivateAttr, field_serializer, model_validator
+from app.config import settings
+from app.services.money import to_minor, to_major, account_minor
+
+
+class AmountIn(BaseModel):
+    """
+    Monto de entrada en decimal (`amount`, en `currency` o en la moneda de la cuenta).
+    Al validar se redondea a los decimales de la moneda y se fijan amount_minor y
+    account_amount en unidades menores: el resto de la app no opera con floats.
+    """
+    _amount_minor: int = PrivateAttr(0)
+    _account_amount: int = PrivateAttr(0)
+
+    @model_validator(mode="after")
+    def convert_amount(self):
+        currency = getattr(self, "currency", settings.account_currency)
+        minor = to_minor(self.amount, currency)
+        if minor <= 0:
+            raise ValueError("El monto debe ser mayor a 0")
+        self._amount_minor = minor
+        self._account_amount = account_minor(minor, currency)
+        self.amount = to_major(minor, currency)
+        return self
+
+    @property
+    def amount_minor(self) -> int:
+        """Unidades menores de `currency` (lo que se guarda en la fila)"""
+        return self._amount_minor
+
+    @property
+    def account_amount(self) -> int:
+        """Unidades menores de la moneda de la cuenta (saldo, límites y contadores)"""
+        return self._account_amount
+
+
+class AmountOut(BaseModel):
+    """Respuesta con `amount` en unidades menores de `currency`, serializado en decimal"""
+
+    @field_serializer("amount", check_fields=False)
+    def serialize_amount(self, amount: int) -> float:
+        return to_major(amount, self.currency)
@@ -1,9 +1,11 @@
 from pydantic import BaseModel, field_validator
 from datetime import datetime
 from typing import Optional
+from app.config import settings
+from app.schemas.money import AmountIn, AmountOut
 
 
-class PaymentCreate(BaseModel):
+class PaymentCreate(AmountIn):
     card_id: int
     amount: float
     currency: str = "USD"
@@ -14,18 +16,47 @@ class PaymentCreate(BaseModel):
     def validate_amount(cls, v):
         if v <= 0:
             raise ValueError("El monto debe ser mayor a 0")
-        return round(v, 2)
+        return v
 
 
-class PaymentResponse(BaseModel):
+class PaymentResponse(AmountOut):
     id: int
     user_id: int
     card_id: int
-    amount: float
+    amount: int  # unidades menores de currency
     currency: str
     status: str
     description: Optional[str]
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class PaymentPage(BaseModel):
+    items: list[PaymentResponse]
+    next_cursor: Optional[str] = None
+
+
+class PaymentBatchCreate(BaseModel):
+    items: list[PaymentCreate]
+
+    @field_validator("items")
+    @classmethod
+    def validate_items(cls, v):
+        if not v or len(v) > settings.max_payment_batch_size:
+            raise ValueError(f"El lote debe tener entre 1 y {settings.max_payment_batch_size} pagos")
+        return v
+
+
+class PaymentBatchItemResult(BaseModel):
+    index: int
+    status_code: int
+    payment: Optional[PaymentResponse] = None
+    detail: Optional[str] = None
+
+
+class PaymentBatchResponse(BaseModel):
+    results: list[PaymentBatchItemResult]
+    created: int
+    rejected: int
\ No newline at end of file
@@ -1,9 +1,11 @@
 from pydantic import BaseModel, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
+from app.config import settings
+from app.schemas.money import AmountIn, AmountOut
 
 
-class TransferCreate(BaseModel):
+class TransferCreate(AmountIn):
     receiver_id: int
     amount: float
     currency: str = "USD"
@@ -14,14 +16,14 @@ class TransferCreate(BaseModel):
     def validate_amount(cls, v):
         if v <= 0:
             raise ValueError("El monto debe ser mayor a 0")
-        return round(v, 2)
+        return v
 
 
-class TransferResponse(BaseModel):
+class TransferResponse(AmountOut):
     id: int
     sender_id: int
     receiver_id: int
-    amount: float
+    amount: int  # unidades menores de currency
     currency: str
     status: str
     description: Optional[str]
@@ -32,6 +34,37 @@ class TransferResponse(BaseModel):
         from_attributes = True
 
 
+class TransferPage(BaseModel):
+    items: list[TransferResponse]
+    next_cursor: Optional[str] = None
+
+
 class TransferDetail(TransferResponse):
     sender_name: str
-    receiver_name: str
\ No newline at end of file
+    receiver_name: str
+
+
+class TransferBatchCreate(BaseModel):
+    items: list[TransferCreate]
+    # all_or_nothing: cualquier error rechaza el lote; best_effort: se aplican los ítems válidos
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+    @field_validator("items")
+    @classmethod
+    def validate_items(cls, v):
+        if not v or len(v) > settings.max_transfer_batch_size:
+            raise ValueError(f"El lote debe tener entre 1 y {settings.max_transfer_batch_size} transferencias")
+        return v
+
+
+class TransferBatchItemResult(BaseModel):
+    index: int
+    status_code: int
+    transfer: Optional[TransferResponse] = None
+    detail: Optional[str] = None
+
+
+class TransferBatchResponse(BaseModel):
+    results: list[TransferBatchItemResult]
+    created: int
+    rejected: int
\ No newline at end of file
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import AliasChoices, BaseModel, EmailStr, Field, field_validator, field_serializer
 from datetime import datetime
 from typing import Optional
+from app.schemas.money import AmountIn
+from app.services.money import account_to_major
 
 
 class UserCreate(BaseModel):
@@ -25,7 +27,9 @@ class UserResponse(BaseModel):
     id: int
     email: str
     name: str
-    balance: float
+    # Unidades menores de la moneda de la cuenta, serializado en decimal. Desde el modelo
+    # se lee ledger_balance: el saldo del libro mayor, no la columna users.balance
+    balance: int = Field(validation_alias=AliasChoices("ledger_balance", "balance"))
     status: str
     verification_level: str
     created_at: datetime
@@ -33,6 +37,10 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @field_serializer("balance")
+    def serialize_balance(self, balance: int) -> float:
+        return account_to_major(balance)
+
 
 class UserLimits(BaseModel):
     max_cards: int
@@ -50,7 +58,7 @@ class Token(BaseModel):
     token_type: str
 
 
-class BalanceUpdate(BaseModel):
+class BalanceUpdate(AmountIn):
     amount: float
     
     @field_validator("amount")
@@ -58,4 +66,4 @@ class BalanceUpdate(BaseModel):
     def validate_amount(cls, v):
         if v <= 0:
             raise ValueError("El monto debe ser mayor a 0")
-        return round(v, 2)
\ No newline at end of file
+        return v
\ No newline at end of file
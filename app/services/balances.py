@@ -0,0 +1,100 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.services.money import format_account_amount
+from app.services.ledger import (
+    USER, account_balance, append_entries, append_entries_async, deposit_entries, lock_accounts, lock_accounts_async
+)
+
+T = TypeVar("T")
+
+# SQLSTATE de PostgreSQL: serialization_failure, deadlock_detected
+_RETRYABLE_SQLSTATES = {"40001", "40P01"}
+# Códigos de MySQL: deadlock, lock wait timeout
+_RETRYABLE_MYSQL_CODES = {1213, 1205}
+
+# El saldo es el del libro mayor (account_balance): un movimiento solo inserta asientos,
+# ninguno actualiza users.balance. Orden de un débito, en la transacción del movimiento:
+# lock_accounts (débito del emisor, crédito de los receptores), asientos, ensure_funds.
+
+
+def _insufficient_balance(amount: int) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"Balance insuficiente. Requerido: {format_account_amount(amount)}")
+
+
+def ensure_funds(db: Session, user_id: int, amount: int) -> None:
+    """
+    Con el débito ya asentado, rechaza el movimiento si dejó la cuenta en negativo. El
+    lock de débito serializa los débitos de la cuenta; en SQLite el INSERT de los
+    asientos ya tomó el lock de escritura, así que la lectura ve todo lo confirmado.
+    """
+    if account_balance(db, USER, user_id)["balance"] < 0:
+        raise _insufficient_balance(amount)
+
+
+def apply_deposit(db: Session, user_id: int, amount: int) -> None:
+    """Asienta el depósito en el libro mayor. No hace commit."""
+    lock_accounts(db, credit_ids=[user_id])
+    append_entries(db, deposit_entries(user_id, amount))
+
+
+async def apply_deposit_async(db: AsyncSession, user_id: int, amount: int) -> None:
+    await lock_accounts_async(db, credit_ids=[user_id])
+    await append_entries_async(db, deposit_entries(user_id, amount))
+
+
+def is_retryable(exc: DBAPIError) -> bool:
+    """Errores de contención que se resuelven reintentando la transacción"""
+    orig = exc.orig
+    sqlstate = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if sqlstate in _RETRYABLE_SQLSTATES:
+        return True
+    if orig is not None and orig.args and orig.args[0] in _RETRYABLE_MYSQL_CODES:
+        return True
+    return "database is locked" in str(orig)
+
+
+def _backoff(attempt: int) -> float:
+    # Exponencial con jitter para que los reintentos no vuelvan a chocar
+    return random.uniform(0, settings.balance_retry_base_delay * (2 ** attempt))
+
+
+def run_with_retries(db: Session, operation: Callable[[], T]) -> T:
+    """
+    Ejecuta la transacción (incluido el commit) y la repite ante contención.
+    `operation` no debe depender de atributos de instancias ORM: tras el rollback expiran.
+    """
+    attempts = settings.balance_retry_attempts
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except DBAPIError as exc:
+            db.rollback()
+            if attempt == attempts - 1 or not is_retryable(exc):
+                raise
+            time.sleep(_backoff(attempt))
+        except BaseException:
+            db.rollback()
+            raise
+
+
+async def run_with_retries_async(db: AsyncSession, operation: Callable[[], Awaitable[T]]) -> T:
+    """Versión async de run_with_retries"""
+    attempts = settings.balance_retry_attempts
+    for attempt in range(attempts):
+        try:
+            return await operation()
+        except DBAPIError as exc:
+            await db.rollback()
+            if attempt == attempts - 1 or not is_retryable(exc):
+                raise
+            await asyncio.sleep(_backoff(attempt))
+        except BaseException:
+            await db.rollback()
+            raise
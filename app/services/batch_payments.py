@@ -0,0 +1,116 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.models.card import Card
+from app.models.payment import Payment
+from app.schemas.payment import PaymentCreate, PaymentResponse
+from app.services.gateway import payment_gateway
+from app.services.ledger import append_entries, payment_entries
+from app.services.spend_counters import get_spend_totals, record_spend
+from app.services.velocity import PAYMENT_BATCH, check_velocity
+from app.services.validators import (
+    validate_user_active, validate_card_status, validate_card_not_expired,
+    validate_transaction_limit, validate_spend_limits
+)
+
+
+def prepare_payment_batch(db: Session, user: User, items: list[PaymentCreate]) -> tuple[list, list]:
+    """
+    Valida un lote de pagos del mismo usuario antes de autorizarlo.
+    Las tarjetas se leen en una sola consulta y los límites diario/mensual se
+    evalúan de forma acumulada en memoria, reservando cada ítem válido como si
+    fuera a aprobarse (las autorizaciones corren en paralelo, sin orden). Las reglas
+    de velocidad consultan el lote como una operación (PAYMENT_BATCH); el llamador la
+    cuenta con record_velocity después del commit.
+    Retorna (results, pending): pending son los ítems a autorizar.
+    """
+    card_ids = {item.card_id for item in items}
+    cards = {
+        card.id: card
+        for card in db.execute(select(Card).where(Card.id.in_(card_ids), Card.user_id == user.id)).scalars()
+    }
+    daily_used, monthly_used = get_spend_totals(db, user.id)
+
+    results = []
+    pending = []
+    for index, item in enumerate(items):
+        card = cards.get(item.card_id)
+        if card is None:
+            results.append({"index": index, "status_code": 404, "detail": "Tarjeta no encontrada"})
+            continue
+        try:
+            validate_user_active(user)
+            validate_card_status(card)
+            validate_card_not_expired(card)
+            validate_transaction_limit(user, item.account_amount)
+            validate_spend_limits(user, item.account_amount, daily_used, monthly_used)
+        except HTTPException as exc:
+            results.append({"index": index, "status_code": exc.status_code, "detail": exc.detail})
+            continue
+        daily_used += item.account_amount
+        monthly_used += item.account_amount
+        pending.append((index, item, card.card_type))
+        results.append(None)
+
+    if pending:
+        check_velocity(PAYMENT_BATCH, {"user": user.id}, record=False)
+    return results, pending
+
+
+def authorization_requests(pending: list) -> list[tuple]:
+    return [(item.amount, item.currency, card_type) for _, item, card_type in pending]
+
+
+def finish_payment_batch(db: Session, user_id: int, results: list, pending: list, outcomes: list[dict]) -> list[dict]:
+    """
+    Inserta los pagos autorizados con un único flush; el commit queda a cargo del llamador.
+    """
+    payments = []
+    approved = []
+    approved_total = 0
+    # Un solo instante para todo el lote: created_at de cada pago y período del gasto
+    now = datetime.utcnow()
+    for (index, item, _), outcome in zip(pending, outcomes):
+        payment = Payment(
+            user_id=user_id,
+            card_id=item.card_id,
+            amount=item.amount_minor,
+            currency=item.currency,
+            status=outcome["status"],
+            description=item.description,
+            created_at=now
+        )
+        if payment.status == "approved":
+            approved_total += item.account_amount
+            approved.append((payment, item.account_amount))
+        payments.append(payment)
+        results[index] = {"index": index, "status_code": 201, "payment": payment}
+
+    if payments:
+        db.add_all(payments)
+        if approved_total:
+            record_spend(db, user_id, approved_total, now)
+        # Un solo INSERT multi-fila; ids y created_at quedan cargados sin refresh
+        db.flush()
+        append_entries(db, [
+            entry for payment, amount in approved for entry in payment_entries(payment.id, payment.card_id, amount)
+        ])
+        # Serializar antes del commit: después las instancias expiran y cada una haría un SELECT
+        for result in results:
+            if "payment" in result:
+                result["payment"] = PaymentResponse.model_validate(result["payment"])
+    return results
+
+
+def process_payment_batch(db: Session, user: User, items: list[PaymentCreate]) -> list[dict]:
+    """Valida, autoriza en paralelo contra el gateway e inserta un lote de pagos"""
+    results, pending = prepare_payment_batch(db, user, items)
+    outcomes = payment_gateway.authorize_many(authorization_requests(pending)) if pending else []
+    return finish_payment_batch(db, user.id, results, pending, outcomes)
+
+
+def summarize_batch(results: list[dict]) -> dict:
+    created = sum(1 for result in results if result["status_code"] == 201)
+    return {"results": results, "created": created, "rejected": len(results) - created}
@@ -0,0 +1,109 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.models.transfer import Transfer
+from app.schemas.transfer import TransferCreate, TransferResponse
+from app.services.spend_counters import get_spend_totals, record_spend
+from app.services.money import format_account_amount
+from app.services.ledger import USER, account_balance, append_entries, lock_accounts, transfer_entries
+from app.services.validators import validate_user_active, validate_transaction_limit, validate_spend_limits
+from app.services.velocity import TRANSFER_BATCH, check_velocity
+
+
+def _reject(index: int, exc: HTTPException) -> dict:
+    return {"index": index, "status_code": exc.status_code, "detail": exc.detail}
+
+
+def process_transfer_batch(db: Session, sender: User, items: list[TransferCreate], mode: str) -> list[dict]:
+    """
+    Reparte fondos de un emisor a muchos receptores en una sola transacción.
+    Receptores resueltos con un IN, balance y límites validados contra el total
+    del lote, asientos del libro mayor en un único executemany. El commit queda a cargo
+    del llamador.
+    En modo all_or_nothing cualquier ítem inválido rechaza el lote con 400.
+    Las reglas de velocidad consultan el lote como una operación (TRANSFER_BATCH): se
+    ejecuta dentro de run_with_retries, así que el llamador la cuenta con
+    record_velocity después del commit, una sola vez.
+    """
+    validate_user_active(sender)
+
+    receiver_ids = {item.receiver_id for item in items}
+    statuses = dict(db.execute(select(User.id, User.status).where(User.id.in_(receiver_ids))).all())
+    daily_used, monthly_used = get_spend_totals(db, sender.id)
+    available = account_balance(db, USER, sender.id)["balance"]
+
+    results = []
+    accepted = []
+    total = 0
+    for index, item in enumerate(items):
+        try:
+            if item.receiver_id == sender.id:
+                raise HTTPException(status_code=400, detail="No puedes transferirte a ti mismo")
+            if item.receiver_id not in statuses:
+                raise HTTPException(status_code=404, detail="Usuario receptor no encontrado")
+            if statuses[item.receiver_id] != "active":
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Usuario {statuses[item.receiver_id]}. No puede realizar operaciones."
+                )
+            amount = item.account_amount
+            validate_transaction_limit(sender, amount)
+            # Acumulado del lote contra balance y límites
+            if available < total + amount:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Balance insuficiente. Disponible: {format_account_amount(available - total)}, "
+                           f"Requerido: {format_account_amount(amount)}"
+                )
+            validate_spend_limits(sender, amount, daily_used + total, monthly_used + total)
+        except HTTPException as exc:
+            results.append(_reject(index, exc))
+            continue
+        total += amount
+        accepted.append((index, item))
+        results.append(None)
+
+    rejected = [result for result in results if result is not None]
+    if mode == "all_or_nothing" and rejected:
+        raise HTTPException(status_code=400, detail={"message": "Lote rechazado", "errors": rejected})
+    if not accepted:
+        return results
+    check_velocity(TRANSFER_BATCH, {"user": sender.id}, record=False)
+
+    # Locks antes de insertar (ver lock_statements): el del emisor serializa sus débitos
+    lock_accounts(db, debit_ids=[sender.id], credit_ids={item.receiver_id for _, item in accepted})
+
+    # Un solo instante para todo el lote: created_at de cada fila y período del gasto
+    now = datetime.utcnow()
+    transfers = [
+        (index, Transfer(
+            sender_id=sender.id,
+            receiver_id=item.receiver_id,
+            amount=item.amount_minor,
+            currency=item.currency,
+            status="completed",
+            description=item.description,
+            created_at=now,
+            completed_at=now
+        ))
+        for index, item in accepted
+    ]
+    db.add_all([transfer for _, transfer in transfers])
+    record_spend(db, sender.id, total, now)
+    db.flush()
+    append_entries(db, [
+        entry
+        for (_, item), (_, transfer) in zip(accepted, transfers)
+        for entry in transfer_entries(transfer.id, sender.id, item.receiver_id, item.account_amount)
+    ])
+    # Débito ya asentado: si otro request gastó el saldo en paralelo el lote no se aplica
+    if account_balance(db, USER, sender.id)["balance"] < 0:
+        raise HTTPException(status_code=409, detail="El balance cambió durante el procesamiento. Reintente.")
+
+    # Serializar antes del commit: después las instancias expiran
+    for index, transfer in transfers:
+        results[index] = {"index": index, "status_code": 201, "transfer": TransferResponse.model_validate(transfer)}
+    return results
+
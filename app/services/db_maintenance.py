@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from typing import Optional
+from app.config import settings
+from app.services.metrics import registry, stats_samples
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteMaintenance:
+    """
+    Mantenimiento periódico de SQLite en WAL, en un thread en segundo plano:
+    - wal_checkpoint(PASSIVE): vuelca el WAL a la base sin bloquear a lectores ni
+      escritores; con lecturas continuas el autocheckpoint puede no completarse
+      nunca y el WAL crecería sin límite.
+    - PRAGMA optimize: actualiza las estadísticas del planificador si hace falta.
+    """
+
+    def __init__(self, checkpoint_interval: float, optimize_interval: float):
+        # Engine del worker: se fija en start, desde el lifespan
+        self.engine = None
+        self.checkpoint_interval = checkpoint_interval
+        self.optimize_interval = optimize_interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.checkpoints = 0
+        self.optimizations = 0
+        self.errors = 0
+        self.last_checkpoint: Optional[dict] = None
+
+    @property
+    def enabled(self) -> bool:
+        return (
+            settings.database_profile == "production"
+            and self.engine is not None
+            and self.engine.dialect.name == "sqlite"
+            and (self.checkpoint_interval > 0 or self.optimize_interval > 0)
+        )
+
+    def checkpoint(self) -> dict:
+        with self.engine.connect() as conn:
+            busy, log_frames, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").one()
+        self.checkpoints += 1
+        self.last_checkpoint = {"busy": busy, "log_frames": log_frames, "checkpointed_frames": checkpointed}
+        return self.last_checkpoint
+
+    def optimize(self) -> None:
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+        self.optimizations += 1
+
+    def start(self, engine) -> None:
+        self.engine = engine
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sqlite-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        now = time.monotonic()
+        tasks = [
+            [self.checkpoint, self.checkpoint_interval, now + self.checkpoint_interval],
+            [self.optimize, self.optimize_interval, now + self.optimize_interval],
+        ]
+        tasks = [task for task in tasks if task[1] > 0]
+        while True:
+            next_due = min(task[2] for task in tasks)
+            if self._stop.wait(max(0.0, next_due - time.monotonic())):
+                return
+            now = time.monotonic()
+            for task in tasks:
+                fn, interval, due = task
+                if due > now:
+                    continue
+                task[2] = now + interval
+                try:
+                    fn()
+                except Exception:
+                    # Un fallo (p. ej. base bloqueada) no detiene el mantenimiento
+                    self.errors += 1
+                    logger.exception("Error en mantenimiento de SQLite")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "checkpoints": self.checkpoints,
+            "optimizations": self.optimizations,
+            "errors": self.errors,
+            "last_checkpoint": self.last_checkpoint,
+        }
+
+
+db_maintenance = SqliteMaintenance(settings.sqlite_checkpoint_interval, settings.sqlite_optimize_interval)
+registry.collector(lambda: stats_samples("app_sqlite_maintenance", db_maintenance.stats(), "Mantenimiento de SQLite"))
@@ -0,0 +1,390 @@
+import asyncio
+import itertools
+import math
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Optional
+from fastapi import HTTPException
+from app.config import settings
+from app.services.payment_processor import simulate_payment, AuthorizationBatcher
+from app.services.metrics import Histogram, registry, stats_samples
+
+ERROR_RESULT = {"status": "error", "message": "Error de comunicación con el procesador"}
+
+
+class GatewayError(Exception):
+    """Respuesta inválida o 5xx del gateway (reintentable)"""
+
+
+class GatewayMetrics:
+    """Histogramas de latencia por resultado y contadores de reintentos/hedges/circuito"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, Histogram] = {}
+        self._counters = {"retries": 0, "hedges": 0, "hedge_wins": 0, "circuit_rejections": 0}
+
+    def observe(self, outcome: str, seconds: float) -> None:
+        with self._lock:
+            self._histograms.setdefault(outcome, Histogram()).observe(seconds)
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "latency": {outcome: histogram.snapshot() for outcome, histogram in self._histograms.items()},
+                **self._counters,
+            }
+
+
+class CircuitBreaker:
+    """
+    Tras `failure_threshold` fallas seguidas se abre y rechaza llamadas durante
+    `reset_timeout` segundos; luego deja pasar una sola llamada de prueba (half-open).
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def retry_after(self) -> int:
+        with self._lock:
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class PaymentGateway(ABC):
+    """
+    Autorización de pagos. `authorize` es la implementación (corrutina);
+    los routers usan las fachadas: bloqueante para los síncronos, async para los aio,
+    y `*_many` para autorizar un lote en paralelo.
+    Cada request es una tupla (amount, currency, card_type); cada resultado un dict
+    {"status": approved|declined|error, "message": ...}, como simulate_payment.
+    Una subclase que no implemente todas las fachadas falla al instanciarse.
+    """
+
+    # Nombre de la implementación en stats() y métricas (simulated, http)
+    backend: str
+
+    def __init__(self):
+        self.metrics = GatewayMetrics()
+
+    @abstractmethod
+    async def authorize(self, amount: float, currency: str, card_type: str) -> dict:
+        ...
+
+    @abstractmethod
+    def authorize_blocking(self, amount: float, currency: str, card_type: str) -> dict:
+        ...
+
+    @abstractmethod
+    async def authorize_async(self, amount: float, currency: str, card_type: str) -> dict:
+        ...
+
+    @abstractmethod
+    def authorize_many(self, requests: list[tuple]) -> list[dict]:
+        ...
+
+    @abstractmethod
+    async def authorize_many_async(self, requests: list[tuple]) -> list[dict]:
+        ...
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **self.metrics.stats()}
+
+    def close(self) -> None:
+        pass
+
+
+class SimulatedGateway(PaymentGateway):
+    """Gateway en proceso basado en simulate_payment (sin red)"""
+    backend = "simulated"
+
+    def _authorize(self, amount: float, currency: str, card_type: str) -> dict:
+        started = time.perf_counter()
+        result = simulate_payment(amount, card_type)
+        self.metrics.observe(result["status"], time.perf_counter() - started)
+        return result
+
+    async def authorize(self, amount: float, currency: str, card_type: str) -> dict:
+        return self._authorize(amount, currency, card_type)
+
+    def authorize_blocking(self, amount: float, currency: str, card_type: str) -> dict:
+        return self._authorize(amount, currency, card_type)
+
+    async def authorize_async(self, amount: float, currency: str, card_type: str) -> dict:
+        return self._authorize(amount, currency, card_type)
+
+    def authorize_many(self, requests: list[tuple]) -> list[dict]:
+        return [self._authorize(*request) for request in requests]
+
+    async def authorize_many_async(self, requests: list[tuple]) -> list[dict]:
+        return self.authorize_many(requests)
+
+
+class HttpGateway(PaymentGateway):
+    """
+    Cliente HTTP async contra el gateway (POST {url}/authorize, o /authorize/batch
+    con micro-batching).
+    Corre en un event loop propio en un thread dedicado: routers síncronos y async
+    comparten el mismo pool keep-alive sin bloquear un thread por round trip.
+
+    Las conexiones se reparten en varios AsyncClient chicos: el pool de httpx
+    consume CPU en proporción a su tamaño, y con un semáforo por pool ningún
+    request espera dentro de httpx. Las llamadas en vuelo no superan max_connections.
+    """
+    backend = "http"
+
+    def __init__(self, url: str, timeout: float, connect_timeout: float, max_connections: int,
+                 pool_shards: int, max_attempts: int, hedge_delay: float, breaker: CircuitBreaker,
+                 batch_window: float = 0.0, max_batch_size: int = 1):
+        super().__init__()
+        self.url = url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_shards = max(1, min(pool_shards, max_connections))
+        self.connections_per_shard = math.ceil(max_connections / self.pool_shards)
+        self.max_attempts = max_attempts
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pools: list[tuple] = []
+        self._next_pool = itertools.count()
+        # Micro-batching: autorizaciones concurrentes viajan juntas a /authorize/batch
+        self.batcher: Optional[AuthorizationBatcher] = None
+        if batch_window > 0 and max_batch_size > 1:
+            self.batcher = AuthorizationBatcher(self._authorize_call, batch_window, max_batch_size)
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="payment-gateway", daemon=True)
+                thread.start()
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    async def _setup(self) -> None:
+        import httpx
+
+        size = self.connections_per_shard
+        self._pools = [
+            (
+                httpx.AsyncClient(
+                    base_url=self.url,
+                    timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(max_connections=size, max_keepalive_connections=size)
+                ),
+                asyncio.Semaphore(size)
+            )
+            for _ in range(self.pool_shards)
+        ]
+
+    async def _close_pools(self) -> None:
+        for client, _ in self._pools:
+            await client.aclose()
+
+    def _submit(self, coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._start())
+
+    def authorize_blocking(self, amount: float, currency: str, card_type: str) -> dict:
+        return self._submit(self.authorize(amount, currency, card_type)).result()
+
+    async def authorize_async(self, amount: float, currency: str, card_type: str) -> dict:
+        return await asyncio.wrap_future(self._submit(self.authorize(amount, currency, card_type)))
+
+    def authorize_many(self, requests: list[tuple]) -> list[dict]:
+        return self._submit(self._authorize_many(requests)).result()
+
+    async def authorize_many_async(self, requests: list[tuple]) -> list[dict]:
+        return await asyncio.wrap_future(self._submit(self._authorize_many(requests)))
+
+    async def _authorize_many(self, requests: list[tuple]) -> list[dict]:
+        return list(await asyncio.gather(*(self.authorize(*request) for request in requests)))
+
+    async def authorize(self, amount: float, currency: str, card_type: str) -> dict:
+        request = (amount, currency, card_type)
+        if self.batcher is not None:
+            return await self.batcher.submit(request)
+        return (await self._authorize_call([request]))[0]
+
+    async def _authorize_call(self, requests: list[tuple]) -> list[dict]:
+        """Una llamada al gateway: POST /authorize, o /authorize/batch con varios pedidos"""
+        if not self.breaker.allow():
+            self.metrics.increment("circuit_rejections")
+            raise HTTPException(
+                status_code=503,
+                detail="Procesador de pagos no disponible. Reintente más tarde.",
+                headers={"Retry-After": str(self.breaker.retry_after())}
+            )
+        started = time.perf_counter()
+        items = [{"amount": amount, "currency": currency, "card_type": card_type} for amount, currency, card_type in requests]
+        path, payload = ("/authorize", items[0]) if self.batcher is None else ("/authorize/batch", {"items": items})
+        # Misma key en reintentos y hedges: el gateway deduplica y cobra una sola vez
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        try:
+            results = await self._call_with_retries(path, payload, headers, len(items))
+        except Exception:
+            self.breaker.record_failure()
+            elapsed = time.perf_counter() - started
+            for _ in items:
+                self.metrics.observe("failure", elapsed)
+            return [dict(ERROR_RESULT) for _ in items]
+        self.breaker.record_success()
+        elapsed = time.perf_counter() - started
+        for result in results:
+            self.metrics.observe(result["status"], elapsed)
+        return results
+
+    async def _call_with_retries(self, path: str, payload: dict, headers: dict, expected: int) -> list[dict]:
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._hedged(path, payload, headers, expected)
+            except Exception:
+                if attempt == self.max_attempts - 1:
+                    raise
+                self.metrics.increment("retries")
+                await asyncio.sleep(random.uniform(0, 0.05 * (2 ** attempt)))
+
+    async def _hedged(self, path: str, payload: dict, headers: dict, expected: int) -> list[dict]:
+        """
+        Si la primera llamada no respondió en hedge_delay se lanza una segunda y gana la
+        primera en terminar. El plazo corre desde que la llamada sale (no desde que espera
+        conexión) y solo se duplica si hay una conexión libre: saturado no se suma carga.
+        """
+        first = asyncio.ensure_future(self._send(await self._acquire(), path, payload, headers, expected))
+        if self.hedge_delay <= 0:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+        pool = await self._try_acquire()
+        if pool is None:
+            return await first
+
+        self.metrics.increment("hedges")
+        second = asyncio.ensure_future(self._send(pool, path, payload, headers, expected))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if task is second:
+                        self.metrics.increment("hedge_wins")
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def _acquire(self) -> tuple:
+        """Reserva un lugar en uno de los pools (round robin)"""
+        pool = self._pools[next(self._next_pool) % len(self._pools)]
+        await pool[1].acquire()
+        return pool
+
+    async def _try_acquire(self) -> Optional[tuple]:
+        """Reserva un lugar solo si hay uno libre (un semáforo libre se adquiere sin esperar)"""
+        for pool in self._pools:
+            if not pool[1].locked():
+                await pool[1].acquire()
+                return pool
+        return None
+
+    async def _send(self, pool: tuple, path: str, payload: dict, headers: dict, expected: int) -> list[dict]:
+        client, semaphore = pool
+        try:
+            response = await client.post(path, json=payload, headers=headers)
+        finally:
+            semaphore.release()
+        if response.status_code >= 500:
+            raise GatewayError(f"Gateway respondió {response.status_code}")
+        response.raise_for_status()
+        body = response.json()
+        results = body.get("results") if "items" in payload else [body]
+        if not isinstance(results, list) or len(results) != expected or any(
+            result.get("status") not in ("approved", "declined", "error") for result in results
+        ):
+            raise GatewayError(f"Respuesta inválida del gateway: {body}")
+        return results
+
+    def stats(self) -> dict:
+        stats = {**super().stats(), "circuit": self.breaker.stats()}
+        if self.batcher is not None:
+            stats["batching"] = self.batcher.stats()
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_pools(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+def create_gateway() -> PaymentGateway:
+    if settings.payment_gateway == "http":
+        return HttpGateway(
+            url=settings.gateway_url,
+            timeout=settings.gateway_timeout,
+            connect_timeout=settings.gateway_connect_timeout,
+            max_connections=settings.gateway_max_connections,
+            pool_shards=settings.gateway_pool_shards,
+            max_attempts=settings.gateway_max_attempts,
+            hedge_delay=settings.gateway_hedge_delay,
+            breaker=CircuitBreaker(settings.gateway_breaker_failures, settings.gateway_breaker_reset),
+            batch_window=settings.gateway_batch_window,
+            max_batch_size=settings.gateway_max_batch_size
+        )
+    return SimulatedGateway()
+
+
+payment_gateway = create_gateway()
+registry.collector(lambda: stats_samples("app_gateway", payment_gateway.stats(), "Gateway de pagos"))
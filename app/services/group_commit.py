@@ -0,0 +1,198 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional, TypeVar
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import new_session
+from app.services.balances import run_with_retries, run_with_retries_async
+from app.services.metrics import Histogram, registry, stats_samples
+
+T = TypeVar("T")
+
+# Buckets de cantidad de escrituras por commit
+GROUP_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+WriteJob = Callable[[Session], T]
+
+
+class GroupCommitter:
+    """
+    Writer de group commit: junta las escrituras de requests concurrentes y las
+    confirma en una sola transacción (un fsync) cada `window` segundos o al llegar a
+    `max_group_size`. Cada job corre en su propio savepoint: si falla se descarta solo
+    ese job. El request recibe su resultado recién cuando el grupo quedó confirmado.
+    Un job recibe la sesión del writer: no debe usar instancias de la sesión del request.
+    """
+
+    def __init__(self, session_factory, window: float, max_group_size: int):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_group_size = max_group_size
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.groups = 0
+        self.jobs = 0
+        self.fallbacks = 0
+        self._group_sizes = Histogram(GROUP_SIZE_BUCKETS)
+        self._commit_seconds = Histogram()
+
+    def submit(self, job: WriteJob) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+        self._queue.put((job, future))
+        return future
+
+    def run(self, job: WriteJob):
+        """Bloquea el thread actual (routers síncronos) hasta que el grupo del job se confirme"""
+        return self.submit(job).result()
+
+    async def run_async(self, job: WriteJob):
+        return await asyncio.wrap_future(self.submit(job))
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            group = [first]
+            deadline = time.monotonic() + self.window
+            stop = False
+            while len(group) < self.max_group_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                group.append(item)
+            self._commit_group(group)
+            if stop:
+                return
+
+    def _commit_group(self, group: list[tuple]) -> None:
+        started = time.perf_counter()
+        outcomes = []
+        db = self.session_factory()
+        try:
+            if db.get_bind().dialect.name == "sqlite":
+                # pysqlite no emite BEGIN antes de un SAVEPOINT: sin BEGIN explícito cada
+                # RELEASE confirmaría su job por separado. IMMEDIATE toma el lock de escritura
+                db.execute(text("BEGIN IMMEDIATE"))
+            for job, future in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # Lo que el job anota en session.info (principals, respuestas idempotentes)
+                # se descarta si su savepoint se revierte
+                saved_info = {key: value.copy() for key, value in db.info.items()}
+                try:
+                    with db.begin_nested():
+                        result = job(db)
+                    outcomes.append((future, result, None))
+                except DBAPIError:
+                    raise
+                except Exception as exc:
+                    db.info.clear()
+                    db.info.update(saved_info)
+                    outcomes.append((future, None, exc))
+            db.commit()
+        except DBAPIError:
+            # Contención o error de la base: cada job se confirma por separado con reintentos
+            db.rollback()
+            db.close()
+            self._commit_individually([item for item in group if item[1].running()])
+            return
+        finally:
+            db.close()
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.groups += 1
+            self.jobs += len(outcomes)
+            self._group_sizes.observe(len(outcomes))
+            self._commit_seconds.observe(elapsed)
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+    def _commit_individually(self, group: list[tuple]) -> None:
+        with self._lock:
+            self.fallbacks += 1
+        for job, future in group:
+            db = self.session_factory()
+            try:
+                future.set_result(run_with_retries(db, lambda: _job_and_commit(db, job)))
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                db.close()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "groups": self.groups,
+                "jobs": self.jobs,
+                "avg_group_size": round(self.jobs / self.groups, 2) if self.groups else 0,
+                "fallbacks": self.fallbacks,
+                "group_size": self._group_sizes.snapshot(),
+                "commit_seconds": self._commit_seconds.snapshot(),
+            }
+
+
+def _job_and_commit(db: Session, job: WriteJob):
+    result = job(db)
+    db.commit()
+    return result
+
+
+group_committer = GroupCommitter(new_session, settings.group_commit_window, settings.group_commit_max_size)
+registry.collector(lambda: stats_samples("app_group_commit", group_committer.stats(), "Group commit de escrituras"))
+
+
+def write_and_commit(db: Session, job: WriteJob):
+    """
+    Ejecuta la escritura `job(session)` y la confirma: en la sesión del request, o en el
+    writer de group commit si está activo. Reintenta ante contención. Retorna lo que
+    retorne el job (la respuesta ya serializada).
+    """
+    if settings.group_commit:
+        # Cerrar la transacción de lectura del request antes de esperar al writer
+        db.commit()
+        return group_committer.run(job)
+    return run_with_retries(db, lambda: _job_and_commit(db, job))
+
+
+async def write_and_commit_async(db: AsyncSession, job: WriteJob):
+    """Versión async de write_and_commit (el job síncrono corre vía run_sync)"""
+    if settings.group_commit:
+        await db.commit()
+        return await group_committer.run_async(job)
+
+    async def execute():
+        result = await db.run_sync(job)
+        await db.commit()
+        return result
+
+    return await run_with_retries_async(db, execute)
@@ -0,0 +1,59 @@
+import heapq
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from app.models.payment import Payment
+from app.models.transfer import Transfer
+from app.services.pagination import paginate
+from app.services.serialization import PAYMENT_COLUMNS, TRANSFER_COLUMNS
+
+
+def _date_range(stmt, model, created_from: Optional[datetime], created_to: Optional[datetime]):
+    # Rango semiabierto [created_from, created_to)
+    if created_from:
+        stmt = stmt.where(model.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(model.created_at < created_to)
+    return stmt
+
+
+def payments_page_stmt(
+    user_id: int,
+    status: Optional[str],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    cursor: Optional[str],
+    limit: int
+):
+    stmt = select(*PAYMENT_COLUMNS).where(Payment.user_id == user_id)
+    if status:
+        stmt = stmt.where(Payment.status == status)
+    stmt = _date_range(stmt, Payment, created_from, created_to)
+    return paginate(stmt, Payment, cursor, limit)
+
+
+def transfers_page_stmt(
+    column,
+    user_id: int,
+    status: Optional[str],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    cursor: Optional[str],
+    limit: int
+):
+    """Página de transferencias (filas por columnas) donde `column` (sender_id o receiver_id) es el usuario"""
+    stmt = select(*TRANSFER_COLUMNS).where(column == user_id)
+    if status:
+        stmt = stmt.where(Transfer.status == status)
+    stmt = _date_range(stmt, Transfer, created_from, created_to)
+    return paginate(stmt, Transfer, cursor, limit)
+
+
+def merge_transfer_rows(sent: list, received: list, limit: int) -> list:
+    """
+    Une las páginas de enviadas y recibidas en orden (created_at, id) descendente.
+    Cada lado ya viene ordenado y acotado a limit + 1, así que el merge es lineal;
+    emisor y receptor nunca coinciden, por lo que no hay duplicados.
+    """
+    merged = heapq.merge(sent, received, key=lambda t: (t.created_at, t.id), reverse=True)
+    return list(merged)[:limit + 1]
@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, TypeVar
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import event, select, update, delete
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.services.metrics import registry, stats_samples
+from app.models.idempotency_key import IdempotencyKey
+
+T = TypeVar("T")
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+class StoredResponse:
+    """Respuesta original de un request idempotente, lista para repetirse"""
+    __slots__ = ("request_hash", "status_code", "body")
+
+    def __init__(self, request_hash: str, status_code: int, body: str):
+        self.request_hash = request_hash
+        self.status_code = status_code
+        self.body = body
+
+    def to_response(self) -> JSONResponse:
+        return JSONResponse(
+            content=json.loads(self.body),
+            status_code=self.status_code,
+            headers={REPLAY_HEADER: "true"}
+        )
+
+
+class IdempotencyClaim:
+    """Resultado de reclamar una key: o se repite `replay`, o el request es dueño de la key"""
+    __slots__ = ("user_id", "scope", "key", "request_hash", "replay")
+
+    def __init__(self, user_id: int, scope: str, key: str, request_hash: str,
+                 replay: Optional[StoredResponse] = None):
+        self.user_id = user_id
+        self.scope = scope
+        self.key = key
+        self.request_hash = request_hash
+        self.replay = replay
+
+    @property
+    def cache_key(self) -> tuple:
+        return (self.user_id, self.scope, self.key)
+
+
+class ResponseCache:
+    """LRU en proceso de respuestas completadas (las keys calientes de un retry storm)"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple, tuple[float, StoredResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cache_key: tuple) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[0] <= time.time():
+                self._entries.pop(cache_key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, cache_key: tuple, expires_at: float, response: StoredResponse) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[cache_key] = (expires_at, response)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache(settings.idempotency_cache_size)
+registry.collector(lambda: stats_samples("app_idempotency_cache", response_cache.stats(), "Cache de respuestas idempotentes"))
+
+
+def request_fingerprint(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+def _check_same_request(claim: IdempotencyClaim, stored_hash: str) -> None:
+    if stored_hash != claim.request_hash:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key ya utilizada con un cuerpo de request distinto"
+        )
+
+
+def _cached_replay(claim: IdempotencyClaim) -> Optional[StoredResponse]:
+    cached = response_cache.get(claim.cache_key)
+    if cached is not None:
+        _check_same_request(claim, cached.request_hash)
+    return cached
+
+
+def _try_claim(db: Session, claim: IdempotencyClaim) -> Optional[str]:
+    """
+    Un intento de reclamar la key en la tabla.
+    Retorna None si el request quedó como dueño, COMPLETED (claim.replay cargado) o IN_PROGRESS.
+    """
+    now = datetime.utcnow()
+    try:
+        # Savepoint: si la key ya existe solo se descarta el INSERT
+        with db.begin_nested():
+            db.add(IdempotencyKey(
+                user_id=claim.user_id,
+                scope=claim.scope,
+                key=claim.key,
+                request_hash=claim.request_hash,
+                status=IN_PROGRESS,
+                expires_at=now + timedelta(seconds=settings.idempotency_lock_timeout)
+            ))
+        # Commit inmediato: los duplicados de otros workers ven la key en curso
+        db.commit()
+        return None
+    except IntegrityError:
+        pass
+
+    row = db.execute(
+        select(
+            IdempotencyKey.id, IdempotencyKey.request_hash, IdempotencyKey.status,
+            IdempotencyKey.status_code, IdempotencyKey.response_body, IdempotencyKey.expires_at
+        ).where(
+            IdempotencyKey.user_id == claim.user_id,
+            IdempotencyKey.scope == claim.scope,
+            IdempotencyKey.key == claim.key
+        )
+    ).first()
+    db.commit()
+    if row is None:
+        # Liberada entre el INSERT y la lectura: se reintenta
+        return IN_PROGRESS
+    if row.expires_at <= now:
+        # Respuesta vencida o request original abandonado: la key vuelve a estar libre
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == row.id, IdempotencyKey.expires_at <= now))
+        db.commit()
+        return IN_PROGRESS
+    _check_same_request(claim, row.request_hash)
+    if row.status != COMPLETED:
+        return IN_PROGRESS
+    claim.replay = StoredResponse(row.request_hash, row.status_code, row.response_body)
+    response_cache.put(claim.cache_key, _epoch(row.expires_at), claim.replay)
+    return COMPLETED
+
+
+def _epoch(when: datetime) -> float:
+    return time.time() + (when - datetime.utcnow()).total_seconds()
+
+
+def _request_in_progress() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail="Hay un request con la misma Idempotency-Key en curso. Reintente.",
+        headers={"Retry-After": "1"}
+    )
+
+
+def claim_key(db: Session, user_id: int, scope: str, key: str, payload: BaseModel) -> IdempotencyClaim:
+    """
+    Reclama la Idempotency-Key antes de procesar el request.
+    Si ya hay una respuesta se devuelve en claim.replay sin tocar validadores ni procesador;
+    si otro request la tiene en curso se espera a que termine.
+    """
+    claim = IdempotencyClaim(user_id, scope, key, request_fingerprint(payload))
+    deadline = time.monotonic() + settings.idempotency_wait_timeout
+    while True:
+        claim.replay = _cached_replay(claim)
+        if claim.replay is not None:
+            return claim
+        state = _try_claim(db, claim)
+        if state != IN_PROGRESS:
+            return claim
+        if time.monotonic() >= deadline:
+            raise _request_in_progress()
+        time.sleep(settings.idempotency_poll_interval)
+
+
+async def claim_key_async(db: AsyncSession, user_id: int, scope: str, key: str, payload: BaseModel) -> IdempotencyClaim:
+    """Versión async de claim_key (la espera no bloquea el event loop)"""
+    claim = IdempotencyClaim(user_id, scope, key, request_fingerprint(payload))
+    deadline = time.monotonic() + settings.idempotency_wait_timeout
+    while True:
+        claim.replay = _cached_replay(claim)
+        if claim.replay is not None:
+            return claim
+        state = await db.run_sync(_try_claim, claim)
+        if state != IN_PROGRESS:
+            return claim
+        if time.monotonic() >= deadline:
+            raise _request_in_progress()
+        await asyncio.sleep(settings.idempotency_poll_interval)
+
+
+def complete_key(db: Session, claim: IdempotencyClaim, status_code: int, response: BaseModel) -> None:
+    """
+    Guarda la respuesta en la misma transacción que crea el recurso. No hace commit:
+    la respuesta queda visible junto con el pago o la transferencia.
+    """
+    body = response.model_dump_json()
+    expires_at = datetime.utcnow() + timedelta(seconds=settings.idempotency_ttl)
+    db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.user_id == claim.user_id,
+            IdempotencyKey.scope == claim.scope,
+            IdempotencyKey.key == claim.key
+        )
+        .values(status=COMPLETED, status_code=status_code, response_body=body, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    stored = StoredResponse(claim.request_hash, status_code, body)
+    db.info.setdefault("idempotent_responses", []).append((claim.cache_key, _epoch(expires_at), stored))
+
+
+def release_key(db: Session, claim: IdempotencyClaim) -> None:
+    """El request falló: se libera la key para que un reintento vuelva a procesarlo"""
+    db.rollback()
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == claim.user_id,
+        IdempotencyKey.scope == claim.scope,
+        IdempotencyKey.key == claim.key,
+        IdempotencyKey.status == IN_PROGRESS
+    ))
+    db.commit()
+
+
+def run_idempotent(db: Session, user_id: int, scope: str, key: Optional[str], payload: BaseModel,
+                   operation: Callable[[Optional[IdempotencyClaim]], T]):
+    """
+    Ejecuta `operation(claim)` bajo la Idempotency-Key (o `operation(None)` si no vino).
+    La operación debe llamar a complete_key antes de su commit.
+    """
+    if not key:
+        return operation(None)
+    claim = claim_key(db, user_id, scope, key, payload)
+    if claim.replay is not None:
+        return claim.replay.to_response()
+    try:
+        return operation(claim)
+    except BaseException:
+        release_key(db, claim)
+        raise
+
+
+async def run_idempotent_async(db: AsyncSession, user_id: int, scope: str, key: Optional[str], payload: BaseModel,
+                               operation: Callable[[Optional[IdempotencyClaim]], Awaitable[T]]):
+    """Versión async de run_idempotent"""
+    if not key:
+        return await operation(None)
+    claim = await claim_key_async(db, user_id, scope, key, payload)
+    if claim.replay is not None:
+        return claim.replay.to_response()
+    try:
+        return await operation(claim)
+    except BaseException:
+        await db.run_sync(release_key, claim)
+        raise
+
+
+def purge_expired(db: Session) -> int:
+    """Borra keys vencidas. Retorna la cantidad de filas eliminadas."""
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+    db.commit()
+    return result.rowcount
+
+
+# Las respuestas entran al LRU recién cuando su transacción se confirma
+@event.listens_for(Session, "after_commit")
+def _cache_committed_responses(session):
+    for cache_key, expires_at, stored in session.info.pop("idempotent_responses", ()):
+        response_cache.put(cache_key, expires_at, stored)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_responses(session):
+    session.info.pop("idempotent_responses", None)
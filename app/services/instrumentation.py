@@ -0,0 +1,223 @@
+import functools
+import inspect
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app.config import settings
+from app.services.metrics import registry, COUNT_BUCKETS
+
+logger = logging.getLogger("app.slow_requests")
+
+# Operaciones SQL con label propio; el resto cuenta como OTHER
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "Duración de cada request por ruta")
+REQUEST_STATEMENTS = registry.histogram(
+    "http_request_db_statements", "Sentencias SQL ejecutadas por request", COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = registry.histogram("http_request_db_seconds", "Tiempo en la base de datos por request")
+REQUESTS_IN_FLIGHT = registry.gauge("http_requests_in_flight", "Requests en curso")
+STATEMENT_SECONDS = registry.histogram("db_statement_duration_seconds", "Duración de cada sentencia SQL")
+SECTION_SECONDS = registry.histogram("app_section_duration_seconds", "Duración de secciones calientes con nombre")
+
+
+class RequestMetrics:
+    """Lo que acumula un request: sentencias SQL, tiempo en la base y secciones"""
+    __slots__ = ("statements", "db_seconds", "sections", "statement_log")
+
+    def __init__(self, log_statements: bool):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.sections: dict[str, float] = {}
+        # (sql, segundos) solo si el log de requests lentas está activo
+        self.statement_log: Optional[list[tuple[str, float]]] = [] if log_statements else None
+
+
+# Las contextvars llegan al threadpool (run_in_threadpool copia el contexto) y a los
+# greenlets de AsyncSession; el writer de group commit corre fuera del request
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def record_section(name: str, seconds: float) -> None:
+    if not settings.metrics_enabled:
+        return
+    SECTION_SECONDS.observe(seconds, section=name)
+    request = _current.get()
+    if request is not None:
+        request.sections[name] = request.sections.get(name, 0.0) + seconds
+
+
+class timed_section:
+    """
+    Mide una sección con nombre, como context manager o decorador (funciones
+    síncronas o async). El tiempo va a app_section_duration_seconds y al request en curso.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_section(self.name, time.perf_counter() - self._started)
+        return False
+
+    def __call__(self, fn):
+        name = self.name
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed_section(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed_section(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+# Engines instrumentados (nombre -> engine): sus pools se reportan en cada scrape
+_engines: dict[str, object] = {}
+_engine_names: dict[object, str] = {}
+
+
+def _statement_operation(statement: str) -> str:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return operation if operation in SQL_OPERATIONS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    STATEMENT_SECONDS.observe(elapsed, engine=_engine_names.get(conn.engine, "other"),
+                              operation=_statement_operation(statement))
+    request = _current.get()
+    if request is not None:
+        request.statements += 1
+        request.db_seconds += elapsed
+        log = request.statement_log
+        if log is not None and len(log) < settings.slow_request_max_statements:
+            log.append((statement, elapsed))
+
+
+def _handle_error(context):
+    # La sentencia falló: descartar el inicio que dejó before_cursor_execute
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(sync_engine, name: str) -> None:
+    """Cuenta y cronometra las sentencias del engine (para el async, su sync_engine)"""
+    if not settings.metrics_enabled:
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    _engines[name] = sync_engine
+    _engine_names[sync_engine] = name
+
+
+@registry.collector
+def _pool_samples():
+    # Conexiones en uso contra el tamaño del pool (QueuePool; otros pools no lo exponen)
+    gauges = {
+        "db_pool_checked_out": ("Conexiones del pool en uso", "checkedout"),
+        "db_pool_size": ("Tamaño base del pool", "size"),
+        "db_pool_overflow": ("Conexiones de overflow abiertas (negativo: lugar libre en el pool base)", "overflow"),
+    }
+    collected = []
+    for metric, (help, method) in gauges.items():
+        samples = [
+            ({"engine": name}, float(getattr(engine.pool, method)()))
+            for name, engine in _engines.items()
+            if hasattr(engine.pool, method)
+        ]
+        collected.append((metric, "gauge", help, samples))
+    return collected
+
+
+@registry.collector
+def _threadpool_samples():
+    # Tokens del limiter de anyio: threads que atienden endpoints y dependencias síncronas.
+    # Solo se puede leer desde el event loop (GET /metrics es async)
+    try:
+        from anyio.to_thread import current_default_thread_limiter
+        statistics = current_default_thread_limiter().statistics()
+    except Exception:
+        return []
+    return [
+        ("threadpool_tokens_borrowed", "gauge", "Threads del threadpool en uso", [({}, float(statistics.borrowed_tokens))]),
+        ("threadpool_tokens_total", "gauge", "Tamaño del threadpool", [({}, float(statistics.total_tokens))]),
+        ("threadpool_tasks_waiting", "gauge", "Tareas esperando un thread libre", [({}, float(statistics.tasks_waiting))]),
+    ]
+
+
+def _log_slow_request(method: str, route: str, status: int, elapsed: float, request: RequestMetrics) -> None:
+    lines = [
+        f"Request lenta: {method} {route} -> {status} en {elapsed * 1000:.1f} ms "
+        f"({request.statements} sentencias, {request.db_seconds * 1000:.1f} ms en la base)"
+    ]
+    for name, seconds in sorted(request.sections.items(), key=lambda item: -item[1]):
+        lines.append(f"  sección {name}: {seconds * 1000:.1f} ms")
+    for statement, seconds in request.statement_log or ():
+        lines.append(f"  {seconds * 1000:8.2f} ms  {' '.join(statement.split())}")
+    if request.statements > len(request.statement_log or ()):
+        lines.append(f"  ... {request.statements - len(request.statement_log or ())} sentencias más")
+    logger.warning("\n".join(lines))
+
+
+class MetricsMiddleware:
+    """
+    Duración, sentencias SQL y tiempo en la base por request, etiquetados por
+    template de ruta ("/payments/{payment_id}"): así la cardinalidad no depende de los ids.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        slow_threshold = settings.slow_request_threshold
+        request = RequestMetrics(log_statements=slow_threshold > 0)
+        token = _current.set(request)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.inc(-1)
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=str(status))
+            REQUEST_STATEMENTS.observe(request.statements, method=method, route=route)
+            REQUEST_DB_SECONDS.observe(request.db_seconds, method=method, route=route)
+            if 0 < slow_threshold <= elapsed:
+                _log_slow_request(method, route, status, elapsed, request)
@@ -0,0 +1,381 @@
+import logging
+import threading
+import uuid
+from datetime import datetime
+from itertools import groupby
+from typing import Callable, Iterable, Optional
+from sqlalchemy import select, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import new_session
+from app.models.ledger import LedgerEntry, LedgerSnapshot
+from app.models.user import User
+from app.services.metrics import registry, stats_samples
+
+logger = logging.getLogger(__name__)
+
+# Cuentas del libro mayor: (account_type, account_id)
+USER = "user"
+CARD = "card"
+# Cuentas del sistema (account_id 0): contrapartidas fuera de la app
+FUNDING = "funding"  # origen de los depósitos
+GATEWAY = "gateway"  # destino de los pagos con tarjeta aprobados
+OPENING = "opening"  # saldos anteriores al libro mayor
+SYSTEM = 0
+
+entries_table = LedgerEntry.__table__
+
+
+def _legs(journal: str, legs: list[tuple]) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {"journal": journal, "account_type": account_type, "account_id": account_id, "amount": amount, "created_at": now}
+        for account_type, account_id, amount in legs
+    ]
+
+
+def deposit_entries(user_id: int, amount: int) -> list[dict]:
+    return _legs(f"deposit:{uuid.uuid4().hex}", [(USER, user_id, amount), (FUNDING, SYSTEM, -amount)])
+
+
+def transfer_entries(transfer_id: int, sender_id: int, receiver_id: int, amount: int) -> list[dict]:
+    return _legs(f"transfer:{transfer_id}", [(USER, sender_id, -amount), (USER, receiver_id, amount)])
+
+
+def payment_entries(payment_id: int, card_id: int, amount: int) -> list[dict]:
+    # El pago se cobra a la tarjeta: no mueve el saldo del usuario
+    return _legs(f"payment:{payment_id}", [(CARD, card_id, -amount), (GATEWAY, SYSTEM, amount)])
+
+
+def append_entries(db: Session, entries: list[dict]) -> None:
+    """
+    Inserta los asientos en un único executemany. No hace commit: va en la misma
+    transacción que el movimiento.
+    """
+    if entries:
+        db.execute(entries_table.insert(), entries)
+
+
+async def append_entries_async(db: AsyncSession, entries: list[dict]) -> None:
+    if entries:
+        await db.execute(entries_table.insert(), entries)
+
+
+# Locks de las filas de users por movimiento (PostgreSQL; MySQL solo distingue
+# compartido de exclusivo). Ninguno escribe la fila
+_LOCK_MODES = {
+    "debit": {"key_share": True},  # FOR NO KEY UPDATE
+    "credit": {"read": True, "key_share": True},  # FOR KEY SHARE
+}
+
+
+def lock_statements(debit_ids: Iterable[int] = (), credit_ids: Iterable[int] = ()) -> list:
+    """
+    SELECT ... FOR UPDATE de las filas de users de un movimiento, en orden de id: dos
+    movimientos cruzados no se esperan en orden inverso. Las filas no se modifican, el
+    lock solo ordena los asientos de cada cuenta:
+    - débito: dos débitos de la misma cuenta se serializan y el segundo verifica el saldo
+      con el primero ya asentado
+    - crédito: los créditos a una cuenta no se esperan entre sí ni a los débitos
+    El snapshot toma FOR UPDATE, que espera a ambos. En SQLite el FOR UPDATE no se emite:
+    el INSERT de los asientos toma el lock de escritura de la base.
+    """
+    modes = {user_id: "credit" for user_id in credit_ids}
+    modes.update({user_id: "debit" for user_id in debit_ids})
+    return [
+        select(User.id)
+        .where(User.id.in_([user_id for user_id, _ in rows]))
+        .order_by(User.id)
+        .with_for_update(**_LOCK_MODES[mode])
+        for mode, rows in groupby(sorted(modes.items()), key=lambda item: item[1])
+    ]
+
+
+def lock_accounts(db: Session, debit_ids: Iterable[int] = (), credit_ids: Iterable[int] = ()) -> None:
+    """Toma los locks de lock_statements. Llamar antes de asentar el movimiento."""
+    for stmt in lock_statements(debit_ids, credit_ids):
+        db.execute(stmt).all()
+
+
+async def lock_accounts_async(db: AsyncSession, debit_ids: Iterable[int] = (), credit_ids: Iterable[int] = ()) -> None:
+    for stmt in lock_statements(debit_ids, credit_ids):
+        (await db.execute(stmt)).all()
+
+
+def _latest_snapshot_stmt(account_type: str, account_id: int):
+    return (
+        select(LedgerSnapshot.last_entry_id, LedgerSnapshot.balance)
+        .where(LedgerSnapshot.account_type == account_type, LedgerSnapshot.account_id == account_id)
+        .order_by(LedgerSnapshot.last_entry_id.desc())
+        .limit(1)
+    )
+
+
+def _tail_stmt(account_type: str, account_id: int, after_id: int):
+    return select(func.count(), func.coalesce(func.sum(LedgerEntry.amount), 0), func.max(LedgerEntry.id)).where(
+        LedgerEntry.account_type == account_type,
+        LedgerEntry.account_id == account_id,
+        LedgerEntry.id > after_id
+    )
+
+
+def account_balance(db: Session, account_type: str, account_id: int) -> dict:
+    """
+    Saldo de la cuenta: último snapshot más la cola de asientos posteriores. Es el saldo
+    de la cuenta de usuario (User.ledger_balance es la misma cuenta en SQL).
+    Retorna {"balance", "tail": asientos sumados después del snapshot, "last_entry_id"}.
+    """
+    snapshot = db.execute(_latest_snapshot_stmt(account_type, account_id)).first()
+    last_entry_id, balance = snapshot if snapshot else (0, 0)
+    tail, total, max_id = db.execute(_tail_stmt(account_type, account_id, last_entry_id)).one()
+    return {"balance": balance + int(total), "tail": tail, "last_entry_id": max_id or last_entry_id}
+
+
+def snapshot_account(db: Session, user_id: int, min_entries: int = 1) -> Optional[dict]:
+    """
+    Escribe un snapshot de la cuenta del usuario si la cola desde el anterior tiene al
+    menos min_entries asientos. Retorna el snapshot escrito o None. Hace commit.
+    """
+    # Primero sin lock: la mayoría de las cuentas no llega al mínimo
+    if account_balance(db, USER, user_id)["tail"] < min_entries:
+        db.rollback()
+        return None
+    db.rollback()
+    # FOR UPDATE espera a los movimientos de la cuenta en curso (ver lock_statements) y
+    # frena los nuevos: no queda en vuelo ningún asiento con id menor al leído. En SQLite
+    # no hace falta: con un solo escritor los ids se confirman en orden
+    db.execute(select(User.id).where(User.id == user_id).with_for_update()).all()
+    current = account_balance(db, USER, user_id)
+    if current["tail"] < min_entries:
+        db.rollback()
+        return None
+    db.add(LedgerSnapshot(
+        account_type=USER,
+        account_id=user_id,
+        last_entry_id=current["last_entry_id"],
+        balance=current["balance"]
+    ))
+    db.commit()
+    return current
+
+
+class LedgerSnapshotter:
+    """
+    Snapshots incrementales en un thread en segundo plano. Cada pasada revisa solo las
+    cuentas de usuario con asientos nuevos desde la anterior (recorrido por id) y escribe
+    snapshot de las que acumularon min_entries asientos: así la cola que suma
+    account_balance se mantiene corta.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float, min_entries: int):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.min_entries = min_entries
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Último asiento revisado
+        self.cursor = 0
+        self.runs = 0
+        self.snapshots = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def run_once(self) -> int:
+        """Una pasada. Retorna la cantidad de snapshots escritos."""
+        written = 0
+        with self.session_factory() as db:
+            head = db.execute(select(func.max(LedgerEntry.id))).scalar() or 0
+            touched = db.execute(
+                select(LedgerEntry.account_id)
+                .where(LedgerEntry.id > self.cursor, LedgerEntry.id <= head, LedgerEntry.account_type == USER)
+                .distinct()
+            ).scalars().all()
+            db.rollback()
+            for user_id in touched:
+                try:
+                    written += snapshot_account(db, user_id, self.min_entries) is not None
+                except IntegrityError:
+                    # Otro worker escribió el mismo snapshot
+                    db.rollback()
+        # Un asiento con id menor a head todavía sin confirmar no se pierde: su cuenta
+        # queda en la cola y se revisa la próxima vez que reciba un asiento
+        self.cursor = head
+        self.runs += 1
+        self.snapshots += written
+        return written
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ledger-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Error al escribir snapshots del libro mayor")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "runs": self.runs,
+            "snapshots": self.snapshots,
+            "errors": self.errors,
+            "cursor": self.cursor,
+        }
+
+
+def open_accounts(db: Session, batch_size: int = 1000) -> int:
+    """
+    Pasa al libro mayor los saldos anteriores a él: asienta como apertura (journal
+    opening:<user_id>) la diferencia entre users.balance y los asientos de la cuenta, y
+    deja users.balance en 0. Solo recorre las cuentas con users.balance distinto de 0, por
+    lotes y con sus filas bloqueadas. Se puede repetir. Una cuenta ya abierta cuya
+    diferencia no es 0 no se toca: la reporta verify_ledger.
+    Retorna la cantidad de cuentas abiertas.
+    """
+    opened = 0
+    last_id = 0
+    while True:
+        user_ids = db.execute(
+            select(User.id).where(User.id > last_id, User.balance != 0).order_by(User.id).limit(batch_size)
+        ).scalars().all()
+        db.rollback()
+        if not user_ids:
+            return opened
+        lock_accounts(db, debit_ids=user_ids)
+        balances = dict(db.execute(select(User.id, User.balance).where(User.id.in_(user_ids))).all())
+        ledger = dict(db.execute(
+            select(LedgerEntry.account_id, func.sum(LedgerEntry.amount))
+            .where(LedgerEntry.account_type == USER, LedgerEntry.account_id.in_(user_ids))
+            .group_by(LedgerEntry.account_id)
+        ).all())
+        already_open = set(db.execute(
+            select(LedgerEntry.account_id).where(
+                LedgerEntry.journal.in_([f"opening:{user_id}" for user_id in user_ids]),
+                LedgerEntry.account_type == USER
+            )
+        ).scalars())
+        entries = []
+        cleared = []
+        for user_id in user_ids:
+            difference = (balances[user_id] or 0) - int(ledger.get(user_id) or 0)
+            if difference and user_id in already_open:
+                continue
+            if difference:
+                entries.extend(_legs(f"opening:{user_id}", [(USER, user_id, difference), (OPENING, SYSTEM, -difference)]))
+                opened += 1
+            cleared.append(user_id)
+        append_entries(db, entries)
+        if cleared:
+            db.execute(
+                update(User).where(User.id.in_(cleared)).values(balance=0).execution_options(synchronize_session=False)
+            )
+        db.commit()
+        last_id = user_ids[-1]
+
+
+def has_unopened_accounts(db: Session) -> bool:
+    """Hay saldos en users.balance que todavía no pasaron al libro mayor (open_accounts)"""
+    return db.execute(select(User.id).where(User.balance != 0).limit(1)).first() is not None
+
+
+def _consistent_read(db: Session) -> None:
+    # Todas las lecturas del verificador sobre la misma foto de la base (en SQLite una
+    # transacción de lectura ya lo es)
+    if db.get_bind().dialect.name != "sqlite":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def verify_ledger(db: Session, user_id: Optional[int] = None) -> list[dict]:
+    """
+    Recorre el libro mayor y retorna las inconsistencias:
+    - journal: movimientos cuyas patas no suman 0
+    - snapshot: snapshots que no coinciden con el replay de los asientos hasta last_entry_id
+    - negative: cuentas de usuario con saldo negativo en el replay completo
+    - unopened: users.balance distinto de 0, saldo anterior que no pasó al libro mayor
+    """
+    _consistent_read(db)
+    mismatches = []
+
+    unbalanced = select(LedgerEntry.journal, func.sum(LedgerEntry.amount)).group_by(LedgerEntry.journal)
+    if user_id is not None:
+        unbalanced = unbalanced.where(LedgerEntry.journal.in_(
+            select(LedgerEntry.journal).where(LedgerEntry.account_type == USER, LedgerEntry.account_id == user_id)
+        ))
+    for journal, total in db.execute(unbalanced.having(func.sum(LedgerEntry.amount) != 0)):
+        mismatches.append({"type": "journal", "journal": journal, "sum": int(total)})
+
+    snapshots_query = select(LedgerSnapshot.account_id, LedgerSnapshot.last_entry_id, LedgerSnapshot.balance).where(
+        LedgerSnapshot.account_type == USER
+    )
+    entries_query = select(LedgerEntry.account_id, LedgerEntry.id, LedgerEntry.amount).where(LedgerEntry.account_type == USER)
+    users_query = select(User.id, User.balance).where(User.balance != 0)
+    if user_id is not None:
+        snapshots_query = snapshots_query.where(LedgerSnapshot.account_id == user_id)
+        entries_query = entries_query.where(LedgerEntry.account_id == user_id)
+        users_query = users_query.where(User.id == user_id)
+
+    snapshots: dict[int, list] = {}
+    for account_id, last_entry_id, balance in db.execute(snapshots_query.order_by(LedgerSnapshot.last_entry_id)):
+        snapshots.setdefault(account_id, []).append((last_entry_id, balance))
+
+    replayed: dict[int, int] = {}
+    rows = db.execute(
+        entries_query.order_by(LedgerEntry.account_id, LedgerEntry.id).execution_options(yield_per=1000)
+    )
+    for account_id, entries in groupby(rows, key=lambda row: row[0]):
+        pending = snapshots.pop(account_id, [])
+        running = 0
+        for _, entry_id, amount in entries:
+            while pending and pending[0][0] < entry_id:
+                mismatches.extend(_check_snapshot(account_id, pending.pop(0), running))
+            running += amount
+        for snapshot in pending:
+            mismatches.extend(_check_snapshot(account_id, snapshot, running))
+        replayed[account_id] = running
+    # Snapshots de cuentas sin asientos
+    for account_id, pending in snapshots.items():
+        for snapshot in pending:
+            mismatches.extend(_check_snapshot(account_id, snapshot, 0))
+
+    for owner_id, balance in sorted(replayed.items()):
+        if balance < 0:
+            mismatches.append({"type": "negative", "user_id": owner_id, "ledger": balance})
+    for owner_id, balance in db.execute(users_query.order_by(User.id)):
+        mismatches.append({"type": "unopened", "user_id": owner_id, "balance": balance})
+    db.rollback()
+    return mismatches
+
+
+def _check_snapshot(account_id: int, snapshot: tuple, replayed: int) -> list[dict]:
+    last_entry_id, balance = snapshot
+    if balance == replayed:
+        return []
+    return [{
+        "type": "snapshot",
+        "user_id": account_id,
+        "last_entry_id": last_entry_id,
+        "snapshot": balance,
+        "replayed": replayed
+    }]
+
+
+ledger_snapshotter = LedgerSnapshotter(new_session, settings.ledger_snapshot_interval, settings.ledger_snapshot_min_entries)
+registry.collector(lambda: stats_samples("app_ledger_snapshots", ledger_snapshotter.stats(), "Snapshots del libro mayor"))
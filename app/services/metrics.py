@@ -0,0 +1,169 @@
+import bisect
+import math
+import threading
+from typing import Callable, Iterable
+
+# Límites superiores (segundos) de los buckets de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets de cantidad (sentencias SQL por request, tamaños de lote...)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# (nombre, tipo, ayuda, [(labels, valor)]): el valor de un histograma es su snapshot()
+MetricSamples = tuple[str, str, str, list[tuple[dict, object]]]
+
+
+class Histogram:
+    """Histograma acumulativo estilo Prometheus. No es thread-safe: lo protege quien lo usa."""
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip((*self.bounds, "+Inf"), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": round(self.sum, 6)}
+
+
+class MetricFamily:
+    """Métrica con labels (counter, gauge o histogram), thread-safe"""
+
+    def __init__(self, name: str, kind: str, help: str, bounds: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.bounds = bounds
+        self._lock = threading.Lock()
+        self._children: dict[tuple, object] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self._children.get(key)
+            if histogram is None:
+                histogram = self._children[key] = Histogram(self.bounds)
+            histogram.observe(value)
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._children[key] = self._children.get(key, 0.0) + value
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._children[tuple(sorted(labels.items()))] = value
+
+    def collect(self) -> MetricSamples:
+        with self._lock:
+            samples = [
+                (dict(key), child.snapshot() if isinstance(child, Histogram) else child)
+                for key, child in self._children.items()
+            ]
+        return self.name, self.kind, self.help, samples
+
+
+class MetricsRegistry:
+    """
+    Métricas del proceso en el formato de texto de Prometheus. Además de las familias
+    propias acepta collectors: funciones que se evalúan en cada scrape (gauges de
+    saturación, stats() de los componentes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: dict[str, MetricFamily] = {}
+        self._collectors: list[Callable[[], Iterable[MetricSamples]]] = []
+
+    def _family(self, name: str, kind: str, help: str, bounds: tuple = LATENCY_BUCKETS) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, kind, help, bounds)
+            return family
+
+    def counter(self, name: str, help: str) -> MetricFamily:
+        return self._family(name, "counter", help)
+
+    def gauge(self, name: str, help: str) -> MetricFamily:
+        return self._family(name, "gauge", help)
+
+    def histogram(self, name: str, help: str, bounds: tuple = LATENCY_BUCKETS) -> MetricFamily:
+        return self._family(name, "histogram", help, bounds)
+
+    def collector(self, fn: Callable[[], Iterable[MetricSamples]]) -> Callable:
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def collect(self) -> list[MetricSamples]:
+        with self._lock:
+            families = list(self._families.values())
+            collectors = list(self._collectors)
+        collected = [family.collect() for family in families]
+        for fn in collectors:
+            collected.extend(fn())
+        return collected
+
+    def render(self) -> str:
+        lines = []
+        for name, kind, help, samples in self.collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind == "histogram":
+                    for bound, cumulative in value["buckets"].items():
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(value['sum'])}")
+                    lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if value.is_integer() else repr(value)
+
+
+def stats_samples(prefix: str, stats: dict, help: str) -> list[MetricSamples]:
+    """
+    Traduce el stats() de un componente a métricas: números y booleanos como
+    untyped, snapshots de Histogram como histogram; los dicts anidados suman su
+    clave al nombre y el resto (textos, None) se omite.
+    """
+    collected = []
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict) and "buckets" in value:
+            collected.append((name, "histogram", help, [({}, value)]))
+        elif isinstance(value, dict):
+            collected.extend(stats_samples(name, value, help))
+        elif isinstance(value, (bool, int, float)):
+            collected.append((name, "untyped", help, [({}, float(value))]))
+    return collected
+
+
+# Registro del proceso: lo expone GET /metrics
+registry = MetricsRegistry()
@@ -0,0 +1,66 @@
+import math
+from decimal import Decimal, ROUND_HALF_EVEN
+from functools import lru_cache
+from app.config import settings
+
+# Montos en unidades menores (centavos para USD) en columnas BIGINT
+MAX_MINOR = 2 ** 63 - 1
+
+
+def exponent(currency: str) -> int:
+    """Decimales de la moneda (ISO 4217): 2 salvo las configuradas en currency_exponents"""
+    return settings.currency_exponents.get(currency.upper(), settings.default_currency_exponent)
+
+
+def to_minor(amount: float, currency: str) -> int:
+    """
+    Monto decimal a unidades menores de la moneda, redondeado a sus decimales.
+    Pasa por el repr del float (10.1 -> "10.1"), no por su valor binario (10.0999...).
+    """
+    if not math.isfinite(amount):
+        raise ValueError("Monto inválido")
+    minor = int((Decimal(repr(amount)).scaleb(exponent(currency))).to_integral_value(ROUND_HALF_EVEN))
+    if abs(minor) > MAX_MINOR:
+        raise ValueError("Monto fuera de rango")
+    return minor
+
+
+def to_major(minor: int, currency: str) -> float:
+    """Unidades menores a monto decimal (float) para las respuestas JSON"""
+    places = exponent(currency)
+    return minor / 10 ** places if places else float(minor)
+
+
+def account_minor(minor: int, currency: str) -> int:
+    """
+    Monto en unidades menores de la moneda de la cuenta (saldo, límites y contadores).
+    No hay conversión de cambio: solo se ajustan los decimales, como el valor
+    nominal que usaban los floats. Falla si el monto no es exacto en la cuenta.
+    """
+    shift = exponent(settings.account_currency) - exponent(currency)
+    if shift >= 0:
+        return minor * 10 ** shift
+    scaled, remainder = divmod(minor, 10 ** -shift)
+    if remainder:
+        raise ValueError(f"El monto tiene más decimales de los que admite {settings.account_currency}")
+    return scaled
+
+
+def format_amount(minor: int, currency: str) -> str:
+    """Unidades menores como texto con los decimales de la moneda ("12.50")"""
+    places = exponent(currency)
+    return f"{Decimal(minor).scaleb(-places):.{places}f}"
+
+
+@lru_cache(maxsize=64)
+def limit_minor(amount: float) -> int:
+    """Límite de configuración (monto decimal) en unidades menores de la cuenta"""
+    return to_minor(amount, settings.account_currency)
+
+
+def account_to_major(minor: int) -> float:
+    return to_major(minor, settings.account_currency)
+
+
+def format_account_amount(minor: int) -> str:
+    return format_amount(minor, settings.account_currency)
@@ -0,0 +1,209 @@
+import time
+from typing import Optional
+from sqlalchemy import MetaData, bindparam, column, func, inspect, select, table, text, update
+from sqlalchemy.schema import AddConstraint, CheckConstraint, DropConstraint
+from sqlalchemy.sql import sqltypes
+from app.config import settings
+from app.database import Base
+from app.services.money import to_minor
+import app.models  # noqa: F401  registra todas las tablas en Base.metadata
+
+# Columnas de dinero que antes eran FLOAT: (tabla, columna, columna de moneda, se modifica)
+# Sin columna de moneda el monto está en la moneda de la cuenta. Las filas que se
+# modifican (saldos, contadores) se vuelven a copiar completas al finalizar.
+MONEY_COLUMNS = (
+    ("payments", "amount", "currency", False),
+    ("transfers", "amount", "currency", False),
+    ("users", "balance", None, True),
+    ("user_spend_windows", "amount", None, True),
+)
+
+# Columna BIGINT que se llena mientras la anterior sigue en uso
+SHADOW_SUFFIX = "_minor"
+
+
+def _columns(inspector, table_name: str) -> dict:
+    return {info["name"]: info for info in inspector.get_columns(table_name)}
+
+
+def legacy_money_columns(sync_engine) -> list[str]:
+    """Columnas de dinero que todavía son FLOAT en la base ("tabla.columna")"""
+    inspector = inspect(sync_engine)
+    existing = set(inspector.get_table_names())
+    legacy = []
+    for table_name, column_name, _, _ in MONEY_COLUMNS:
+        if table_name not in existing:
+            continue
+        info = _columns(inspector, table_name).get(column_name)
+        if info is not None and isinstance(info["type"], sqltypes.Float):
+            legacy.append(f"{table_name}.{column_name}")
+    return legacy
+
+
+def _spec(qualified: str) -> tuple:
+    table_name, column_name = qualified.split(".")
+    return next(spec for spec in MONEY_COLUMNS if spec[:2] == (table_name, column_name))
+
+
+def _legacy_table(table_name: str, column_name: str, currency_column: Optional[str]):
+    # Tabla liviana con las columnas de la migración: el modelo ya declara la columna como BIGINT
+    columns = [column("id"), column(column_name), column(column_name + SHADOW_SUFFIX)]
+    if currency_column:
+        columns.append(column(currency_column))
+    return table(table_name, *columns)
+
+
+def add_shadow_columns(sync_engine) -> list[str]:
+    """Agrega la columna BIGINT junto a cada columna FLOAT. Retorna las columnas agregadas."""
+    inspector = inspect(sync_engine)
+    added = []
+    for qualified in legacy_money_columns(sync_engine):
+        table_name, column_name = qualified.split(".")
+        shadow = column_name + SHADOW_SUFFIX
+        if shadow in _columns(inspector, table_name):
+            continue
+        with sync_engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {shadow} BIGINT"))
+        added.append(f"{table_name}.{shadow}")
+    return added
+
+
+def backfill_column(sync_engine, qualified: str, batch_size: int = 1000, pause: float = 0.0,
+                    only_missing: bool = False) -> int:
+    """
+    Copia la columna FLOAT a la BIGINT en lotes por id, cada lote en su propia
+    transacción corta: la app puede seguir escribiendo mientras tanto. La conversión
+    es la misma que aplican los schemas (money.to_minor). Retorna las filas escritas.
+    """
+    table_name, column_name, currency_column, _ = _spec(qualified)
+    legacy = _legacy_table(table_name, column_name, currency_column)
+    amount = legacy.c[column_name]
+    shadow = legacy.c[column_name + SHADOW_SUFFIX]
+    currency = legacy.c[currency_column] if currency_column else None
+
+    stmt = select(legacy.c.id, amount, *([currency] if currency is not None else []))
+    if only_missing:
+        stmt = stmt.where(shadow.is_(None), amount.is_not(None))
+    write = update(legacy).where(legacy.c.id == bindparam("row_id")).values({shadow: bindparam("minor")})
+
+    last_id = 0
+    written = 0
+    while True:
+        with sync_engine.begin() as conn:
+            rows = conn.execute(stmt.where(legacy.c.id > last_id).order_by(legacy.c.id).limit(batch_size)).all()
+            if not rows:
+                return written
+            conn.execute(write, [
+                {
+                    "row_id": row[0],
+                    "minor": None if row[1] is None else to_minor(
+                        row[1], (row[2] if currency is not None else None) or settings.account_currency
+                    ),
+                }
+                for row in rows
+            ])
+        last_id = rows[-1][0]
+        written += len(rows)
+        if pause:
+            time.sleep(pause)
+
+
+def pending_rows(sync_engine, qualified: str) -> Optional[int]:
+    """Filas sin copiar a la columna BIGINT (None si todavía no se agregó)"""
+    table_name, column_name, currency_column, _ = _spec(qualified)
+    if column_name + SHADOW_SUFFIX not in _columns(inspect(sync_engine), table_name):
+        return None
+    legacy = _legacy_table(table_name, column_name, currency_column)
+    shadow = legacy.c[column_name + SHADOW_SUFFIX]
+    with sync_engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(legacy).where(shadow.is_(None), legacy.c[column_name].is_not(None))
+        ).scalar()
+
+
+def _money_checks(model, column_name: str) -> list:
+    return [
+        constraint for constraint in model.constraints
+        if isinstance(constraint, CheckConstraint) and column_name in str(constraint.sqltext)
+    ]
+
+
+def _swap_column(conn, qualified: str) -> None:
+    """Reemplaza la columna FLOAT por la BIGINT con el mismo nombre (PostgreSQL, MySQL)"""
+    table_name, column_name, _, _ = _spec(qualified)
+    model = Base.metadata.tables[table_name]
+    shadow = column_name + SHADOW_SUFFIX
+    nullable = model.c[column_name].nullable
+    checks = _money_checks(model, column_name)
+    for check in checks:
+        conn.execute(DropConstraint(check))
+    if conn.dialect.name == "mysql":
+        conn.execute(text(
+            f"ALTER TABLE {table_name} DROP COLUMN {column_name}, "
+            f"CHANGE COLUMN {shadow} {column_name} BIGINT {'NULL' if nullable else 'NOT NULL'}"
+        ))
+    else:
+        conn.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {column_name}"))
+        conn.execute(text(f"ALTER TABLE {table_name} RENAME COLUMN {shadow} TO {column_name}"))
+        if not nullable:
+            conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {column_name} SET NOT NULL"))
+    for check in checks:
+        conn.execute(AddConstraint(check))
+
+
+def _rebuild_sqlite_table(conn, qualified: str) -> None:
+    """
+    SQLite no cambia tipos ni borra columnas usadas en un CHECK: se recrea la tabla
+    desde el modelo, se copian las filas tomando la columna BIGINT y se recrean los índices.
+    """
+    table_name, column_name, _, _ = _spec(qualified)
+    # Copia de todas las tablas: las foreign keys de la tabla nueva se resuelven contra ellas
+    metadata = MetaData()
+    for model_table in Base.metadata.sorted_tables:
+        model_table.to_metadata(metadata)
+    model = Base.metadata.tables[table_name]
+    rebuilt = metadata.tables[table_name].to_metadata(metadata, name=f"{table_name}_money")
+    # Los índices se crean con su nombre después de borrar la tabla anterior
+    rebuilt.indexes.clear()
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {rebuilt.name}"))
+    rebuilt.create(conn)
+    target = ", ".join(model_column.name for model_column in model.columns)
+    source = ", ".join(
+        column_name + SHADOW_SUFFIX if model_column.name == column_name else model_column.name
+        for model_column in model.columns
+    )
+    conn.execute(text(f"INSERT INTO {rebuilt.name} ({target}) SELECT {source} FROM {table_name}"))
+    conn.execute(text(f"DROP TABLE {table_name}"))
+    conn.execute(text(f"ALTER TABLE {rebuilt.name} RENAME TO {table_name}"))
+    for index in model.indexes:
+        index.create(conn)
+
+
+def finalize(sync_engine, batch_size: int = 1000) -> dict:
+    """
+    Última pasada y reemplazo de las columnas FLOAT. Correr con las escrituras detenidas
+    (entre el deploy anterior y el nuevo): copia las filas insertadas desde el backfill,
+    vuelve a copiar completas las tablas que se modifican y cambia las columnas.
+    Retorna {"tabla.columna": filas copiadas en la última pasada}.
+    """
+    add_shadow_columns(sync_engine)
+    legacy = legacy_money_columns(sync_engine)
+    copied = {
+        qualified: backfill_column(sync_engine, qualified, batch_size, only_missing=not _spec(qualified)[3])
+        for qualified in legacy
+    }
+    if sync_engine.dialect.name == "sqlite":
+        with sync_engine.connect() as conn:
+            # Fuera de una transacción: con foreign keys activas DROP TABLE users fallaría
+            # por las filas de otras tablas que la referencian
+            conn.execute(text("PRAGMA foreign_keys=OFF"))
+            conn.commit()
+            with conn.begin():
+                for qualified in legacy:
+                    _rebuild_sqlite_table(conn, qualified)
+    else:
+        with sync_engine.begin() as conn:
+            for qualified in legacy:
+                _swap_column(conn, qualified)
+    return copied
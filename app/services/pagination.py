@@ -0,0 +1,46 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Cursor opaco con la posición (created_at, id) del último elemento de la página"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def keyset_filter(model, cursor: str):
+    """Condición "posterior al cursor" en orden (created_at DESC, id DESC)"""
+    created_at, row_id = decode_cursor(cursor)
+    # Comparación de row values: el motor la resuelve como rango sobre (user_id, created_at, id)
+    return tuple_(model.created_at, model.id) < (created_at, row_id)
+
+
+def paginate(stmt, model, cursor: Optional[str], limit: int):
+    """Ordena por (created_at, id) descendente, aplica el cursor y pide una fila extra"""
+    if cursor:
+        stmt = stmt.where(keyset_filter(model, cursor))
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def build_page(rows: list, limit: int) -> dict:
+    """Arma la página a partir de limit + 1 filas: la extra indica que hay más"""
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return {"items": items, "next_cursor": next_cursor}
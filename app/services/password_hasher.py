@@ -0,0 +1,145 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+from app.config import settings
+from app.services.instrumentation import timed_section
+from app.services.metrics import registry, stats_samples
+
+# Pendientes por defecto hasta conocer el threadpool: un cuarto de los 40 threads de anyio
+DEFAULT_MAX_PENDING = 10
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    # Se ejecuta en el proceso worker
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def _verify_password(password: str, hashed_password: str) -> bool:
+    # Se ejecuta en el proceso worker
+    return bcrypt.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool de procesos dedicado, fuera del threadpool y del GIL
+    que atienden los pagos. La cantidad de operaciones pendientes está acotada:
+    al superarla se responde 503 con Retry-After en lugar de encolar. Con max_pending
+    0 el tope sale del threadpool (fit_threadpool).
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers or os.cpu_count() or 1
+        self.fixed_max_pending = bool(max_pending)
+        self.max_pending = max_pending or DEFAULT_MAX_PENDING
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self._latency = {
+            "hash": {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+            "verify": {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # spawn: no heredar conexiones ni threads del proceso de la app
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _submit(self, operation: str, fn, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Servicio de autenticación saturado. Reintente en unos segundos.",
+                    headers={"Retry-After": str(settings.password_hash_retry_after)}
+                )
+            self.pending += 1
+            executor = self._get_executor()
+        started = time.perf_counter()
+
+        def done(_future):
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.pending -= 1
+                latency = self._latency[operation]
+                latency["count"] += 1
+                latency["total_seconds"] += elapsed
+                latency["max_seconds"] = max(latency["max_seconds"], elapsed)
+
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(done)
+        return future
+
+    @timed_section("bcrypt_hash")
+    def hash(self, password: str) -> str:
+        """Bloquea el thread actual (routers síncronos) hasta obtener el hash"""
+        return self._submit("hash", _hash_password, password, self.rounds).result()
+
+    @timed_section("bcrypt_verify")
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._submit("verify", _verify_password, password, hashed_password).result()
+
+    @timed_section("bcrypt_hash")
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit("hash", _hash_password, password, self.rounds))
+
+    @timed_section("bcrypt_verify")
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit("verify", _verify_password, password, hashed_password))
+
+    def fit_threadpool(self, total_tokens: int) -> None:
+        """
+        Tope de pendientes en un cuarto del threadpool: cada hash síncrono bloquea un
+        thread, y con el tope cerca del total los hashes dejarían sin threads a pagos y
+        transferencias
+        """
+        if not self.fixed_max_pending:
+            self.max_pending = max(1, total_tokens // 4)
+
+    def warm_up(self) -> None:
+        """Arranca los procesos worker (evita pagar el spawn en el primer login)"""
+        executor = self._get_executor()
+        for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.pending,
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "latency": {operation: dict(values) for operation, values in self._latency.items()},
+            }
+
+
+password_hasher = PasswordHasher(
+    settings.password_hash_workers,
+    settings.password_hash_max_pending,
+    settings.bcrypt_rounds
+)
+registry.collector(lambda: stats_samples("app_password_hasher", password_hasher.stats(), "Pool de procesos de bcrypt"))
+
@@ -1,6 +1,13 @@
+import asyncio
 import random
+import threading
+import time
+from typing import Optional
+from app.services.metrics import Histogram
+from app.services.instrumentation import timed_section
 
 
+@timed_section("simulate_payment")
 def simulate_payment(amount: float, card_type: str) -> dict:
     """
     Simula el procesamiento de un pago.
@@ -23,4 +30,78 @@ def simulate_payment(amount: float, card_type: str) -> dict:
         return {
             "status": "error",
             "message": "Error de comunicación con el procesador"
-        }
\ No newline at end of file
+        }
+
+# Buckets de tamaño de lote
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class AuthorizationBatcher:
+    """
+    Junta autorizaciones concurrentes y las envía al gateway en una sola llamada.
+    Un lote sale cuando se cumple `window` segundos desde su primer pedido o cuando
+    llega a `max_batch_size`; cada request espera su propio resultado.
+    `send_batch` recibe la lista de pedidos y retorna los resultados en el mismo orden.
+    Se usa desde un único event loop (el del cliente del gateway).
+    """
+
+    def __init__(self, send_batch, window: float, max_batch_size: int):
+        self.send_batch = send_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: list[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._wait_times = Histogram()
+
+    async def submit(self, request: tuple) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._send(batch))
+
+    async def _send(self, batch: list[tuple]) -> None:
+        sent_at = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self._batch_sizes.observe(len(batch))
+            for _, _, queued_at in batch:
+                self._wait_times.observe(sent_at - queued_at)
+        try:
+            results = await self.send_batch([request for request, _, _ in batch])
+        except BaseException as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                # Llamadas al gateway evitadas respecto de una por pago
+                "calls_saved": self.items - self.batches,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+                "batch_size": self._batch_sizes.snapshot(),
+                "wait_seconds": self._wait_times.snapshot(),
+            }
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.services.metrics import registry, stats_samples
+from app.models.user import User
+
+# Cambios en estos atributos invalidan el principal cacheado
+TRACKED_ATTRIBUTES = ("status", "verification_level", "balance")
+
+
+class Principal:
+    """Datos del usuario autenticado que no requieren leer la fila en cada request"""
+    __slots__ = ("id", "status", "verification_level", "limits")
+
+    def __init__(self, id: int, status: str, verification_level: str, limits: dict):
+        self.id = id
+        self.status = status
+        self.verification_level = verification_level
+        self.limits = limits
+
+    @classmethod
+    def from_user(cls, user: User, limits: dict) -> "Principal":
+        return cls(user.id, user.status, user.verification_level, limits)
+
+
+class PrincipalCache:
+    """Cache LRU con TTL de principals, indexado por id de usuario"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return principal
+
+    def put(self, principal: Principal) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_ttl)
+registry.collector(lambda: stats_samples("app_principal_cache", principal_cache.stats(), "Cache de principals"))
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Hook explícito para cambios que no pasan por el ORM (UPDATE directo, otro proceso)"""
+    principal_cache.invalidate(user_id)
+
+
+def mark_principals_changed(session: Session, user_ids) -> None:
+    """Invalida los principals al confirmar la transacción (para UPDATE que no pasan por el flush)"""
+    session.info.setdefault("changed_principals", set()).update(user_ids)
+
+
+# Invalidación automática: se recolectan los usuarios modificados en cada flush
+# y se invalidan recién al confirmar la transacción
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_principals", set())
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            attrs = inspect(obj).attrs
+            if any(attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES):
+                changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_principals", ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed_users(session, previous_transaction):
+    # Rollback de la transacción externa: nada de lo recolectado llegó a confirmarse.
+    # El rollback de un savepoint conserva lo del resto de la transacción
+    if previous_transaction.parent is None:
+        session.info.pop("changed_principals", None)
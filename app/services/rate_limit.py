@@ -0,0 +1,185 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, Request
+from app.auth import decode_user_id
+from app.config import settings
+from app.services.metrics import registry, stats_samples
+from app.services.shared_counters import counter_client
+
+_requests = registry.counter("app_rate_limit_requests_total", "Requests evaluados por el rate limiter, por ruta y resultado")
+
+
+class TokenBuckets:
+    """
+    Token buckets en memoria: cada clave acumula hasta `capacity` tokens a `rate` por
+    segundo. Un bucket que ya se llenó equivale a uno nuevo, así que se descarta (en orden
+    de último uso); nunca hay más de max_keys.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # clave -> [tokens, actualizado, lleno desde]
+        self._buckets: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            key, state = next(iter(buckets.items()))
+            if state[2] > now and len(buckets) <= self.max_keys:
+                return
+            del buckets[key]
+            self.evictions += 1
+
+    def take(self, buckets: list, now: Optional[float] = None) -> dict:
+        """
+        Toma un token de cada bucket [(clave, capacity, rate)] si todos tienen; si no, no
+        toma ninguno. Retorna el estado del bucket más restrictivo:
+        {"allowed", "limit", "window", "remaining", "reset", "retry_after"} (segundos)
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            current = []
+            for key, capacity, rate in buckets:
+                state = self._buckets.get(key)
+                tokens = capacity if state is None else min(capacity, state[0] + (now - state[1]) * rate)
+                current.append((key, capacity, rate, tokens))
+            allowed = all(tokens >= 1 for *_, tokens in current)
+            if allowed:
+                self.allowed += 1
+                current = [(key, capacity, rate, tokens - 1) for key, capacity, rate, tokens in current]
+                for key, capacity, rate, tokens in current:
+                    self._buckets[key] = [tokens, now, now + (capacity - tokens) / rate]
+                    self._buckets.move_to_end(key)
+                self._evict(now)
+            else:
+                self.limited += 1
+        if allowed:
+            _, capacity, rate, tokens = min(current, key=lambda bucket: bucket[3])
+        else:
+            # El que más tarda en recuperar un token
+            _, capacity, rate, tokens = max((bucket for bucket in current if bucket[3] < 1),
+                                            key=lambda bucket: (1 - bucket[3]) / bucket[2])
+        return {
+            "allowed": allowed,
+            "limit": capacity,
+            "window": capacity / rate,
+            "remaining": int(tokens),
+            "reset": (capacity - tokens) / rate,
+            "retry_after": 0.0 if allowed else (1 - tokens) / rate,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evictions": self.evictions,
+        }
+
+
+def _authenticated_user(request: Request) -> Optional[int]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_user_id(token)
+    except HTTPException:
+        # Token inválido: lo rechaza get_current_user en la ruta
+        return None
+
+
+def route_buckets(user_id: int, route: str) -> list:
+    """Buckets que consume un request del usuario a la ruta ("MÉTODO /ruta")"""
+    policy = settings.rate_limit_routes.get(route, settings.rate_limit_default)
+    user_policy = settings.rate_limit_user
+    return [
+        (f"{user_id} {route}", policy["capacity"], policy["rate"]),
+        (f"{user_id} *", user_policy["capacity"], user_policy["rate"]),
+    ]
+
+
+def _headers(result: dict) -> dict:
+    return {
+        "RateLimit-Limit": str(result["limit"]),
+        "RateLimit-Remaining": str(result["remaining"]),
+        "RateLimit-Reset": str(math.ceil(result["reset"])),
+        "RateLimit-Policy": f"{result['limit']};w={math.ceil(result['window'])}",
+    }
+
+
+async def rate_limit(request: Request) -> None:
+    """
+    Dependencia global de la app: consume los buckets del usuario autenticado antes de
+    resolver el resto de la ruta (y de tocar la base). Responde 429 sin tokens.
+    Con counter_server_socket los buckets son los del servidor compartido.
+    Los headers RateLimit-* de un request permitido los agrega RateLimitHeadersMiddleware.
+    """
+    if not settings.rate_limit_enabled:
+        return
+    user_id = _authenticated_user(request)
+    if user_id is None:
+        return
+    route = f"{request.method} {request.scope['route'].path}"
+    buckets = route_buckets(user_id, route)
+    result = await counter_client.request_async({"op": "rate_limit", "buckets": buckets})
+    if result is None:
+        result = token_buckets.take(buckets)
+    headers = _headers(result)
+    if not result["allowed"]:
+        _requests.inc(route=route, outcome="limited")
+        retry_after = max(1, math.ceil(result["retry_after"]))
+        raise HTTPException(
+            status_code=429,
+            detail=f"Demasiadas solicitudes. Reintentar en {retry_after} s",
+            headers={**headers, "Retry-After": str(retry_after)}
+        )
+    _requests.inc(route=route, outcome="allowed")
+    request.state.rate_limit_headers = headers
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Agrega los headers RateLimit-* a la respuesta que realmente se envía: la Response
+    inyectada en la dependencia no llega a las rutas que retornan su propia respuesta
+    (exportaciones en streaming, páginas FastJSONResponse, respuestas idempotentes repetidas).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # request.state de la ruta es este mismo dict
+        state = scope.setdefault("state", {})
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = state.get("rate_limit_headers")
+                if headers:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        *((name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items())
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def serve_rate_limit(buckets: TokenBuckets):
+    """Handler de la operación "rate_limit" en el servidor de contadores"""
+    def handler(request: dict) -> dict:
+        return buckets.take([tuple(bucket) for bucket in request["buckets"]])
+    return handler
+
+
+token_buckets = TokenBuckets(settings.rate_limit_max_keys)
+registry.collector(lambda: stats_samples("app_rate_limit", token_buckets.stats(), "Token buckets en proceso"))
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from jose import JWTError, jwt
+from app.config import settings
+from app.services.metrics import registry, stats_samples
+
+# Métodos que no escriben: no fijan al usuario en el primario
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def token_subject(authorization: Optional[str]) -> Optional[str]:
+    """
+    Claim "sub" del bearer token sin verificar la firma: solo decide a qué engine va
+    una lectura. La autenticación la sigue haciendo get_current_principal.
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.get_unverified_claims(authorization[7:]).get("sub")
+    except JWTError:
+        return None
+
+
+class ReadRouter:
+    """
+    Decide si una lectura puede ir a la réplica:
+    - read-your-writes: durante `pin_window` segundos después de una escritura del
+      usuario sus lecturas van al primario (la réplica puede estar atrasada). El pin
+      es por proceso: con varios workers cubre las lecturas que atiende el mismo worker.
+    - réplica caída: ante un error de conexión se deja de usar por `retry_interval` segundos.
+    """
+
+    def __init__(self, pin_window: float, retry_interval: float, max_pins: int = 100_000):
+        self.pin_window = pin_window
+        self.retry_interval = retry_interval
+        self.max_pins = max_pins
+        # subject -> instante (monotonic) hasta el que lee del primario; ordenado por vencimiento
+        self._pins: OrderedDict[str, float] = OrderedDict()
+        self._replica_down_until = 0.0
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.pinned_reads = 0
+        self.fallback_reads = 0
+        self.replica_failures = 0
+
+    def pin(self, subject: Optional[str]) -> None:
+        if subject is None or self.pin_window <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._pins[subject] = now + self.pin_window
+            self._pins.move_to_end(subject)
+            while self._pins:
+                oldest, expires_at = next(iter(self._pins.items()))
+                if expires_at > now and len(self._pins) <= self.max_pins:
+                    break
+                del self._pins[oldest]
+
+    def is_pinned(self, subject: Optional[str]) -> bool:
+        if subject is None:
+            return False
+        expires_at = self._pins.get(subject)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def replica_available(self) -> bool:
+        return time.monotonic() >= self._replica_down_until
+
+    def mark_replica_down(self) -> None:
+        with self._lock:
+            self.replica_failures += 1
+            self._replica_down_until = time.monotonic() + self.retry_interval
+
+    def record(self, target: str) -> None:
+        # Contadores aproximados (sin lock): solo para diagnóstico
+        if target == "replica":
+            self.replica_reads += 1
+        elif target == "pinned":
+            self.pinned_reads += 1
+        else:
+            self.fallback_reads += 1
+
+    def stats(self) -> dict:
+        return {
+            "replica_reads": self.replica_reads,
+            "pinned_reads": self.pinned_reads,
+            "fallback_reads": self.fallback_reads,
+            "replica_failures": self.replica_failures,
+            "replica_available": self.replica_available(),
+            "pins": len(self._pins),
+        }
+
+
+read_router = ReadRouter(settings.read_your_writes_window, settings.replica_retry_interval)
+registry.collector(lambda: stats_samples("app_read_routing", read_router.stats(), "Ruteo de lecturas a la réplica"))
+
+
+class ReadYourWritesMiddleware:
+    """Fija en el primario al autor de cada escritura exitosa (respuesta < 400)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_pin(message):
+            # Al empezar la respuesta la escritura ya está confirmada
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = dict(scope["headers"])
+                authorization = headers.get(b"authorization")
+                read_router.pin(token_subject(authorization.decode("latin-1") if authorization else None))
+            await send(message)
+
+        await self.app(scope, receive, send_and_pin)
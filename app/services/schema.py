@@ -0,0 +1,43 @@
+from sqlalchemy import inspect
+from app.database import Base
+from app.services.money_migration import legacy_money_columns
+import app.models  # noqa: F401  registra todas las tablas en Base.metadata
+
+
+def schema_status(sync_engine) -> dict:
+    """
+    Tablas e índices declarados en los modelos que faltan en la base, y columnas de
+    dinero todavía en FLOAT (se convierten con python -m app.commands.money_migration)
+    """
+    inspector = inspect(sync_engine)
+    existing = set(inspector.get_table_names())
+    missing_tables = []
+    missing_indexes = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            missing_tables.append(table.name)
+            continue
+        present = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing_indexes.extend(
+            f"{table.name}.{index.name}"
+            for index in sorted(table.indexes, key=lambda i: i.name)
+            if index.name not in present
+        )
+    return {
+        "missing_tables": missing_tables,
+        "missing_indexes": missing_indexes,
+        "legacy_money_columns": legacy_money_columns(sync_engine),
+    }
+
+
+def migrate(sync_engine) -> dict:
+    """
+    Crea las tablas y los índices que falten y retorna lo que faltaba.
+    create_all solo crea tablas nuevas: los índices de tablas existentes se crean aparte.
+    """
+    missing = schema_status(sync_engine)
+    Base.metadata.create_all(bind=sync_engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=sync_engine, checkfirst=True)
+    return missing
@@ -0,0 +1,86 @@
+import json
+from datetime import datetime
+from typing import Any
+from fastapi.responses import Response
+from app.config import settings
+from app.models.card import Card
+from app.models.payment import Payment
+from app.models.transfer import Transfer
+from app.schemas.card import CardResponse
+from app.schemas.payment import PaymentResponse
+from app.schemas.transfer import TransferResponse
+from app.services.pagination import build_page
+from app.services.money import to_major
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el encoder de la stdlib
+    orjson = None
+
+
+def response_columns(model, schema) -> tuple:
+    """Columnas del modelo con los campos del schema de respuesta, en el mismo orden"""
+    return tuple(getattr(model, field) for field in schema.model_fields)
+
+
+# Lecturas por columnas (sin instancias ORM ni identity map): filas con los campos de la respuesta
+PAYMENT_COLUMNS = response_columns(Payment, PaymentResponse)
+TRANSFER_COLUMNS = response_columns(Transfer, TransferResponse)
+CARD_COLUMNS = response_columns(Card, CardResponse)
+
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+# Un único encoder reutilizado, con el mismo formato compacto que Pydantic
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default).encode
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return _encode_json(content).encode()
+
+
+class FastJSONResponse(Response):
+    """JSON con orjson (o la stdlib) para contenido ya armado, sin pasar por el response_model"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _row_dicts(rows: list) -> list[dict]:
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    items = [dict(zip(fields, row)) for row in rows]
+    # Montos en unidades menores: en decimal, como los serializa el response_model
+    if "amount" in fields:
+        for item in items:
+            item["amount"] = to_major(item["amount"], item["currency"])
+    return items
+
+
+def page_response(rows: list, limit: int):
+    """
+    Página a partir de filas por columnas. En modo fast_serialization los items se
+    arman como dicts y se serializan directamente: los tipos ya son los de la respuesta
+    (vienen de las mismas columnas), así que validar cada campo otra vez no aporta;
+    solo los montos pasan de unidades menores a decimal.
+    """
+    page = build_page(rows, limit)
+    if not settings.fast_serialization:
+        return page
+    page["items"] = _row_dicts(page["items"])
+    return FastJSONResponse(page)
+
+
+def list_response(rows: list):
+    """Versión sin paginar de page_response"""
+    if not settings.fast_serialization:
+        return rows
+    return FastJSONResponse(_row_dicts(rows))
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import socket
+import threading
+import time
+from typing import Callable, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Protocolo: una línea JSON por request y una por respuesta, {"op": ..., ...}
+
+
+class CounterServer:
+    """
+    Contadores en memoria compartidos por los workers de un host, servidos por un
+    socket Unix (python -m app.commands.counter_server). Cada operación se resuelve
+    con un handler registrado; todas corren en el único thread del event loop.
+    """
+
+    def __init__(self):
+        self.handlers: dict[str, Callable[[dict], dict]] = {}
+        self.requests = 0
+        self.errors = 0
+
+    def register(self, op: str, handler: Callable[[dict], dict]) -> None:
+        self.handlers[op] = handler
+
+    def handle(self, line: bytes) -> bytes:
+        self.requests += 1
+        try:
+            request = json.loads(line)
+            response = self.handlers[request["op"]](request)
+        except Exception as exc:
+            self.errors += 1
+            response = {"error": f"{type(exc).__name__}: {exc}"}
+        return json.dumps(response).encode() + b"\n"
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                writer.write(self.handle(line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path: str) -> None:
+        server = await asyncio.start_unix_server(self._serve_connection, path=path)
+        async with server:
+            await server.serve_forever()
+
+
+class CounterClient:
+    """
+    Cliente del servidor de contadores: una conexión persistente por thread (y una por
+    event loop en modo async). Si el servidor no responde, request() retorna None
+    durante retry_interval segundos y el llamador usa sus contadores en proceso.
+    """
+
+    def __init__(self, path: str, timeout: float, retry_interval: float):
+        self.path = path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._local = threading.local()
+        self._async: Optional[tuple] = None
+        self._down_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._down_until
+
+    def _failed(self, exc: Exception) -> None:
+        self.failures += 1
+        self._down_until = time.monotonic() + self.retry_interval
+        logger.warning("Servidor de contadores no disponible (%s): contadores en proceso por %.0f s",
+                       exc, self.retry_interval)
+
+    def _connection(self):
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            stream = self._local.stream = sock.makefile("rwb")
+        return stream
+
+    def _close(self) -> None:
+        stream = getattr(self._local, "stream", None)
+        self._local.stream = None
+        if stream is not None:
+            stream.close()
+
+    @staticmethod
+    def _decode(line: bytes) -> dict:
+        if not line:
+            raise ConnectionError("conexión cerrada")
+        response = json.loads(line)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+    def request(self, payload: dict) -> Optional[dict]:
+        if not self._available():
+            return None
+        try:
+            stream = self._connection()
+            stream.write(json.dumps(payload).encode() + b"\n")
+            stream.flush()
+            response = self._decode(stream.readline())
+        except (OSError, ValueError) as exc:
+            self._close()
+            self._failed(exc)
+            return None
+        self.requests += 1
+        return response
+
+    async def request_async(self, payload: dict) -> Optional[dict]:
+        if not self._available():
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            if self._async is None or self._async[0] is not loop:
+                reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(self.path), self.timeout)
+                self._async = (loop, reader, writer, asyncio.Lock())
+            _, reader, writer, lock = self._async
+            # Una sola conexión por loop: las respuestas llegan en el orden de los requests
+            async with lock:
+                writer.write(json.dumps(payload).encode() + b"\n")
+                await writer.drain()
+                response = self._decode(await asyncio.wait_for(reader.readline(), self.timeout))
+        except (OSError, ValueError, asyncio.TimeoutError) as exc:
+            if self._async is not None:
+                self._async[2].close()
+                self._async = None
+            self._failed(exc)
+            return None
+        self.requests += 1
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "failures": self.failures,
+            "available": self._available(),
+        }
+
+
+counter_client = CounterClient(
+    settings.counter_server_socket, settings.counter_server_timeout, settings.counter_server_retry_interval
+)
@@ -0,0 +1,192 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import select, or_, and_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from app.models.payment import Payment
+from app.models.transfer import Transfer
+from app.models.spend_window import UserSpendWindow
+from app.services.money import account_minor
+
+DAY = "day"
+MONTH = "month"
+
+
+def _period_starts(when: datetime) -> tuple[date, date]:
+    day = when.date()
+    return day, day.replace(day=1)
+
+
+def record_spend(db: Session, user_id: int, amount: int, when: datetime) -> None:
+    """
+    Suma el monto a los contadores diario y mensual del usuario.
+    `when` es el created_at de la fila del pago o la transferencia: el gasto cae en el
+    mismo período que en la reconstrucción desde las tablas, aunque cruce la medianoche.
+    No hace commit: debe llamarse dentro de la misma transacción que aprueba
+    el pago o completa la transferencia.
+    """
+    day, month = _period_starts(when)
+    for period, period_start in ((DAY, day), (MONTH, month)):
+        _increment(db, user_id, period, period_start, amount)
+
+
+def _increment(db: Session, user_id: int, period: str, period_start: date, amount: int) -> None:
+    # UPDATE atómico primero: el caso habitual es que la fila ya exista
+    result = db.execute(
+        update(UserSpendWindow)
+        .where(
+            UserSpendWindow.user_id == user_id,
+            UserSpendWindow.period == period,
+            UserSpendWindow.period_start == period_start,
+        )
+        .values(amount=UserSpendWindow.amount + amount, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return
+
+    # Primera operación del período: insertar, reintentando si otro request la creó antes
+    try:
+        with db.begin_nested():
+            db.add(UserSpendWindow(
+                user_id=user_id,
+                period=period,
+                period_start=period_start,
+                amount=amount
+            ))
+    except IntegrityError:
+        _increment(db, user_id, period, period_start, amount)
+
+
+def _window_stmt(user_id: int, period: str, period_start: date):
+    return select(UserSpendWindow.amount).where(
+        UserSpendWindow.user_id == user_id,
+        UserSpendWindow.period == period,
+        UserSpendWindow.period_start == period_start
+    )
+
+
+def _totals_stmt(user_id: int, day: date, month: date):
+    return select(UserSpendWindow.period, UserSpendWindow.amount).where(
+        UserSpendWindow.user_id == user_id,
+        or_(
+            and_(UserSpendWindow.period == DAY, UserSpendWindow.period_start == day),
+            and_(UserSpendWindow.period == MONTH, UserSpendWindow.period_start == month)
+        )
+    )
+
+
+def get_daily_spend(db: Session, user_id: int, now: Optional[datetime] = None) -> int:
+    """Gasto del día en curso"""
+    day, _ = _period_starts(now or datetime.utcnow())
+    return db.execute(_window_stmt(user_id, DAY, day)).scalar() or 0
+
+
+def get_monthly_spend(db: Session, user_id: int, now: Optional[datetime] = None) -> int:
+    """Gasto del mes en curso"""
+    _, month = _period_starts(now or datetime.utcnow())
+    return db.execute(_window_stmt(user_id, MONTH, month)).scalar() or 0
+
+
+def get_spend_totals(db: Session, user_id: int, now: Optional[datetime] = None) -> tuple[int, int]:
+    """Retorna (gasto diario, gasto mensual) leyendo a lo sumo dos filas"""
+    day, month = _period_starts(now or datetime.utcnow())
+    totals = dict(db.execute(_totals_stmt(user_id, day, month)).all())
+    return totals.get(DAY, 0), totals.get(MONTH, 0)
+
+
+async def get_daily_spend_async(db: AsyncSession, user_id: int, now: Optional[datetime] = None) -> int:
+    """Versión async de get_daily_spend"""
+    day, _ = _period_starts(now or datetime.utcnow())
+    return (await db.execute(_window_stmt(user_id, DAY, day))).scalar() or 0
+
+
+async def get_monthly_spend_async(db: AsyncSession, user_id: int, now: Optional[datetime] = None) -> int:
+    """Versión async de get_monthly_spend"""
+    _, month = _period_starts(now or datetime.utcnow())
+    return (await db.execute(_window_stmt(user_id, MONTH, month))).scalar() or 0
+
+
+async def get_spend_totals_async(db: AsyncSession, user_id: int, now: Optional[datetime] = None) -> tuple[int, int]:
+    """Versión async de get_spend_totals"""
+    day, month = _period_starts(now or datetime.utcnow())
+    totals = dict((await db.execute(_totals_stmt(user_id, day, month))).all())
+    return totals.get(DAY, 0), totals.get(MONTH, 0)
+
+
+async def record_spend_async(db: AsyncSession, user_id: int, amount: int, when: datetime) -> None:
+    """Versión async de record_spend (misma lógica de upsert, ejecutada vía run_sync)"""
+    await db.run_sync(record_spend, user_id, amount, when)
+
+
+def compute_spend_from_history(db: Session, user_id: Optional[int] = None) -> dict:
+    """
+    Recalcula los acumulados desde las tablas de pagos y transferencias.
+    Retorna {(user_id, period, period_start): amount}, en unidades menores de la cuenta.
+    """
+    payments = db.query(Payment.user_id, Payment.amount, Payment.currency, Payment.created_at).filter(
+        Payment.status == "approved"
+    )
+    transfers = db.query(Transfer.sender_id, Transfer.amount, Transfer.currency, Transfer.created_at).filter(
+        Transfer.status == "completed"
+    )
+    if user_id is not None:
+        payments = payments.filter(Payment.user_id == user_id)
+        transfers = transfers.filter(Transfer.sender_id == user_id)
+
+    totals: dict = {}
+    for query in (payments, transfers):
+        for owner_id, amount, currency, created_at in query.yield_per(1000):
+            day, month = _period_starts(created_at)
+            amount = account_minor(amount, currency)
+            for key in ((owner_id, DAY, day), (owner_id, MONTH, month)):
+                totals[key] = totals.get(key, 0) + amount
+    return totals
+
+
+def rebuild_spend_counters(db: Session, user_id: Optional[int] = None) -> int:
+    """Reconstruye los contadores desde el historial. Retorna la cantidad de filas escritas."""
+    totals = compute_spend_from_history(db, user_id)
+
+    stale = db.query(UserSpendWindow)
+    if user_id is not None:
+        stale = stale.filter(UserSpendWindow.user_id == user_id)
+    stale.delete(synchronize_session=False)
+
+    db.add_all([
+        UserSpendWindow(user_id=owner_id, period=period, period_start=period_start, amount=amount)
+        for (owner_id, period, period_start), amount in totals.items()
+    ])
+    db.commit()
+    return len(totals)
+
+
+def check_spend_counters(db: Session, user_id: Optional[int] = None) -> list[dict]:
+    """
+    Compara los contadores contra el historial. Retorna las diferencias encontradas:
+    con montos enteros la comparación es exacta.
+    """
+    expected = compute_spend_from_history(db, user_id)
+
+    stored_query = db.query(
+        UserSpendWindow.user_id, UserSpendWindow.period, UserSpendWindow.period_start, UserSpendWindow.amount
+    )
+    if user_id is not None:
+        stored_query = stored_query.filter(UserSpendWindow.user_id == user_id)
+    stored = {(owner_id, period, start): amount for owner_id, period, start, amount in stored_query}
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored), key=lambda k: (k[0], k[1], k[2])):
+        expected_amount = expected.get(key, 0)
+        stored_amount = stored.get(key, 0)
+        if expected_amount != stored_amount:
+            owner_id, period, period_start = key
+            mismatches.append({
+                "user_id": owner_id,
+                "period": period,
+                "period_start": period_start.isoformat(),
+                "expected": expected_amount,
+                "stored": stored_amount
+            })
+    return mismatches
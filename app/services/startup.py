@@ -0,0 +1,101 @@
+import logging
+from anyio.to_thread import current_default_thread_limiter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import get_database, close_database, warm_up_pools, warm_up_async_pools
+from app.models.card import Card
+from app.models.transfer import Transfer
+from app.models.user import User
+from app.services.gateway import payment_gateway
+from app.services.group_commit import group_committer
+from app.services.history import payments_page_stmt, transfers_page_stmt
+from app.services.ledger import has_unopened_accounts
+from app.services.password_hasher import password_hasher
+from app.services.schema import schema_status
+from app.services.serialization import CARD_COLUMNS
+from app.services.spend_counters import get_daily_spend, get_monthly_spend
+
+logger = logging.getLogger(__name__)
+
+# Id que no existe: las lecturas de calentamiento no devuelven filas
+WARM_UP_USER_ID = 0
+
+
+def check_schema() -> None:
+    """
+    Sin las tablas, con montos en FLOAT o con saldos fuera del libro mayor el worker no
+    arranca; los índices faltantes solo se advierten
+    """
+    database = get_database()
+    status = schema_status(database.engine)
+    if status["missing_tables"]:
+        raise RuntimeError(
+            f"Faltan tablas en la base ({', '.join(status['missing_tables'])}): "
+            "ejecutar python -m app.commands.migrate"
+        )
+    if status["legacy_money_columns"]:
+        raise RuntimeError(
+            f"Montos todavía en FLOAT ({', '.join(status['legacy_money_columns'])}): "
+            "ejecutar python -m app.commands.money_migration"
+        )
+    with database.sessions() as db:
+        if has_unopened_accounts(db):
+            raise RuntimeError(
+                "Hay saldos en users.balance que no pasaron al libro mayor: "
+                "ejecutar python -m app.commands.ledger open"
+            )
+    if status["missing_indexes"]:
+        logger.warning(
+            "Faltan índices (%s): ejecutar python -m app.commands.migrate", ", ".join(status["missing_indexes"])
+        )
+
+
+def warm_up_statement_cache(db: Session) -> int:
+    """
+    Ejecuta las lecturas calientes con un usuario inexistente: el engine compila y
+    cachea cada forma de sentencia antes del primer request del worker
+    """
+    user_id = WARM_UP_USER_ID
+    page_args = (user_id, None, None, None, None, settings.default_page_size)
+    statements = [
+        select(User).where(User.id == user_id),
+        select(*CARD_COLUMNS).where(Card.user_id == user_id),
+        payments_page_stmt(*page_args),
+        transfers_page_stmt(Transfer.sender_id, *page_args),
+        transfers_page_stmt(Transfer.receiver_id, *page_args),
+    ]
+    for stmt in statements:
+        db.execute(stmt).all()
+    get_daily_spend(db, user_id)
+    get_monthly_spend(db, user_id)
+    db.rollback()
+    return len(statements) + 2
+
+
+async def startup() -> None:
+    """Arranque de cada worker (ya forkeado): acá se abren las primeras conexiones"""
+    if settings.startup_schema_check:
+        check_schema()
+    if settings.startup_warmup:
+        database = get_database()
+        warm_up_pools(settings.db_pool_warmup)
+        if database.async_sessions is not None:
+            await warm_up_async_pools(settings.db_pool_warmup)
+            async with database.async_sessions() as db:
+                await db.run_sync(warm_up_statement_cache)
+        else:
+            with database.sessions() as db:
+                warm_up_statement_cache(db)
+    # Desde el event loop: el limiter del threadpool es por loop
+    password_hasher.fit_threadpool(int(current_default_thread_limiter().total_tokens))
+    if settings.password_hash_warmup:
+        password_hasher.warm_up()
+
+
+async def shutdown() -> None:
+    # Confirmar las escrituras encoladas antes de cerrar los pools
+    group_committer.shutdown()
+    payment_gateway.close()
+    password_hasher.shutdown()
+    await close_database()
@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from app.models.user import User
 from app.models.card import Card
-from app.models.payment import Payment
-from app.models.transfer import Transfer
 from app.auth import get_user_limits
+from app.services.instrumentation import timed_section
+from app.services.money import limit_minor, format_account_amount
+from app.services.velocity import PAYMENT, TRANSFER, check_velocity, check_velocity_async
+from app.services.spend_counters import (
+    get_daily_spend, get_monthly_spend, get_daily_spend_async, get_monthly_spend_async
+)
 
 
 def validate_card_not_expired(card: Card) -> None:
@@ -31,14 +36,15 @@ def validate_card_status(card: Card) -> None:
         raise HTTPException(status_code=400, detail=f"Tarjeta no disponible: {card.status}")
 
 
-def validate_card_limit(user: User, db: Session) -> None:
-    """Valida que el usuario no exceda su límite de tarjetas"""
-    limits = get_user_limits(user)
-    active_cards = db.query(Card).filter(
+def _active_cards_stmt(user: User):
+    return select(func.count(Card.id)).where(
         Card.user_id == user.id,
         Card.status == "active"
-    ).count()
-    
+    )
+
+
+def _check_card_limit(user: User, active_cards: int) -> None:
+    limits = get_user_limits(user)
     if active_cards >= limits["max_cards"]:
         raise HTTPException(
             status_code=400,
@@ -46,12 +52,19 @@ def validate_card_limit(user: User, db: Session) -> None:
         )
 
 
-def validate_user_balance(user: User, amount: float) -> None:
-    """Valida que el usuario tenga balance suficiente"""
-    if user.balance < amount:
+@timed_section("validate_card_limit")
+def validate_card_limit(user: User, db: Session) -> None:
+    """Valida que el usuario no exceda su límite de tarjetas"""
+    _check_card_limit(user, db.execute(_active_cards_stmt(user)).scalar())
+
+
+def validate_user_balance(user: User, amount: int) -> None:
+    """Valida que el usuario tenga balance suficiente (saldo del libro mayor)"""
+    if user.ledger_balance < amount:
         raise HTTPException(
             status_code=400,
-            detail=f"Balance insuficiente. Disponible: {user.balance}, Requerido: {amount}"
+            detail=f"Balance insuficiente. Disponible: {format_account_amount(user.ledger_balance)}, "
+                   f"Requerido: {format_account_amount(amount)}"
         )
 
 
@@ -64,77 +77,75 @@ def validate_user_active(user: User) -> None:
         )
 
 
-def validate_transaction_limit(user: User, amount: float) -> None:
+def validate_transaction_limit(user: User, amount: int) -> None:
     """Valida que el monto no exceda el límite por transacción"""
     limits = get_user_limits(user)
     
-    if amount > limits["max_transaction"]:
+    if amount > limit_minor(limits["max_transaction"]):
         raise HTTPException(
             status_code=400,
             detail=f"Monto excede límite por transacción (${limits['max_transaction']}). Nivel: {user.verification_level}"
         )
 
 
-def validate_daily_limit(user: User, amount: float, db: Session) -> None:
-    """Valida que no se exceda el límite diario"""
-    limits = get_user_limits(user)
-    today = datetime.utcnow().date()
-    
-    # Sumar pagos del día
-    daily_payments = db.query(func.sum(Payment.amount)).filter(
-        Payment.user_id == user.id,
-        Payment.status == "approved",
-        func.date(Payment.created_at) == today
-    ).scalar() or 0
+def _check_daily_limit(user: User, amount: int, daily_used: int) -> None:
+    limit = limit_minor(get_user_limits(user)["daily_limit"])
+    total_today = daily_used + amount
     
-    # Sumar transferencias enviadas del día
-    daily_transfers = db.query(func.sum(Transfer.amount)).filter(
-        Transfer.sender_id == user.id,
-        Transfer.status == "completed",
-        func.date(Transfer.created_at) == today
-    ).scalar() or 0
-    
-    total_today = daily_payments + daily_transfers + amount
-    
-    if total_today > limits["daily_limit"]:
-        remaining = limits["daily_limit"] - (daily_payments + daily_transfers)
+    if total_today > limit:
+        remaining = limit - daily_used
         raise HTTPException(
             status_code=400,
-            detail=f"Límite diario excedido. Disponible hoy: ${max(0, remaining):.2f}"
+            detail=f"Límite diario excedido. Disponible hoy: ${format_account_amount(max(0, remaining))}"
         )
 
 
-def validate_monthly_limit(user: User, amount: float, db: Session) -> None:
-    """Valida que no se exceda el límite mensual"""
-    limits = get_user_limits(user)
-    now = datetime.utcnow()
-    first_day_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    # Sumar pagos del mes
-    monthly_payments = db.query(func.sum(Payment.amount)).filter(
-        Payment.user_id == user.id,
-        Payment.status == "approved",
-        Payment.created_at >= first_day_of_month
-    ).scalar() or 0
-    
-    # Sumar transferencias enviadas del mes
-    monthly_transfers = db.query(func.sum(Transfer.amount)).filter(
-        Transfer.sender_id == user.id,
-        Transfer.status == "completed",
-        Transfer.created_at >= first_day_of_month
-    ).scalar() or 0
+def _check_monthly_limit(user: User, amount: int, monthly_used: int) -> None:
+    limit = limit_minor(get_user_limits(user)["monthly_limit"])
+    total_month = monthly_used + amount
     
-    total_month = monthly_payments + monthly_transfers + amount
-    
-    if total_month > limits["monthly_limit"]:
-        remaining = limits["monthly_limit"] - (monthly_payments + monthly_transfers)
+    if total_month > limit:
+        remaining = limit - monthly_used
         raise HTTPException(
             status_code=400,
-            detail=f"Límite mensual excedido. Disponible este mes: ${max(0, remaining):.2f}"
+            detail=f"Límite mensual excedido. Disponible este mes: ${format_account_amount(max(0, remaining))}"
         )
 
 
-def validate_all_payment_limits(user: User, card: Card, amount: float, db: Session) -> None:
+@timed_section("validate_daily_limit")
+def validate_daily_limit(user: User, amount: int, db: Session) -> None:
+    """Valida que no se exceda el límite diario"""
+    # Pagos aprobados + transferencias enviadas del día (contador incremental)
+    _check_daily_limit(user, amount, get_daily_spend(db, user.id))
+
+
+@timed_section("validate_monthly_limit")
+def validate_monthly_limit(user: User, amount: int, db: Session) -> None:
+    """Valida que no se exceda el límite mensual"""
+    # Pagos aprobados + transferencias enviadas del mes (contador incremental)
+    _check_monthly_limit(user, amount, get_monthly_spend(db, user.id))
+
+
+@timed_section("validate_velocity")
+def validate_payment_velocity(user: User, card: Card) -> None:
+    """Valida las reglas de velocidad de pagos (por usuario y por tarjeta) y cuenta el intento"""
+    check_velocity(PAYMENT, {"user": user.id, "card": card.id})
+
+
+@timed_section("validate_velocity")
+def validate_transfer_velocity(sender: User, receiver: User) -> None:
+    """Valida las reglas de velocidad de transferencias (por emisor y por receptor) y cuenta el intento"""
+    check_velocity(TRANSFER, {"user": sender.id, "receiver": receiver.id})
+
+
+def validate_spend_limits(user: User, amount: int, daily_used: int, monthly_used: int) -> None:
+    """Valida límites diario y mensual contra acumulados ya conocidos (procesamiento en lote)"""
+    _check_daily_limit(user, amount, daily_used)
+    _check_monthly_limit(user, amount, monthly_used)
+
+
+@timed_section("validate_payment_limits")
+def validate_all_payment_limits(user: User, card: Card, amount: int, db: Session) -> None:
     """Ejecuta todas las validaciones para un pago"""
     validate_user_active(user)
     validate_card_status(card)
@@ -142,13 +153,72 @@ def validate_all_payment_limits(user: User, card: Card, amount: float, db: Sessi
     validate_transaction_limit(user, amount)
     validate_daily_limit(user, amount, db)
     validate_monthly_limit(user, amount, db)
+    # Última: cuenta la operación, así que solo se llega con el resto aprobado
+    validate_payment_velocity(user, card)
 
 
-def validate_all_transfer_limits(sender: User, receiver: User, amount: float, db: Session) -> None:
+@timed_section("validate_transfer_limits")
+def validate_all_transfer_limits(sender: User, receiver: User, amount: int, db: Session) -> None:
     """Ejecuta todas las validaciones para una transferencia"""
     validate_user_active(sender)
     validate_user_active(receiver)
     validate_user_balance(sender, amount)
     validate_transaction_limit(sender, amount)
     validate_daily_limit(sender, amount, db)
-    validate_monthly_limit(sender, amount, db)
\ No newline at end of file
+    validate_monthly_limit(sender, amount, db)
+    # Última: cuenta la operación, así que solo se llega con el resto aprobado
+    validate_transfer_velocity(sender, receiver)
+
+
+@timed_section("validate_card_limit")
+async def validate_card_limit_async(user: User, db: AsyncSession) -> None:
+    """Versión async de validate_card_limit"""
+    _check_card_limit(user, (await db.execute(_active_cards_stmt(user))).scalar())
+
+
+@timed_section("validate_daily_limit")
+async def validate_daily_limit_async(user: User, amount: int, db: AsyncSession) -> None:
+    """Versión async de validate_daily_limit"""
+    _check_daily_limit(user, amount, await get_daily_spend_async(db, user.id))
+
+
+@timed_section("validate_monthly_limit")
+async def validate_monthly_limit_async(user: User, amount: int, db: AsyncSession) -> None:
+    """Versión async de validate_monthly_limit"""
+    _check_monthly_limit(user, amount, await get_monthly_spend_async(db, user.id))
+
+
+@timed_section("validate_velocity")
+async def validate_payment_velocity_async(user: User, card: Card) -> None:
+    """Versión async de validate_payment_velocity"""
+    await check_velocity_async(PAYMENT, {"user": user.id, "card": card.id})
+
+
+@timed_section("validate_velocity")
+async def validate_transfer_velocity_async(sender: User, receiver: User) -> None:
+    """Versión async de validate_transfer_velocity"""
+    await check_velocity_async(TRANSFER, {"user": sender.id, "receiver": receiver.id})
+
+
+@timed_section("validate_payment_limits")
+async def validate_all_payment_limits_async(user: User, card: Card, amount: int, db: AsyncSession) -> None:
+    """Versión async de validate_all_payment_limits"""
+    validate_user_active(user)
+    validate_card_status(card)
+    validate_card_not_expired(card)
+    validate_transaction_limit(user, amount)
+    await validate_daily_limit_async(user, amount, db)
+    await validate_monthly_limit_async(user, amount, db)
+    await validate_payment_velocity_async(user, card)
+
+
+@timed_section("validate_transfer_limits")
+async def validate_all_transfer_limits_async(sender: User, receiver: User, amount: int, db: AsyncSession) -> None:
+    """Versión async de validate_all_transfer_limits"""
+    validate_user_active(sender)
+    validate_user_active(receiver)
+    validate_user_balance(sender, amount)
+    validate_transaction_limit(sender, amount)
+    await validate_daily_limit_async(sender, amount, db)
+    await validate_monthly_limit_async(sender, amount, db)
+    await validate_transfer_velocity_async(sender, receiver)
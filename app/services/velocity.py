@@ -0,0 +1,234 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException
+from app.config import settings
+from app.services.metrics import registry, stats_samples
+from app.services.shared_counters import counter_client
+
+PAYMENT = "payment"
+TRANSFER = "transfer"
+# Un lote cuenta como una sola operación, con reglas propias: los ítems no consumen
+# las ventanas de los pagos y transferencias individuales
+PAYMENT_BATCH = "payment_batch"
+TRANSFER_BATCH = "transfer_batch"
+OPERATIONS = (PAYMENT, TRANSFER, PAYMENT_BATCH, TRANSFER_BATCH)
+# Sujetos a los que se aplica una regla
+SCOPES = ("user", "card", "receiver")
+
+_rejections = registry.counter("app_velocity_rejections_total", "Operaciones rechazadas por reglas de velocidad")
+
+
+class VelocityRule:
+    """Máximo `limit` operaciones por sujeto (`scope`) en los últimos `window` segundos"""
+    __slots__ = ("name", "scope", "operations", "limit", "window", "bucket_width")
+
+    def __init__(self, name: str, scope: str, operation: str, limit: int, window: float, buckets: int):
+        if scope not in SCOPES:
+            raise ValueError(f"Regla de velocidad {name}: scope inválido {scope!r}")
+        if operation not in (*OPERATIONS, "any"):
+            raise ValueError(f"Regla de velocidad {name}: operación inválida {operation!r}")
+        self.name = name
+        self.scope = scope
+        # any: pagos y transferencias individuales
+        self.operations = (PAYMENT, TRANSFER) if operation == "any" else (operation,)
+        self.limit = limit
+        self.window = window
+        self.bucket_width = window / buckets
+
+
+class _Window:
+    """
+    Ventana deslizante en buckets (anillo de contadores): avanzar descarta a lo sumo
+    len(counts) buckets y la suma se mantiene incremental, así que contar y consultar
+    son O(1). La precisión es de un bucket (window / buckets).
+    """
+    __slots__ = ("counts", "head", "total", "expires_at")
+
+    def __init__(self, buckets: int, head: int):
+        self.counts = [0] * buckets
+        self.head = head
+        self.total = 0
+        self.expires_at = 0.0
+
+    def advance(self, bucket: int) -> int:
+        steps = bucket - self.head
+        if steps > 0:
+            size = len(self.counts)
+            if steps >= size:
+                self.counts = [0] * size
+                self.total = 0
+            else:
+                for index in range(self.head + 1, bucket + 1):
+                    slot = index % size
+                    self.total -= self.counts[slot]
+                    self.counts[slot] = 0
+            self.head = bucket
+        return self.total
+
+    def add(self) -> None:
+        self.counts[self.head % len(self.counts)] += 1
+        self.total += 1
+
+    def retry_after(self, limit: int, bucket_width: float, now: float) -> float:
+        """Segundos hasta que salgan de la ventana los buckets que sobran para volver a contar"""
+        size = len(self.counts)
+        excess = self.total - limit + 1
+        for index in range(self.head - size + 1, self.head + 1):
+            excess -= self.counts[index % size]
+            if excess <= 0:
+                return max(0.0, (index + size) * bucket_width - now)
+        return size * bucket_width
+
+
+class VelocityEngine:
+    """
+    Contadores de ráfagas en memoria por regla y sujeto. Las claves sin operaciones
+    durante su ventana se descartan (en orden de último uso) y nunca hay más de max_keys.
+    """
+
+    def __init__(self, rules: dict, buckets: int, max_keys: int):
+        self.rules = [VelocityRule(name, buckets=buckets, **spec) for name, spec in rules.items()]
+        self.buckets = buckets
+        self.max_keys = max_keys
+        self._windows: OrderedDict[tuple, _Window] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rejections = 0
+        self.evictions = 0
+
+    def _evict(self, now: float) -> None:
+        windows = self._windows
+        while windows:
+            key, window = next(iter(windows.items()))
+            if window.expires_at > now and len(windows) <= self.max_keys:
+                return
+            del windows[key]
+            self.evictions += 1
+
+    def hit(self, operation: str, subjects: dict, now: Optional[float] = None,
+            check: bool = True, record: bool = True) -> Optional[dict]:
+        """
+        Cuenta la operación en todas las reglas que le aplican. Si alguna ya está en su
+        límite no cuenta nada y retorna {"rule", "limit", "window", "retry_after"}.
+        Con record=False solo consulta; con check=False cuenta sin consultar (operaciones
+        ya confirmadas que se consultaron antes).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            matched = []
+            for rule in self.rules:
+                subject = subjects.get(rule.scope)
+                if subject is None or operation not in rule.operations:
+                    continue
+                key = (rule.name, subject)
+                bucket = int(now / rule.bucket_width)
+                window = self._windows.get(key)
+                if window is None:
+                    window = _Window(self.buckets, bucket)
+                elif window.advance(bucket) >= rule.limit and check:
+                    self.rejections += 1
+                    return {
+                        "rule": rule.name,
+                        "limit": rule.limit,
+                        "window": rule.window,
+                        "retry_after": window.retry_after(rule.limit, rule.bucket_width, now),
+                    }
+                matched.append((key, window, rule))
+            if not record:
+                return None
+            for key, window, rule in matched:
+                window.add()
+                window.expires_at = now + rule.window
+                self._windows[key] = window
+                self._windows.move_to_end(key)
+            self.hits += 1
+            self._evict(now)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "rules": len(self.rules),
+            "keys": len(self._windows),
+            "hits": self.hits,
+            "rejections": self.rejections,
+            "evictions": self.evictions,
+        }
+
+
+def _velocity_exceeded(rejected: dict) -> HTTPException:
+    _rejections.inc(rule=rejected["rule"])
+    return HTTPException(
+        status_code=429,
+        detail=f"Demasiadas operaciones ({rejected['rule']}): máximo {rejected['limit']} "
+               f"en {rejected['window']:g} segundos",
+        headers={"Retry-After": str(max(1, math.ceil(rejected["retry_after"])))}
+    )
+
+
+def _request(operation: str, subjects: dict, check: bool, record: bool) -> dict:
+    return {"op": "velocity", "operation": operation, "subjects": subjects, "check": check, "record": record}
+
+
+def check_velocity(operation: str, subjects: dict, record: bool = True) -> None:
+    """
+    Aplica las reglas de velocidad (settings.velocity_rules) y cuenta la operación
+    (record=False: solo consulta, y la operación se cuenta con record_velocity una vez
+    confirmada). Con counter_server_socket los contadores son los del servidor
+    compartido; si no responde, los del proceso.
+    """
+    if not settings.velocity_enabled:
+        return
+    response = counter_client.request(_request(operation, subjects, True, record))
+    rejected = (
+        response["rejected"] if response is not None
+        else velocity_engine.hit(operation, subjects, record=record)
+    )
+    if rejected:
+        raise _velocity_exceeded(rejected)
+
+
+async def check_velocity_async(operation: str, subjects: dict, record: bool = True) -> None:
+    """Versión async de check_velocity"""
+    if not settings.velocity_enabled:
+        return
+    response = await counter_client.request_async(_request(operation, subjects, True, record))
+    rejected = (
+        response["rejected"] if response is not None
+        else velocity_engine.hit(operation, subjects, record=record)
+    )
+    if rejected:
+        raise _velocity_exceeded(rejected)
+
+
+def record_velocity(operation: str, subjects: dict) -> None:
+    """Cuenta una operación ya confirmada y consultada antes con check_velocity(record=False)"""
+    if not settings.velocity_enabled:
+        return
+    if counter_client.request(_request(operation, subjects, False, True)) is None:
+        velocity_engine.hit(operation, subjects, check=False)
+
+
+async def record_velocity_async(operation: str, subjects: dict) -> None:
+    """Versión async de record_velocity"""
+    if not settings.velocity_enabled:
+        return
+    if await counter_client.request_async(_request(operation, subjects, False, True)) is None:
+        velocity_engine.hit(operation, subjects, check=False)
+
+
+def serve_velocity(engine: VelocityEngine):
+    """Handler de la operación "velocity" en el servidor de contadores"""
+    def handler(request: dict) -> dict:
+        return {"rejected": engine.hit(
+            request["operation"], request["subjects"],
+            check=request.get("check", True), record=request.get("record", True)
+        )}
+    return handler
+
+
+velocity_engine = VelocityEngine(settings.velocity_rules, settings.velocity_buckets, settings.velocity_max_keys)
+registry.collector(lambda: stats_samples("app_velocity", velocity_engine.stats(), "Motor de velocidad en proceso"))
+registry.collector(lambda: stats_samples("app_counter_client", counter_client.stats(), "Cliente del servidor de contadores"))
@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from app.models.payment import Payment
+from app.models.transfer import Transfer
+from app.schemas.payment import PaymentCreate, PaymentResponse
+from app.schemas.transfer import TransferCreate, TransferResponse
+from app.services.balances import ensure_funds
+from app.services.idempotency import IdempotencyClaim, complete_key
+from app.services.ledger import append_entries, lock_accounts, payment_entries, transfer_entries
+from app.services.spend_counters import record_spend
+
+# Escrituras de create_payment / create_transfer ya validadas, como jobs `job(session)`
+# que reciben solo valores planos: pueden correr en la sesión del request o en el
+# writer de group commit. No hacen commit.
+
+
+def payment_write_job(user_id: int, payment: PaymentCreate, status: str,
+                      claim: Optional[IdempotencyClaim]) -> Callable[[Session], PaymentResponse]:
+    def job(db: Session) -> PaymentResponse:
+        db_payment = Payment(
+            user_id=user_id,
+            card_id=payment.card_id,
+            amount=payment.amount_minor,
+            currency=payment.currency,
+            status=status,
+            description=payment.description,
+            # Fijado acá y no por el default de la columna: es también el período del gasto
+            created_at=datetime.utcnow()
+        )
+        db.add(db_payment)
+        if status == "approved":
+            record_spend(db, user_id, payment.account_amount, db_payment.created_at)
+        # El id vuelve en el INSERT (RETURNING / lastrowid) y created_at se fija en Python:
+        # no hace falta refresh
+        db.flush()
+        if status == "approved":
+            append_entries(db, payment_entries(db_payment.id, payment.card_id, payment.account_amount))
+        response = PaymentResponse.model_validate(db_payment)
+        if claim:
+            complete_key(db, claim, 201, response)
+        return response
+
+    return job
+
+
+def transfer_write_job(sender_id: int, receiver_id: int, transfer: TransferCreate,
+                       claim: Optional[IdempotencyClaim]) -> Callable[[Session], TransferResponse]:
+    def job(db: Session) -> TransferResponse:
+        # Locks de las dos cuentas antes de insertar nada (ver lock_statements)
+        lock_accounts(db, debit_ids=[sender_id], credit_ids=[receiver_id])
+        now = datetime.utcnow()
+        db_transfer = Transfer(
+            sender_id=sender_id,
+            receiver_id=receiver_id,
+            amount=transfer.amount_minor,
+            currency=transfer.currency,
+            status="completed",
+            description=transfer.description,
+            created_at=now,
+            completed_at=now
+        )
+        db.add(db_transfer)
+        record_spend(db, sender_id, transfer.account_amount, db_transfer.created_at)
+        db.flush()
+        # El saldo es el libro mayor: el débito se asienta y después se verifica que alcanzaba
+        append_entries(db, transfer_entries(db_transfer.id, sender_id, receiver_id, transfer.account_amount))
+        ensure_funds(db, sender_id, transfer.account_amount)
+        response = TransferResponse.model_validate(db_transfer)
+        if claim:
+            complete_key(db, claim, 201, response)
+        return response
+
+    return job
@@ -0,0 +1,7 @@
+"""
+Benchmarks de la API de pagos.
+
+Cada módulo se ejecuta con `python -m benchmarks.<nombre>` y escribe sus
+resultados en JSON (stdout o --output). Por defecto usan una base SQLite
+temporal; --database-url permite apuntar a una base descartable.
+"""
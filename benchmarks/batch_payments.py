@@ -0,0 +1,76 @@
+"""
+Costo por pago: POST /payments uno a uno frente a POST /payments/batch.
+
+Uso:
+    python -m benchmarks.batch_payments [--items 2000] [--batch-size 200] [--database-url URL] [--output FILE]
+"""
+import argparse
+import time
+from benchmarks.common import use_scratch_database, create_schema, seed_users, seed_cards, auth_headers, write_report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de pagos en lote")
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database(args.database_url)
+    create_schema()
+
+    from fastapi.testclient import TestClient
+    from app.config import settings
+    from app.database import new_session
+    from app.main import app
+
+    # Un solo usuario y tarjeta pagando en loop: las reglas de velocidad y el rate limiting lo cortarían
+    settings.velocity_enabled = False
+    settings.rate_limit_enabled = False
+
+    db = new_session()
+    try:
+        single_user, batch_user = seed_users(db, 2)
+        cards = seed_cards(db, [single_user, batch_user])
+    finally:
+        db.close()
+
+    client = TestClient(app)
+
+    headers = auth_headers(single_user)
+    payload = {"card_id": cards[single_user], "amount": 1.0}
+    started = time.perf_counter()
+    for _ in range(args.items):
+        client.post("/payments/", json=payload, headers=headers).raise_for_status()
+    single_seconds = time.perf_counter() - started
+
+    headers = auth_headers(batch_user)
+    item = {"card_id": cards[batch_user], "amount": 1.0}
+    started = time.perf_counter()
+    for offset in range(0, args.items, args.batch_size):
+        size = min(args.batch_size, args.items - offset)
+        client.post("/payments/batch", json={"items": [item] * size}, headers=headers).raise_for_status()
+    batch_seconds = time.perf_counter() - started
+
+    write_report({
+        "benchmark": "batch_payments",
+        "items": args.items,
+        "batch_size": args.batch_size,
+        "results": {
+            "single": {
+                "seconds": round(single_seconds, 3),
+                "ms_per_item": round(single_seconds * 1000 / args.items, 3),
+            },
+            "batch": {
+                "seconds": round(batch_seconds, 3),
+                "ms_per_item": round(batch_seconds * 1000 / args.items, 3),
+            },
+            "speedup": round(single_seconds / batch_seconds, 1) if batch_seconds else None,
+        },
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+"""
+Pago masivo: POST /transfers/batch con miles de receptores frente a POST /transfers uno a uno.
+
+Uso:
+    python -m benchmarks.batch_transfers [--receivers 5000] [--single-sample 200] [--database-url URL] [--output FILE]
+"""
+import argparse
+import time
+from benchmarks.common import use_scratch_database, create_schema, seed_users, auth_headers, write_report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de transferencias en lote")
+    parser.add_argument("--receivers", type=int, default=5000)
+    parser.add_argument("--single-sample", type=int, default=200, help="Transferencias individuales a medir")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database(args.database_url)
+    create_schema()
+
+    from fastapi.testclient import TestClient
+    from app.config import settings
+    from app.database import new_session
+    from app.main import app
+
+    # Un solo emisor transfiriendo en loop: las reglas de velocidad y el rate limiting lo cortarían
+    settings.velocity_enabled = False
+    settings.rate_limit_enabled = False
+    db = new_session()
+    try:
+        sender, single_sender = seed_users(db, 2)
+        receivers = seed_users(db, args.receivers, balance=0.0)
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    items = [{"receiver_id": receiver_id, "amount": 1.0} for receiver_id in receivers]
+    max_batch = settings.max_transfer_batch_size
+
+    started = time.perf_counter()
+    for offset in range(0, len(items), max_batch):
+        response = client.post("/transfers/batch", json={"items": items[offset:offset + max_batch]}, headers=auth_headers(sender))
+        response.raise_for_status()
+    batch_seconds = time.perf_counter() - started
+
+    headers = auth_headers(single_sender)
+    sample = receivers[:args.single_sample]
+    started = time.perf_counter()
+    for receiver_id in sample:
+        client.post("/transfers/", json={"receiver_id": receiver_id, "amount": 1.0}, headers=headers).raise_for_status()
+    single_seconds = time.perf_counter() - started
+    single_per_item = single_seconds / len(sample)
+
+    write_report({
+        "benchmark": "batch_transfers",
+        "receivers": args.receivers,
+        "results": {
+            "batch": {
+                "seconds": round(batch_seconds, 3),
+                "ms_per_item": round(batch_seconds * 1000 / args.receivers, 3),
+            },
+            "single": {
+                "sample": len(sample),
+                "ms_per_item": round(single_per_item * 1000, 3),
+                "estimated_seconds_for_all": round(single_per_item * args.receivers, 1),
+            },
+        },
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
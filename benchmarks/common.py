@@ -0,0 +1,191 @@
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+def use_scratch_database(database_url: Optional[str] = None) -> str:
+    """
+    Fija DATABASE_URL antes de importar la app (la configuración se lee al importar).
+    Sin URL se crea una base SQLite temporal.
+    """
+    if not database_url:
+        scratch_dir = tempfile.mkdtemp(prefix="payments-bench-")
+        database_url = f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    return database_url
+
+
+def create_schema() -> None:
+    """Lo mismo que python -m app.commands.migrate (la app no crea tablas al arrancar)"""
+    from app.database import get_engine
+    from app.services.schema import migrate
+    migrate(get_engine())
+
+
+def seed_users(db, count: int, balance: float = 1_000_000.0, verification_level: str = "premium",
+               email_prefix: Optional[str] = None, password_hash: str = "!") -> list[int]:
+    """
+    Inserta usuarios con un hash fijo (no se ejecuta bcrypt por usuario) y retorna sus ids.
+    El balance va en decimal (dólares), en unidades menores y asentado como apertura del
+    libro mayor. Sin email_prefix los emails llevan un tag al azar.
+    """
+    from sqlalchemy import insert, select
+    from app.config import settings
+    from app.models.user import User
+    from app.services.ledger import open_accounts
+    from app.services.money import to_minor
+
+    prefix = email_prefix or f"bench-{random.getrandbits(32)}"
+    db.execute(insert(User), [
+        {
+            "email": f"{prefix}-{i}@example.com",
+            "name": f"Bench {i}",
+            "password_hash": password_hash,
+            "balance": to_minor(balance, settings.account_currency),
+            "status": "active",
+            "verification_level": verification_level,
+        }
+        for i in range(count)
+    ])
+    db.commit()
+    open_accounts(db)
+    return list(db.execute(select(User.id).where(User.email.like(f"{prefix}-%")).order_by(User.id)).scalars())
+
+
+def seed_cards(db, user_ids: list[int], per_user: int = 1) -> dict[int, int]:
+    """`per_user` tarjetas activas por usuario. Retorna {user_id: id de su primera tarjeta}"""
+    from sqlalchemy import insert, select, func
+    from app.models.card import Card
+
+    year = datetime.utcnow().year + 2
+    db.execute(insert(Card), [
+        {
+            "user_id": user_id,
+            "card_number_masked": "**** **** **** 4242",
+            "card_type": "visa",
+            "expiration_month": 12,
+            "expiration_year": year,
+            "holder_name": "Bench",
+            "status": "active",
+        }
+        for user_id in user_ids
+        for _ in range(per_user)
+    ])
+    db.commit()
+    rows = db.execute(
+        select(Card.user_id, func.min(Card.id)).where(Card.user_id.in_(user_ids)).group_by(Card.user_id)
+    ).all()
+    return dict(rows)
+
+
+def seed_payments(db, cards: dict[int, int], per_user: int, days: int = 90, batch: int = 10_000) -> int:
+    """Inserta pagos históricos distribuidos en los últimos `days` días"""
+    from sqlalchemy import insert
+    from app.models.payment import Payment
+
+    now = datetime.utcnow()
+    rows = []
+    total = 0
+    for user_id, card_id in cards.items():
+        for _ in range(per_user):
+            rows.append({
+                "user_id": user_id,
+                "card_id": card_id,
+                "amount": random.randint(100, 20_000),  # centavos
+                "currency": "USD",
+                "status": random.choice(("approved", "approved", "approved", "declined")),
+                "description": "bench",
+                "created_at": now - timedelta(seconds=random.randint(0, days * 86400)),
+            })
+            if len(rows) >= batch:
+                db.execute(insert(Payment), rows)
+                total += len(rows)
+                rows = []
+    if rows:
+        db.execute(insert(Payment), rows)
+        total += len(rows)
+    db.commit()
+    return total
+
+
+def seed_transfers(db, user_ids: list[int], per_user: int, days: int = 90, batch: int = 10_000) -> int:
+    """Inserta transferencias completadas entre usuarios al azar"""
+    from sqlalchemy import insert
+    from app.models.transfer import Transfer
+
+    if len(user_ids) < 2:
+        return 0
+    now = datetime.utcnow()
+    rows = []
+    total = 0
+    for sender_id in user_ids:
+        for _ in range(per_user):
+            receiver_id = random.choice(user_ids)
+            while receiver_id == sender_id:
+                receiver_id = random.choice(user_ids)
+            created_at = now - timedelta(seconds=random.randint(0, days * 86400))
+            rows.append({
+                "sender_id": sender_id,
+                "receiver_id": receiver_id,
+                "amount": random.randint(100, 10_000),  # centavos
+                "currency": "USD",
+                "status": "completed",
+                "description": "bench",
+                "created_at": created_at,
+                "completed_at": created_at,
+            })
+            if len(rows) >= batch:
+                db.execute(insert(Transfer), rows)
+                total += len(rows)
+                rows = []
+    if rows:
+        db.execute(insert(Transfer), rows)
+        total += len(rows)
+    db.commit()
+    return total
+
+
+def auth_headers(user_id: int) -> dict:
+    from app.auth import create_access_token
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+
+
+def percentiles(samples: list[float]) -> dict:
+    """p50/p95/p99 en milisegundos de latencias en segundos"""
+    if len(samples) < 2:
+        value = round(samples[0] * 1000, 2) if samples else None
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(samples, n=100)
+    return {"p50_ms": round(cuts[49] * 1000, 2), "p95_ms": round(cuts[94] * 1000, 2), "p99_ms": round(cuts[98] * 1000, 2)}
+
+
+def wait_for_server(server: subprocess.Popen, base_url: str, timeout: float = 30.0) -> None:
+    """Espera a que uvicorn responda en GET /; falla enseguida si el proceso terminó"""
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"El servidor terminó con código {server.returncode}")
+        try:
+            httpx.get(f"{base_url}/", timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+def write_report(report: dict, output: Optional[str] = None) -> None:
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
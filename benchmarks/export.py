@@ -0,0 +1,89 @@
+"""
+Throughput y memoria del export en streaming frente a materializar ORM + Pydantic.
+
+Uso:
+    python -m benchmarks.export [--rows 100000] [--database-url URL] [--output FILE]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from benchmarks.common import use_scratch_database, create_schema, seed_users, seed_cards, seed_payments, write_report
+
+
+def _measure(fn) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows, size = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rows": rows,
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed else None,
+        "peak_memory_mb": round(peak / 1_048_576, 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del export de historial")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database(args.database_url)
+    create_schema()
+
+    from sqlalchemy import select
+    from app.database import new_session
+    from app.models.payment import Payment
+    from app.schemas.payment import PaymentResponse
+    from app.services.export import PAYMENT_COLUMNS, payment_export_stmts, stream_export
+
+    db = new_session()
+    try:
+        [user_id] = seed_users(db, 1)
+        seed_payments(db, seed_cards(db, [user_id]), args.rows)
+    finally:
+        db.close()
+
+    def export(fmt):
+        def run():
+            stmts = payment_export_stmts(user_id, None, None, None)
+            size = 0
+            lines = 0
+            for chunk in stream_export(stmts, PAYMENT_COLUMNS, fmt):
+                size += len(chunk)
+                lines += chunk.count("\n")
+            return lines - (1 if fmt == "csv" else 0), size
+        return run
+
+    def materialized():
+        # Camino de los endpoints de listado: instancias ORM + modelos Pydantic en memoria
+        session = new_session()
+        try:
+            payments = session.execute(
+                select(Payment).where(Payment.user_id == user_id).order_by(Payment.created_at, Payment.id)
+            ).scalars().all()
+            body = json.dumps([PaymentResponse.model_validate(p).model_dump(mode="json") for p in payments])
+            return len(payments), len(body)
+        finally:
+            session.close()
+
+    write_report({
+        "benchmark": "export",
+        "rows": args.rows,
+        "results": {
+            "stream_ndjson": _measure(export("ndjson")),
+            "stream_csv": _measure(export("csv")),
+            "materialized_orm_pydantic": _measure(materialized),
+        },
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""
+Cliente del gateway contra el gateway de prueba (app.commands.gateway_stub).
+
+Compara un thread bloqueado por round trip (como un router síncrono con un
+cliente HTTP bloqueante) contra HttpGateway (pool keep-alive async), con y sin
+hedging, frente a una latencia con cola.
+
+Uso:
+    python -m benchmarks.gateway [--requests 2000] [--threads 40] [--latency-ms 50] [--slow-rate 0.02]
+        [--slow-ms 1000] [--connections 60] [--pool-shards 10] [--hedge-delay 0.15] [--port 9101] [--output FILE]
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import use_scratch_database, percentiles, write_report
+
+
+def _wait_for_stub(url: str, timeout: float = 15.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.post(f"{url}/authorize", json={"amount": 1, "currency": "USD", "card_type": "visa"}, timeout=5.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("El gateway de prueba no respondió a tiempo")
+
+
+def _run_threads(url: str, requests: int, threads: int) -> tuple[float, list[float]]:
+    import httpx
+
+    payload = {"amount": 10.0, "currency": "USD", "card_type": "visa"}
+    with httpx.Client(base_url=url, timeout=10.0) as client:
+        def call(_):
+            started = time.perf_counter()
+            client.post("/authorize", json=payload).raise_for_status()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(call, range(requests)))
+        return time.perf_counter() - started, latencies
+
+
+def _run_gateway(gateway, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    async def run():
+        # Misma concurrencia ofrecida que el modo bloqueante: latencias comparables
+        slots = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with slots:
+                started = time.perf_counter()
+                await gateway.authorize_async(10.0, "USD", "visa")
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(timed() for _ in range(requests)))
+
+    gateway.authorize_blocking(1.0, "USD", "visa")  # conexiones y event loop listos
+    started = time.perf_counter()
+    latencies = asyncio.run(run())
+    return time.perf_counter() - started, list(latencies)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del cliente del gateway de pagos")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=40, help="Requests en vuelo: threads del modo bloqueante, slots del async")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--slow-rate", type=float, default=0.02)
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--connections", type=int, default=60, help="Deja margen para los hedges")
+    parser.add_argument("--pool-shards", type=int, default=10)
+    parser.add_argument("--hedge-delay", type=float, default=0.15)
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database()
+    from app.services.gateway import HttpGateway, CircuitBreaker
+
+    url = f"http://127.0.0.1:{args.port}"
+    stub = subprocess.Popen([
+        sys.executable, "-m", "app.commands.gateway_stub", "--port", str(args.port),
+        "--latency-ms", str(args.latency_ms), "--slow-rate", str(args.slow_rate), "--slow-ms", str(args.slow_ms)
+    ])
+    results = {}
+    try:
+        _wait_for_stub(url)
+        seconds, latencies = _run_threads(url, args.requests, args.threads)
+        results["blocking_threads"] = {"seconds": round(seconds, 3), "requests_per_second": round(args.requests / seconds, 1), **percentiles(latencies)}
+
+        for name, hedge_delay in (("async_pool", 0.0), ("async_pool_hedged", args.hedge_delay)):
+            gateway = HttpGateway(
+                url=url, timeout=10.0, connect_timeout=1.0, max_connections=args.connections, pool_shards=args.pool_shards,
+                max_attempts=2, hedge_delay=hedge_delay, breaker=CircuitBreaker(50, 5.0)
+            )
+            try:
+                seconds, latencies = _run_gateway(gateway, args.requests, args.threads)
+                stats = gateway.stats()
+            finally:
+                gateway.close()
+            results[name] = {
+                "seconds": round(seconds, 3),
+                "requests_per_second": round(args.requests / seconds, 1),
+                **percentiles(latencies),
+                "hedges": stats["hedges"],
+                "hedge_wins": stats["hedge_wins"],
+                "retries": stats["retries"],
+                "circuit": stats["circuit"]["state"],
+            }
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    write_report({
+        "benchmark": "gateway",
+        "requests": args.requests,
+        "gateway_latency_ms": args.latency_ms,
+        "slow_rate": args.slow_rate,
+        "results": results,
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+"""
+Micro-batching de autorizaciones contra el gateway de prueba.
+
+El gateway de prueba corre con costo fijo por llamada y un máximo de llamadas
+simultáneas: sin batching el throughput queda limitado a
+max_concurrent_calls / latencia; con batching cada llamada lleva varios pagos.
+
+Uso:
+    python -m benchmarks.gateway_batching [--requests 4000] [--concurrency 200] [--latency-ms 20]
+        [--max-concurrent-calls 20] [--window-ms 2] [--max-batch-size 50] [--port 9102] [--output FILE]
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from benchmarks.common import use_scratch_database, percentiles, write_report
+from benchmarks.gateway import _wait_for_stub
+
+
+def _run(gateway, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with slots:
+                started = time.perf_counter()
+                await gateway.authorize_async(10.0, "USD", "visa")
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(timed() for _ in range(requests)))
+
+    gateway.authorize_blocking(1.0, "USD", "visa")  # conexiones y event loop listos
+    started = time.perf_counter()
+    latencies = asyncio.run(run())
+    return time.perf_counter() - started, list(latencies)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de micro-batching de autorizaciones")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=200, help="Autorizaciones en vuelo")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Costo fijo por llamada al gateway")
+    parser.add_argument("--max-concurrent-calls", type=int, default=20)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=9102)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database()
+    import httpx
+    from app.services.gateway import HttpGateway, CircuitBreaker
+
+    url = f"http://127.0.0.1:{args.port}"
+    stub = subprocess.Popen([
+        sys.executable, "-m", "app.commands.gateway_stub", "--port", str(args.port),
+        "--latency-ms", str(args.latency_ms), "--slow-rate", "0",
+        "--max-concurrent-calls", str(args.max_concurrent_calls)
+    ])
+    results = {}
+    try:
+        _wait_for_stub(url)
+        for name, window in (("unbatched", 0.0), ("batched", args.window_ms / 1000)):
+            gateway = HttpGateway(
+                url=url, timeout=30.0, connect_timeout=1.0, max_connections=args.concurrency, pool_shards=10,
+                max_attempts=1, hedge_delay=0.0, breaker=CircuitBreaker(50, 5.0),
+                batch_window=window, max_batch_size=args.max_batch_size
+            )
+            calls_before = httpx.get(f"{url}/stats").json()["calls"]
+            try:
+                seconds, latencies = _run(gateway, args.requests, args.concurrency)
+                stats = gateway.stats()
+            finally:
+                gateway.close()
+            calls = httpx.get(f"{url}/stats").json()["calls"] - calls_before
+            results[name] = {
+                "seconds": round(seconds, 3),
+                "requests_per_second": round(args.requests / seconds, 1),
+                **percentiles(latencies),
+                "gateway_calls": calls,
+            }
+            if "batching" in stats:
+                batching = stats["batching"]
+                wait = batching["wait_seconds"]
+                results[name].update({
+                    "avg_batch_size": batching["avg_batch_size"],
+                    "calls_saved": batching["calls_saved"],
+                    "avg_wait_ms": round(wait["sum"] / wait["count"] * 1000, 3) if wait["count"] else 0,
+                })
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    results["throughput_gain"] = round(
+        results["batched"]["requests_per_second"] / results["unbatched"]["requests_per_second"], 2
+    )
+    write_report({
+        "benchmark": "gateway_batching",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "gateway_latency_ms": args.latency_ms,
+        "max_concurrent_calls": args.max_concurrent_calls,
+        "window_ms": args.window_ms,
+        "max_batch_size": args.max_batch_size,
+        "results": results,
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+"""
+Group commit de pagos y transferencias contra commit por request.
+
+Varios threads ejecutan el camino de escritura de create_payment y
+create_transfer (write_and_commit con los jobs de app.services.write_jobs),
+alternando pagos y transferencias entre pocos usuarios. Se mide
+escrituras/s, commits/s y latencia por escritura en cada modo, y al final se
+verifica que el balance total se conserve.
+
+Uso:
+    python -m benchmarks.group_commit [--users 20] [--writes 4000] [--threads 16]
+        [--window-ms 2] [--max-group-size 200] [--database-url URL] [--output FILE]
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import use_scratch_database, create_schema, seed_users, seed_cards, percentiles, write_report
+
+
+def _run(users: list[int], cards: dict[int, int], writes: int, threads: int) -> tuple[float, list[float], int]:
+    from fastapi import HTTPException
+    from app.database import new_session
+    from app.schemas.payment import PaymentCreate
+    from app.schemas.transfer import TransferCreate
+    from app.services.group_commit import write_and_commit
+    from app.services.write_jobs import payment_write_job, transfer_write_job
+
+    def write(i: int):
+        sender, receiver = random.sample(users, 2)
+        if i % 2:
+            job = payment_write_job(sender, PaymentCreate(card_id=cards[sender], amount=5.0), "approved", None)
+        else:
+            job = transfer_write_job(sender, receiver, TransferCreate(receiver_id=receiver, amount=5.0), None)
+        db = new_session()
+        started = time.perf_counter()
+        try:
+            write_and_commit(db, job)
+            failed = 0
+        except HTTPException:
+            failed = 1
+        finally:
+            db.close()
+        return time.perf_counter() - started, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(write, range(writes)))
+    return time.perf_counter() - started, [latency for latency, _ in outcomes], sum(failed for _, failed in outcomes)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de group commit")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=4000, help="Escrituras por modo (mitad pagos, mitad transferencias)")
+    parser.add_argument("--threads", type=int, default=16, help="Requests concurrentes")
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-group-size", type=int, default=200)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database(args.database_url)
+    from sqlalchemy import event, func, select
+    from app.config import settings
+    from app.database import get_engine, new_session
+    from app.models.user import User
+    from app.services.group_commit import group_committer
+
+    create_schema()
+    with new_session() as db:
+        users = seed_users(db, args.users)
+        cards = seed_cards(db, users)
+        total_before = db.execute(select(func.sum(User.ledger_balance)).select_from(User)).scalar()
+
+    engine = get_engine()
+    commits = [0]
+    event.listen(engine, "commit", lambda conn: commits.__setitem__(0, commits[0] + 1))
+    group_committer.window = args.window_ms / 1000
+    group_committer.max_group_size = args.max_group_size
+
+    results = {}
+    for name, enabled in (("per_request", False), ("group_commit", True)):
+        settings.group_commit = enabled
+        commits_before = commits[0]
+        seconds, latencies, failed = _run(users, cards, args.writes, args.threads)
+        # La sesión del request no lee nada acá: en group commit solo confirma el writer
+        durable = commits[0] - commits_before
+        results[name] = {
+            "seconds": round(seconds, 3),
+            "writes_per_second": round(args.writes / seconds, 1),
+            "commits": durable,
+            "commits_per_second": round(durable / seconds, 1),
+            **percentiles(latencies),
+            "failed": failed,
+        }
+        if enabled:
+            stats = group_committer.stats()
+            results[name].update({"avg_group_size": stats["avg_group_size"], "fallbacks": stats["fallbacks"]})
+    group_committer.shutdown()
+
+    with new_session() as db:
+        total_after = db.execute(select(func.sum(User.ledger_balance)).select_from(User)).scalar()
+    results["throughput_gain"] = round(
+        results["group_commit"]["writes_per_second"] / results["per_request"]["writes_per_second"], 2
+    )
+    write_report({
+        "benchmark": "group_commit",
+        "database": engine.url.get_backend_name(),
+        "users": args.users,
+        "writes": args.writes,
+        "threads": args.threads,
+        "window_ms": args.window_ms,
+        "results": results,
+        "balance_conserved": total_after == total_before,
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
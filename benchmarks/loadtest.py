@@ -0,0 +1,321 @@
+"""
+Prueba de carga de la API con mezclas de tráfico realistas.
+
+Genera una traza (registro, login, pagos, transferencias, historiales y
+/users/me/limits según los pesos de la mezcla) y la ejecuta contra la app
+ASGI en proceso (httpx.ASGITransport) o contra uvicorn en un socket real.
+La traza ejecutada se graba en JSONL (--record) y se reproduce con
+--replay; con --pace se respetan los tiempos grabados en lugar de mantener
+--concurrency requests en vuelo.
+
+El reporte JSON tiene throughput y p50/p95/p99 por ruta. Con --baseline se
+compara contra un reporte anterior y el proceso termina con código 1 si el
+p95 de alguna ruta empeora más que --max-regression.
+
+Sin --database-url se siembra una base SQLite temporal; con una URL se usa
+el dataset sembrado con benchmarks.seed.
+
+Uso:
+    python -m benchmarks.loadtest [--target inprocess|socket] [--mix default|read_heavy|write_heavy]
+        [--requests 5000] [--concurrency 32] [--seed 1] [--database-url URL] [--users 200]
+        [--workers 1] [--port 8770] [--record FILE] [--replay FILE] [--pace] [--speed 1.0]
+        [--baseline FILE] [--max-regression 0.2] [--output FILE]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Optional
+from benchmarks.common import use_scratch_database, create_schema, auth_headers, percentiles, wait_for_server, write_report
+from benchmarks.seed import EMAIL_PREFIX, DEFAULT_PASSWORD, seed_dataset, load_dataset
+
+# Pesos relativos de cada ruta en la mezcla
+MIXES = {
+    "default": {"register": 1, "login": 2, "pay": 25, "transfer": 15, "list_payments": 25, "list_transfers": 17, "limits": 15},
+    "read_heavy": {"login": 1, "pay": 8, "transfer": 6, "list_payments": 40, "list_transfers": 25, "limits": 20},
+    "write_heavy": {"login": 1, "pay": 45, "transfer": 40, "list_payments": 7, "limits": 7},
+}
+
+# Status esperado por ruta: cualquier otro cuenta como error
+EXPECTED_STATUS = {
+    "register": 201, "login": 200, "pay": 201, "transfer": 201,
+    "list_payments": 200, "list_transfers": 200, "limits": 200,
+}
+
+# Campos de una entrada de traza (lo demás en el JSONL es resultado de la ejecución)
+TRACE_FIELDS = ("route", "user", "receiver", "amount", "offset_ms")
+
+
+def generate_trace(mix: str, requests: int, users: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    routes, weights = zip(*MIXES[mix].items())
+    trace = []
+    for _ in range(requests):
+        route = rng.choices(routes, weights)[0]
+        entry = {"route": route}
+        if route != "register":
+            entry["user"] = rng.randrange(users)
+        if route == "pay":
+            entry["amount"] = round(rng.uniform(1, 200), 2)
+        elif route == "transfer":
+            receiver = rng.randrange(users - 1)
+            entry["receiver"] = receiver + (receiver >= entry["user"])
+            entry["amount"] = round(rng.uniform(1, 50), 2)
+        trace.append(entry)
+    return trace
+
+
+def read_trace(path: str) -> list[dict]:
+    with open(path) as f:
+        return [
+            {key: value for key, value in json.loads(line).items() if key in TRACE_FIELDS}
+            for line in f if line.strip()
+        ]
+
+
+def write_trace(path: str, results: list[dict]) -> None:
+    with open(path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+
+class RequestBuilder:
+    """Arma el request HTTP de cada entrada de la traza contra el dataset sembrado"""
+
+    def __init__(self, dataset: list[tuple[int, int]], password: str):
+        self.dataset = dataset
+        self.password = password
+        # Emails de registro únicos por corrida: una traza se puede reproducir sobre la misma base
+        self.nonce = random.getrandbits(32)
+        self._headers: dict[int, dict] = {}
+
+    def headers(self, index: int) -> dict:
+        if index not in self._headers:
+            self._headers[index] = auth_headers(self.dataset[index][0])
+        return self._headers[index]
+
+    def build(self, position: int, entry: dict) -> tuple[str, str, Optional[dict], dict]:
+        route = entry["route"]
+        if route == "register":
+            email = f"register-{self.nonce}-{position}@example.com"
+            return "POST", "/users/register", {"email": email, "name": "Load", "password": self.password}, {}
+        index = entry["user"]
+        if route == "login":
+            return "POST", "/users/login", {"email": f"{EMAIL_PREFIX}-{index}@example.com", "password": self.password}, {}
+        headers = self.headers(index)
+        if route == "pay":
+            return "POST", "/payments/", {"card_id": self.dataset[index][1], "amount": entry["amount"]}, headers
+        if route == "transfer":
+            body = {"receiver_id": self.dataset[entry["receiver"]][0], "amount": entry["amount"]}
+            return "POST", "/transfers/", body, headers
+        if route == "list_payments":
+            return "GET", "/payments/?limit=50", None, headers
+        if route == "list_transfers":
+            return "GET", "/transfers/?limit=50", None, headers
+        if route == "limits":
+            return "GET", "/users/me/limits", None, headers
+        raise ValueError(f"Ruta desconocida en la traza: {route}")
+
+
+async def run_trace(client, trace: list[dict], builder: RequestBuilder, concurrency: int,
+                    pace: bool = False, speed: float = 1.0) -> tuple[list[dict], float]:
+    import httpx
+
+    results: list[Optional[dict]] = [None] * len(trace)
+    started = time.perf_counter()
+
+    async def execute(position: int, entry: dict) -> None:
+        method, path, body, headers = builder.build(position, entry)
+        request_started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body, headers=headers)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        latency = time.perf_counter() - request_started
+        results[position] = {
+            **{key: value for key, value in entry.items() if key != "offset_ms"},
+            "offset_ms": round((request_started - started) * 1000, 3),
+            "status": status,
+            "latency_ms": round(latency * 1000, 3),
+        }
+
+    if pace:
+        # Lazo abierto: cada request sale en su instante grabado (acotado por concurrency)
+        slots = asyncio.Semaphore(concurrency)
+
+        async def paced(position: int, entry: dict) -> None:
+            await asyncio.sleep(max(0.0, started + entry.get("offset_ms", 0) / 1000 / speed - time.perf_counter()))
+            async with slots:
+                await execute(position, entry)
+
+        await asyncio.gather(*(paced(position, entry) for position, entry in enumerate(trace)))
+    else:
+        # Lazo cerrado: `concurrency` clientes toman la siguiente entrada al terminar la anterior
+        pending = iter(enumerate(trace))
+
+        async def worker() -> None:
+            for position, entry in pending:
+                await execute(position, entry)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def _route_summary(items: list[dict], seconds: float, errors: int) -> dict:
+    latencies = [item["latency_ms"] / 1000 for item in items]
+    statuses = Counter(str(item["status"]) for item in items)
+    return {
+        "count": len(items),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(items) / seconds, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        **percentiles(latencies),
+    }
+
+
+def summarize(results: list[dict], seconds: float) -> dict:
+    by_route: dict[str, list[dict]] = defaultdict(list)
+    for result in results:
+        by_route[result["route"]].append(result)
+    routes = {
+        route: _route_summary(items, seconds, sum(1 for item in items if item["status"] != EXPECTED_STATUS[route]))
+        for route, items in sorted(by_route.items())
+    }
+    overall = _route_summary(results, seconds, sum(summary["errors"] for summary in routes.values()))
+    return {"overall": overall, "routes": routes}
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> dict:
+    """Cambio relativo de cada métrica contra el baseline; regresión = p95 peor que max_regression"""
+    routes = {}
+    regressions = []
+    for route, current in report["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        changes = {}
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before.get(metric) and current.get(metric) is not None:
+                changes[metric] = {
+                    "baseline": before[metric],
+                    "current": current[metric],
+                    "change": round(current[metric] / before[metric] - 1, 3),
+                }
+        routes[route] = changes
+        if "p95_ms" in changes and changes["p95_ms"]["change"] > max_regression:
+            regressions.append(route)
+    return {"max_regression": max_regression, "routes": routes, "regressions": regressions}
+
+
+async def _run_inprocess(trace, builder, args) -> tuple[list[dict], float]:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120.0) as client:
+            return await run_trace(client, trace, builder, args.concurrency, args.pace, args.speed)
+
+
+def _run_socket(trace, builder, args, database_url: str) -> tuple[list[dict], float]:
+    import httpx
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env={**os.environ, "DATABASE_URL": database_url},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_server(server, base_url)
+
+        async def run():
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+                return await run_trace(client, trace, builder, args.concurrency, args.pace, args.speed)
+
+        return asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de pagos")
+    parser.add_argument("--target", choices=("inprocess", "socket"), default="inprocess")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests en vuelo")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de la traza generada")
+    parser.add_argument("--database-url", default=None, help="Base ya sembrada con benchmarks.seed")
+    parser.add_argument("--users", type=int, default=200, help="Usuarios a sembrar en la base temporal")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (target socket)")
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--record", default=None, help="Graba la traza ejecutada en JSONL")
+    parser.add_argument("--replay", default=None, help="Reproduce una traza JSONL en lugar de generarla")
+    parser.add_argument("--pace", action="store_true", help="Respeta los tiempos de la traza reproducida")
+    parser.add_argument("--speed", type=float, default=1.0, help="Factor de velocidad con --pace")
+    parser.add_argument("--baseline", default=None, help="Reporte JSON anterior para comparar")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    database_url = use_scratch_database(args.database_url)
+    create_schema()
+    from app.database import new_session
+
+    with new_session() as db:
+        if not args.database_url:
+            seed_dataset(db, args.users, password=args.password)
+        dataset = load_dataset(db)
+    if len(dataset) < 2:
+        raise SystemExit("La base no tiene el dataset de carga: correr python -m benchmarks.seed")
+
+    if args.replay:
+        trace = read_trace(args.replay)
+        highest = max((max(entry.get("user", 0), entry.get("receiver", 0)) for entry in trace), default=0)
+        if highest >= len(dataset):
+            raise SystemExit(f"La traza usa el usuario {highest} y el dataset tiene {len(dataset)}")
+    else:
+        trace = generate_trace(args.mix, args.requests, len(dataset), args.seed)
+
+    builder = RequestBuilder(dataset, args.password)
+    if args.target == "inprocess":
+        results, seconds = asyncio.run(_run_inprocess(trace, builder, args))
+    else:
+        results, seconds = _run_socket(trace, builder, args, database_url)
+    if args.record:
+        write_trace(args.record, results)
+
+    report = {
+        "benchmark": "loadtest",
+        "target": args.target,
+        "mix": None if args.replay else args.mix,
+        "trace": args.replay or f"generated (seed {args.seed})",
+        "requests": len(trace),
+        "concurrency": args.concurrency,
+        "database": database_url.split(":", 1)[0],
+        "users": len(dataset),
+        "seconds": round(seconds, 3),
+        **summarize(results, seconds),
+    }
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), args.max_regression)
+        exit_code = 1 if report["comparison"]["regressions"] else 0
+    write_report(report, args.output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+"""
+Montos en unidades menores: agregados y migración en línea.
+
+Sobre una base con el esquema anterior (montos FLOAT) se mide:
+- SUM por usuario de la columna FLOAT contra la BIGINT: tiempo y diferencia en
+  centavos entre la suma en float y la exacta
+- backfill en lotes (money_migration.backfill_column): filas por segundo y duración
+  de cada transacción, que es lo que bloquea a la app mientras corre
+- finalize: la ventana con escrituras detenidas (en SQLite recrea las tablas)
+
+Uso:
+    python -m benchmarks.money [--users 200] [--payments 500] [--batch-size 1000]
+        [--iterations 20] [--database-url URL] [--output FILE]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from benchmarks.common import use_scratch_database, write_report
+
+
+def _create_legacy_schema(engine) -> None:
+    """Las tablas de los modelos con las columnas de dinero como FLOAT (esquema anterior)"""
+    from sqlalchemy import Float, MetaData
+    from app.database import Base
+    from app.services.money_migration import MONEY_COLUMNS
+
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    for table_name, column_name, _, _ in MONEY_COLUMNS:
+        metadata.tables[table_name].c[column_name].type = Float()
+    metadata.create_all(engine)
+
+
+def _seed_legacy(engine, users: int, payments: int) -> None:
+    from sqlalchemy import insert, select
+    from app.models.card import Card
+    from app.models.payment import Payment
+    from app.models.user import User
+
+    year = datetime.utcnow().year + 2
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"email": f"money-{i}@example.com", "name": "Bench", "password_hash": "!", "balance": 1000.0}
+            for i in range(users)
+        ])
+        user_ids = list(conn.execute(select(User.id)).scalars())
+        conn.execute(insert(Card), [
+            {"user_id": user_id, "card_number_masked": "**** 4242", "card_type": "visa",
+             "expiration_month": 12, "expiration_year": year, "holder_name": "Bench"}
+            for user_id in user_ids
+        ])
+        cards = dict(conn.execute(select(Card.user_id, Card.id)).all())
+        for user_id in user_ids:
+            # Montos con centavos como los guardaba la versión anterior (round(v, 2) en float)
+            conn.execute(insert(Payment), [
+                {"user_id": user_id, "card_id": cards[user_id], "amount": round(random.uniform(0.01, 200), 2),
+                 "currency": "USD", "status": "approved", "description": "bench",
+                 "created_at": now - timedelta(seconds=random.randint(0, 30 * 86400))}
+                for _ in range(payments)
+            ])
+
+
+def _measure_sums(engine, iterations: int) -> dict:
+    from sqlalchemy import column, func, select, table
+
+    payments = table("payments", column("user_id"), column("amount"), column("amount_minor"))
+
+    def run(amount_column):
+        stmt = select(payments.c.user_id, func.sum(amount_column)).group_by(payments.c.user_id)
+        with engine.connect() as conn:
+            conn.execute(stmt).all()
+            started = time.perf_counter()
+            for _ in range(iterations):
+                rows = dict(conn.execute(stmt).all())
+            return rows, (time.perf_counter() - started) / iterations * 1000
+
+    float_sums, float_ms = run(payments.c.amount)
+    exact_sums, exact_ms = run(payments.c.amount_minor)
+    drift = [abs(float_sums[user_id] * 100 - exact_sums[user_id]) for user_id in exact_sums]
+    return {
+        "float_sum_ms": round(float_ms, 2),
+        "integer_sum_ms": round(exact_ms, 2),
+        "max_drift_cents": float(f"{max(drift):.3g}"),
+        # Usuarios cuya suma en float ya no es un número exacto de centavos
+        "users_with_drift": sum(1 for value in drift if value > 0),
+        "users_off_by_a_cent_after_rounding": sum(
+            1 for user_id in exact_sums if round(float_sums[user_id] * 100) != exact_sums[user_id]
+        ),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de montos en unidades menores")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--payments", type=int, default=500, help="Pagos por usuario")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database(args.database_url)
+
+    from app.database import get_engine
+    from app.services.money_migration import add_shadow_columns, backfill_column, finalize, legacy_money_columns
+
+    engine = get_engine()
+    _create_legacy_schema(engine)
+    _seed_legacy(engine, args.users, args.payments)
+    rows = args.users * args.payments
+
+    add_shadow_columns(engine)
+    started = time.perf_counter()
+    written = backfill_column(engine, "payments.amount", args.batch_size)
+    backfill_seconds = time.perf_counter() - started
+    batches = -(-written // args.batch_size)
+
+    sums = _measure_sums(engine, args.iterations)
+
+    for qualified in legacy_money_columns(engine):
+        if qualified != "payments.amount":
+            backfill_column(engine, qualified, args.batch_size)
+    started = time.perf_counter()
+    finalize(engine, args.batch_size)
+    finalize_seconds = time.perf_counter() - started
+
+    write_report({
+        "benchmark": "money",
+        "database": engine.url.get_backend_name(),
+        "payments": rows,
+        "batch_size": args.batch_size,
+        "backfill": {
+            "rows_per_second": round(written / backfill_seconds) if backfill_seconds else None,
+            "ms_per_batch": round(backfill_seconds / batches * 1000, 2) if batches else None,
+            "seconds": round(backfill_seconds, 2),
+        },
+        "sums_by_user": sums,
+        "finalize_seconds": round(finalize_seconds, 2),
+        "legacy_columns_left": legacy_money_columns(engine),
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
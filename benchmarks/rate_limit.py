@@ -0,0 +1,203 @@
+"""
+Inquilino ruidoso contra uvicorn, con y sin rate limiting.
+
+Un proceso cliente aparte (el "ruidoso") llama GET /users/me/limits a --noisy-rate
+requests por segundo, muy por encima de su presupuesto y sin respetar los 429. En
+paralelo, --quiet-users usuarios hacen el mismo request cada --quiet-interval segundos
+(dentro del suyo) y se mide su latencia. Limitar no vuelve gratis al request rechazado:
+lo que cambia es que cuesta un 429 en vez de cuatro agregados en la base.
+Tres fases con el servidor reiniciado en cada una:
+
+- quiet: solo los usuarios tranquilos (referencia)
+- noisy_unlimited: con el ruidoso y RATE_LIMIT_ENABLED=0
+- noisy_limited: con el ruidoso y los buckets de settings
+
+Con --shared los workers usan el servidor de contadores (app.commands.counter_server).
+También se mide el costo de TokenBuckets.take en proceso.
+
+Uso:
+    python -m benchmarks.rate_limit [--seconds 10] [--quiet-users 16] [--quiet-interval 0.6]
+        [--noisy-rate 200] [--noisy-concurrency 16] [--history 2000] [--workers 1] [--shared] [--port 8771]
+        [--database-url URL] [--output FILE]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from benchmarks.common import (
+    use_scratch_database, create_schema, seed_users, seed_cards, seed_payments, seed_transfers,
+    auth_headers, percentiles, wait_for_server, write_report,
+)
+
+PATH = "/users/me/limits"
+
+
+def _get(client, headers: dict):
+    """Status del request, o "error" si no hubo respuesta (timeout, conexión cerrada)"""
+    import httpx
+
+    try:
+        return client.get(PATH, headers=headers).status_code
+    except httpx.HTTPError:
+        return "error"
+
+
+def _noisy_worker(base_url: str, user_id: int, rate: float, concurrency: int, seconds: float) -> dict:
+    """Proceso cliente ruidoso: `concurrency` threads llamando PATH a `rate` requests/s en total"""
+    import httpx
+
+    headers = auth_headers(user_id)
+    interval = concurrency / rate
+    deadline = time.monotonic() + seconds
+
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        def loop(_):
+            statuses = Counter()
+            next_at = time.monotonic()
+            while next_at < deadline:
+                statuses[_get(client, headers)] += 1
+                # Si se atrasa no recupera: el servidor ya está saturado
+                next_at = max(next_at + interval, time.monotonic())
+                time.sleep(max(0.0, next_at - time.monotonic()))
+            return statuses
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return dict(sum(pool.map(loop, range(concurrency)), Counter()))
+
+
+def _quiet(base_url: str, user_ids: list[int], interval: float, seconds: float) -> tuple[list[float], Counter]:
+    import httpx
+
+    deadline = time.monotonic() + seconds
+
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        def loop(index):
+            headers = auth_headers(user_ids[index])
+            latencies, statuses = [], Counter()
+            # Arranques escalonados: tráfico parejo en lugar de ráfagas sincronizadas
+            time.sleep(interval * index / len(user_ids))
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                statuses[_get(client, headers)] += 1
+                latencies.append(time.perf_counter() - started)
+                time.sleep(interval)
+            return latencies, statuses
+
+        with ThreadPoolExecutor(max_workers=len(user_ids)) as pool:
+            outcomes = list(pool.map(loop, range(len(user_ids))))
+    return [latency for latencies, _ in outcomes for latency in latencies], sum((s for _, s in outcomes), Counter())
+
+
+def _phase(args, database_url: str, env: dict, quiet_users: list[int], noisy_user: int, noisy: bool) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env={**os.environ, "DATABASE_URL": database_url, **env},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_server(server, base_url)
+        with get_context("spawn").Pool(1) as pool:
+            noisy_result = (
+                pool.apply_async(_noisy_worker, (base_url, noisy_user, args.noisy_rate, args.noisy_concurrency,
+                                                 args.seconds))
+                if noisy else None
+            )
+            latencies, statuses = _quiet(base_url, quiet_users, args.quiet_interval, args.seconds)
+            noisy_statuses = noisy_result.get() if noisy else {}
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "quiet": {**percentiles(latencies), "requests": len(latencies),
+                  "status_codes": {str(code): count for code, count in sorted(statuses.items(), key=str)}},
+        "noisy": {"requests_per_second": round(sum(noisy_statuses.values()) / args.seconds, 1),
+                  "status_codes": {str(code): count for code, count in sorted(noisy_statuses.items(), key=str)}},
+    }
+
+
+def _take_cost(checks: int = 100_000, users: int = 10_000) -> dict:
+    from app.services.rate_limit import TokenBuckets, route_buckets
+
+    buckets = TokenBuckets(max_keys=users * 4)
+    keys = [route_buckets(user_id, f"GET {PATH}") for user_id in range(users)]
+    samples = []
+    for i in range(checks):
+        started = time.perf_counter_ns()
+        buckets.take(keys[i % users])
+        samples.append(time.perf_counter_ns() - started)
+    cuts = statistics.quantiles(samples, n=100)
+    return {"checks": checks, "p50_us": round(cuts[49] / 1000, 2), "p99_us": round(cuts[98] / 1000, 2)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de rate limiting con un inquilino ruidoso")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duración de cada fase")
+    parser.add_argument("--quiet-users", type=int, default=16)
+    parser.add_argument("--quiet-interval", type=float, default=0.6,
+                        help="Pausa entre requests de cada usuario tranquilo (dentro de su presupuesto)")
+    parser.add_argument("--noisy-rate", type=float, default=200.0, help="Requests/s del inquilino ruidoso")
+    parser.add_argument("--noisy-concurrency", type=int, default=16, help="Threads del inquilino ruidoso")
+    parser.add_argument("--history", type=int, default=2000, help="Pagos y transferencias históricos por usuario")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--shared", action="store_true", help="Buckets en el servidor de contadores compartido")
+    parser.add_argument("--port", type=int, default=8771)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    database_url = use_scratch_database(args.database_url)
+    create_schema()
+    from app.config import settings
+    from app.database import new_session
+
+    with new_session() as db:
+        user_ids = seed_users(db, args.quiet_users + 1)
+        seed_payments(db, seed_cards(db, user_ids), args.history)
+        seed_transfers(db, user_ids, args.history)
+    noisy_user, quiet_users = user_ids[0], user_ids[1:]
+
+    counter_server = None
+    limited_env = {"RATE_LIMIT_ENABLED": "1"}
+    if args.shared:
+        socket_path = os.path.join(tempfile.mkdtemp(prefix="payments-counters-"), "counters.sock")
+        counter_server = subprocess.Popen(
+            [sys.executable, "-m", "app.commands.counter_server", "--socket", socket_path], stdout=subprocess.DEVNULL
+        )
+        while not os.path.exists(socket_path):
+            if counter_server.poll() is not None:
+                raise RuntimeError("El servidor de contadores no arrancó")
+            time.sleep(0.05)
+        limited_env["COUNTER_SERVER_SOCKET"] = socket_path
+    try:
+        phases = {
+            "quiet": _phase(args, database_url, {"RATE_LIMIT_ENABLED": "0"}, quiet_users, noisy_user, False),
+            "noisy_unlimited": _phase(args, database_url, {"RATE_LIMIT_ENABLED": "0"}, quiet_users, noisy_user, True),
+            "noisy_limited": _phase(args, database_url, limited_env, quiet_users, noisy_user, True),
+        }
+    finally:
+        if counter_server is not None:
+            counter_server.terminate()
+            counter_server.wait()
+
+    write_report({
+        "benchmark": "rate_limit",
+        "path": PATH,
+        "policy": settings.rate_limit_routes.get(f"GET {PATH}", settings.rate_limit_default),
+        "workers": args.workers,
+        "shared": args.shared,
+        "take": _take_cost(),
+        "phases": phases,
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+"""
+Dataset para pruebas de carga: usuarios con contraseña conocida (para login),
+tarjetas, pagos y transferencias históricas. Sirve para SQLite o PostgreSQL
+(cualquier URL de SQLAlchemy). Los emails son load-{i}@example.com en orden
+de id: una traza grabada con benchmarks.loadtest referencia usuarios por
+índice y se puede reproducir contra cualquier base sembrada igual.
+
+Uso:
+    python -m benchmarks.seed [--database-url URL] [--users 1000] [--cards-per-user 1]
+        [--payments-per-user 20] [--transfers-per-user 10] [--password PASSWORD] [--output FILE]
+"""
+import argparse
+import time
+from benchmarks.common import use_scratch_database, create_schema, seed_users, seed_cards, seed_payments, seed_transfers, write_report
+
+EMAIL_PREFIX = "load"
+DEFAULT_PASSWORD = "loadtest-password"
+
+
+def seed_dataset(db, users: int, cards_per_user: int = 1, payments_per_user: int = 20,
+                 transfers_per_user: int = 10, password: str = DEFAULT_PASSWORD) -> dict:
+    from sqlalchemy import select
+    from app.auth import get_password_hash
+    from app.models.user import User
+
+    if db.execute(select(User.id).where(User.email == f"{EMAIL_PREFIX}-0@example.com")).first():
+        raise RuntimeError("La base ya tiene el dataset de carga")
+    # Un solo bcrypt: todos los usuarios comparten la contraseña
+    user_ids = seed_users(db, users, email_prefix=EMAIL_PREFIX, password_hash=get_password_hash(password))
+    cards = seed_cards(db, user_ids, cards_per_user)
+    return {
+        "users": len(user_ids),
+        "cards": len(cards) * cards_per_user,
+        "payments": seed_payments(db, cards, payments_per_user),
+        "transfers": seed_transfers(db, user_ids, transfers_per_user),
+    }
+
+
+def load_dataset(db) -> list[tuple[int, int]]:
+    """(user_id, id de su primera tarjeta) de cada usuario del dataset, por índice"""
+    from sqlalchemy import select, func
+    from app.models.card import Card
+    from app.models.user import User
+
+    rows = db.execute(
+        select(User.id, func.min(Card.id))
+        .join(Card, Card.user_id == User.id)
+        .where(User.email.like(f"{EMAIL_PREFIX}-%"))
+        .group_by(User.id)
+        .order_by(User.id)
+    ).all()
+    return [(user_id, card_id) for user_id, card_id in rows]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Siembra el dataset de pruebas de carga")
+    parser.add_argument("--database-url", default=None, help="Sin URL se crea una base SQLite temporal")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--cards-per-user", type=int, default=1)
+    parser.add_argument("--payments-per-user", type=int, default=20)
+    parser.add_argument("--transfers-per-user", type=int, default=10)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    database_url = use_scratch_database(args.database_url)
+    create_schema()
+    from sqlalchemy.engine import make_url
+    from app.database import new_session
+
+    started = time.perf_counter()
+    with new_session() as db:
+        counts = seed_dataset(db, args.users, args.cards_per_user, args.payments_per_user,
+                              args.transfers_per_user, args.password)
+    write_report({
+        "benchmark": "seed",
+        "database_url": make_url(database_url).render_as_string(hide_password=True),
+        "seconds": round(time.perf_counter() - started, 3),
+        **counts,
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
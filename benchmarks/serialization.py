@@ -0,0 +1,182 @@
+"""
+Serialización de los listados: filas por segundo por endpoint antes y después
+del modo fast_serialization.
+
+Por endpoint se miden tres caminos, cada iteración con una sesión nueva:
+- orm: instancias ORM validadas por el response_model (camino anterior)
+- columns: filas por columnas validadas por el response_model (fast_serialization=False)
+- fast: filas por columnas armadas como dicts y serializadas con orjson (fast_serialization=True)
+Los caminos se miden por la función (consulta + JSON, con el mismo TypeAdapter
+que usa FastAPI) y por el endpoint completo en proceso (TestClient).
+
+Uso:
+    python -m benchmarks.serialization [--rows 2000] [--limit 100] [--cards 10]
+        [--iterations 200] [--output FILE]
+"""
+import argparse
+import time
+from benchmarks.common import (
+    use_scratch_database, create_schema, seed_users, seed_cards, seed_payments, seed_transfers, auth_headers,
+    write_report
+)
+
+
+def _rate(fn, rows_per_call: int, iterations: int) -> dict:
+    fn()  # calentar: compilación de la consulta y del TypeAdapter
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+    return {
+        "ms_per_call": round(elapsed / iterations * 1000, 3),
+        "rows_per_second": round(rows_per_call * iterations / elapsed) if elapsed else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listados")
+    parser.add_argument("--rows", type=int, default=2000, help="Pagos y transferencias enviadas del usuario medido")
+    parser.add_argument("--limit", type=int, default=100, help="Tamaño de página")
+    parser.add_argument("--cards", type=int, default=10, help="Tarjetas del usuario medido")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database()
+    create_schema()
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from fastapi.testclient import TestClient
+    from app.config import settings
+    from app.database import new_session
+    from app.main import app
+    from app.models.card import Card
+    from app.models.payment import Payment
+    from app.models.transfer import Transfer
+    from app.schemas.card import CardResponse
+    from app.schemas.payment import PaymentPage
+    from app.schemas.transfer import TransferPage
+    from app.services.history import payments_page_stmt, transfers_page_stmt, merge_transfer_rows
+    from app.services.pagination import build_page, paginate
+    from app.services.serialization import CARD_COLUMNS, page_response, list_response, orjson
+
+    with new_session() as db:
+        user_ids = seed_users(db, 2)
+        seed_payments(db, seed_cards(db, user_ids[:1], args.cards), args.rows)
+        # Con dos usuarios todas las transferencias van del uno al otro
+        seed_transfers(db, user_ids, args.rows)
+    user_id = user_ids[0]
+    limit = args.limit
+
+    adapters = {
+        "payments": TypeAdapter(PaymentPage),
+        "transfers": TypeAdapter(TransferPage),
+        "cards": TypeAdapter(list[CardResponse]),
+    }
+
+    def orm_rows(endpoint, db):
+        # Consultas del camino anterior: select(Modelo) -> instancias en el identity map
+        if endpoint == "payments":
+            stmt = paginate(select(Payment).where(Payment.user_id == user_id), Payment, None, limit)
+            return db.execute(stmt).scalars().all()
+        if endpoint == "cards":
+            return db.execute(select(Card).where(Card.user_id == user_id)).scalars().all()
+        sides = {
+            "transfers_sent": [Transfer.sender_id],
+            "transfers_received": [Transfer.receiver_id],
+        }.get(endpoint, [Transfer.sender_id, Transfer.receiver_id])
+        pages = [
+            db.execute(paginate(select(Transfer).where(side == user_id), Transfer, None, limit)).scalars().all()
+            for side in sides
+        ]
+        return merge_transfer_rows(*pages, limit) if len(pages) == 2 else pages[0]
+
+    def column_rows(endpoint, db):
+        page_args = (user_id, None, None, None, None, limit)
+        if endpoint == "payments":
+            return db.execute(payments_page_stmt(*page_args)).all()
+        if endpoint == "cards":
+            return db.execute(select(*CARD_COLUMNS).where(Card.user_id == user_id)).all()
+        if endpoint == "transfers":
+            sent = db.execute(transfers_page_stmt(Transfer.sender_id, *page_args)).all()
+            received = db.execute(transfers_page_stmt(Transfer.receiver_id, *page_args)).all()
+            return merge_transfer_rows(sent, received, limit)
+        column = Transfer.sender_id if endpoint == "transfers_sent" else Transfer.receiver_id
+        return db.execute(transfers_page_stmt(column, *page_args)).all()
+
+    def pipeline(endpoint, variant):
+        adapter = adapters["cards" if endpoint == "cards" else endpoint.split("_")[0]]
+
+        def run():
+            with new_session() as db:
+                rows = (orm_rows if variant == "orm" else column_rows)(endpoint, db)
+                if variant == "fast":
+                    settings.fast_serialization = True
+                    response = list_response(rows) if endpoint == "cards" else page_response(rows, limit)
+                    return response.body
+                # Lo que hace FastAPI con el response_model: validar y volcar a JSON en pydantic-core
+                content = rows if endpoint == "cards" else build_page(rows, limit)
+                return adapter.dump_json(adapter.validate_python(content))
+        return run
+
+    paths = {
+        "payments": f"/payments/?limit={limit}",
+        "transfers": f"/transfers/?limit={limit}",
+        "transfers_sent": f"/transfers/sent?limit={limit}",
+        "transfers_received": f"/transfers/received?limit={limit}",
+        "cards": "/cards/",
+    }
+    headers = auth_headers(user_id)
+    # Un solo usuario repitiendo cada ruta: el rate limiting lo cortaría
+    settings.rate_limit_enabled = False
+    results = {}
+    with TestClient(app) as client:
+        for endpoint, path in paths.items():
+            with new_session() as db:
+                rows_per_call = min(len(column_rows(endpoint, db)), limit)
+
+            def request(fast):
+                def run():
+                    settings.fast_serialization = fast
+                    response = client.get(path, headers=headers)
+                    assert response.status_code == 200, response.text
+                return run
+
+            settings.fast_serialization = False
+            expected = client.get(path, headers=headers).content
+            settings.fast_serialization = True
+            identical = client.get(path, headers=headers).content == expected
+
+            measured = {
+                "rows_per_call": rows_per_call,
+                "identical_output": identical,
+                "pipeline": {
+                    variant: _rate(pipeline(endpoint, variant), rows_per_call, args.iterations)
+                    for variant in ("orm", "columns", "fast")
+                },
+                "http": {
+                    "columns": _rate(request(False), rows_per_call, args.iterations),
+                    "fast": _rate(request(True), rows_per_call, args.iterations),
+                },
+            }
+            for scope, base in (("pipeline", "orm"), ("http", "columns")):
+                before = measured[scope][base]["rows_per_second"]
+                after = measured[scope]["fast"]["rows_per_second"]
+                measured[scope]["speedup"] = round(after / before, 2) if before else None
+            results[endpoint] = measured
+    settings.fast_serialization = False
+
+    write_report({
+        "benchmark": "serialization",
+        "encoder": "orjson" if orjson is not None else "json",
+        "rows": args.rows,
+        "limit": limit,
+        "iterations": args.iterations,
+        "results": results,
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
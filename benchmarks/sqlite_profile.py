@@ -0,0 +1,126 @@
+"""
+Concurrencia de lecturas y escrituras en SQLite: perfil default (rollback
+journal) contra production (WAL, synchronous=NORMAL y pragmas afinados).
+
+Procesos lectores paginan el historial de pagos mientras procesos escritores
+insertan pagos (mismo camino que create_payment), durante un tiempo fijo.
+Con rollback journal cada commit bloquea a los lectores; en WAL los lectores
+leen la última versión confirmada sin esperar. Cada perfil usa su propia
+base (journal_mode=WAL queda persistido en el archivo).
+
+Uso:
+    python -m benchmarks.sqlite_profile [--readers 4] [--writers 2] [--seconds 10]
+        [--users 200] [--payments-per-user 50] [--output FILE]
+"""
+import argparse
+import os
+import random
+import time
+from multiprocessing import get_context
+from benchmarks.common import use_scratch_database, percentiles, write_report
+
+
+def _init_worker(database_url: str, profile: str) -> None:
+    # La configuración se lee al importar: fijar el entorno antes de importar la app
+    os.environ["DATABASE_PROFILE"] = profile
+    use_scratch_database(database_url)
+    from app.database import get_database
+    import app.services.write_jobs  # noqa: F401
+    # Engines propios del proceso, con el perfil recién fijado
+    get_database()
+
+
+def _seed(users: int, payments_per_user: int) -> tuple[list[int], dict[int, int]]:
+    from benchmarks.common import create_schema, seed_users, seed_cards, seed_payments
+    from app.database import new_session
+
+    create_schema()
+    with new_session() as db:
+        user_ids = seed_users(db, users)
+        cards = seed_cards(db, user_ids)
+        seed_payments(db, cards, payments_per_user)
+    return user_ids, cards
+
+
+def _worker(role: str, user_ids: list[int], cards: dict[int, int], start_at: float, seconds: float, seed: int) -> dict:
+    from sqlalchemy.exc import DBAPIError
+    from app.database import new_session
+    from app.schemas.payment import PaymentCreate
+    from app.services.history import payments_page_stmt
+    from app.services.group_commit import write_and_commit
+    from app.services.write_jobs import payment_write_job
+
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        user_id = rng.choice(user_ids)
+        db = new_session()
+        started = time.perf_counter()
+        try:
+            if role == "writer":
+                job = payment_write_job(user_id, PaymentCreate(card_id=cards[user_id], amount=1.0), "approved", None)
+                write_and_commit(db, job)
+            else:
+                db.execute(payments_page_stmt(user_id, None, None, None, None, 50)).all()
+            latencies.append(time.perf_counter() - started)
+        except DBAPIError:
+            # Base bloqueada más allá del busy timeout (y de los reintentos al escribir)
+            errors += 1
+        finally:
+            db.close()
+    return {"role": role, "latencies": latencies, "errors": errors}
+
+
+def _run_profile(profile: str, args) -> dict:
+    database_url = use_scratch_database()
+    workers = args.readers + args.writers
+    with get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(database_url, profile)) as pool:
+        user_ids, cards = pool.apply(_seed, (args.users, args.payments_per_user))
+        start_at = time.time() + 2.0
+        roles = ["reader"] * args.readers + ["writer"] * args.writers
+        outcomes = pool.starmap(_worker, [
+            (role, user_ids, cards, start_at, args.seconds, i) for i, role in enumerate(roles)
+        ])
+
+    result = {}
+    for role in ("reader", "writer"):
+        latencies = [latency for outcome in outcomes if outcome["role"] == role for latency in outcome["latencies"]]
+        errors = sum(outcome["errors"] for outcome in outcomes if outcome["role"] == role)
+        result[f"{role}s"] = {
+            "operations": len(latencies),
+            "per_second": round(len(latencies) / args.seconds, 1),
+            **percentiles(latencies),
+            "errors": errors,
+        }
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del perfil production de SQLite")
+    parser.add_argument("--readers", type=int, default=4, help="Procesos lectores")
+    parser.add_argument("--writers", type=int, default=2, help="Procesos escritores")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--payments-per-user", type=int, default=50)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    results = {profile: _run_profile(profile, args) for profile in ("default", "production")}
+    for role in ("readers", "writers"):
+        before = results["default"][role]["per_second"]
+        results[f"{role}_throughput_gain"] = round(results["production"][role]["per_second"] / before, 2) if before else None
+    write_report({
+        "benchmark": "sqlite_profile",
+        "readers": args.readers,
+        "writers": args.writers,
+        "seconds": args.seconds,
+        "results": results,
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+"""
+Estrés de transferencias: varios procesos cliente disparan transferencias
+concurrentes entre pocos usuarios contra uvicorn con varios workers.
+Mide throughput y verifica que el dinero se conserve: el balance total no
+cambia, ningún balance queda negativo y cada balance coincide con el historial
+y con el libro mayor (con snapshots escritos mientras corren las transferencias).
+
+Uso:
+    python -m benchmarks.transfer_stress [--users 20] [--transfers 5000] [--clients 4] [--concurrency 8]
+        [--workers 4] [--port 8765] [--database-url URL] [--output FILE]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from benchmarks.common import use_scratch_database, create_schema, seed_users, auth_headers, wait_for_server, write_report
+
+INITIAL_BALANCE = 100.0
+
+
+def _client_worker(base_url: str, user_ids: list[int], transfers: int, concurrency: int, seed: int) -> dict:
+    """Proceso cliente: `transfers` transferencias al azar repartidas en `concurrency` threads"""
+    import httpx
+
+    rng = random.Random(seed)
+    headers = {user_id: auth_headers(user_id) for user_id in user_ids}
+    jobs = []
+    for _ in range(transfers):
+        sender, receiver = rng.sample(user_ids, 2)
+        # Montos con centavos: los saldos en unidades menores se mantienen exactos
+        jobs.append((sender, receiver, round(rng.uniform(1, 20), 2)))
+
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        def send(job):
+            sender, receiver, amount = job
+            response = client.post(
+                "/transfers/", json={"receiver_id": receiver, "amount": amount}, headers=headers[sender]
+            )
+            return response.status_code
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return dict(Counter(pool.map(send, jobs)))
+
+
+def _verify(user_ids: list[int]) -> dict:
+    from sqlalchemy import select, func
+    from app.config import settings
+    from app.database import new_session
+    from app.models.user import User
+    from app.models.transfer import Transfer
+    from app.services.money import to_minor
+    from app.services.ledger import verify_ledger
+
+    db = new_session()
+    try:
+        ledger_mismatches = verify_ledger(db)
+        balances = dict(db.execute(select(User.id, User.ledger_balance).where(User.id.in_(user_ids))).all())
+        sent = dict(db.execute(
+            select(Transfer.sender_id, func.sum(Transfer.amount))
+            .where(Transfer.sender_id.in_(user_ids), Transfer.status == "completed")
+            .group_by(Transfer.sender_id)
+        ).all())
+        received = dict(db.execute(
+            select(Transfer.receiver_id, func.sum(Transfer.amount))
+            .where(Transfer.receiver_id.in_(user_ids), Transfer.status == "completed")
+            .group_by(Transfer.receiver_id)
+        ).all())
+    finally:
+        db.close()
+
+    # Montos en unidades menores (todas las transferencias en la moneda de la cuenta): comparación exacta
+    initial = to_minor(INITIAL_BALANCE, settings.account_currency)
+    mismatched = [
+        user_id for user_id, balance in balances.items()
+        if initial - sent.get(user_id, 0) + received.get(user_id, 0) != balance
+    ]
+    expected_total = initial * len(user_ids)
+    actual_total = sum(balances.values())
+    return {
+        "expected_total": expected_total,
+        "actual_total": actual_total,
+        "total_conserved": expected_total == actual_total,
+        "negative_balances": sorted(user_id for user_id, balance in balances.items() if balance < 0),
+        "history_mismatches": mismatched,
+        "ledger_mismatches": ledger_mismatches,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Estrés de transferencias concurrentes")
+    parser.add_argument("--users", type=int, default=20, help="Pocos usuarios = más contención por fila")
+    parser.add_argument("--transfers", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=4, help="Procesos cliente")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests en vuelo por proceso cliente")
+    parser.add_argument("--workers", type=int, default=4, help="Workers de uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    database_url = use_scratch_database(args.database_url)
+    create_schema()
+
+    from app.database import new_session
+
+    db = new_session()
+    try:
+        # Saldos iniciales como apertura del libro mayor
+        user_ids = seed_users(db, args.users, balance=INITIAL_BALANCE)
+    finally:
+        db.close()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        # Snapshots frecuentes: se escriben en paralelo con las transferencias. Sin reglas de
+        # velocidad ni rate limiting: pocos usuarios transfiriendo a máxima tasa es justamente
+        # lo que cortan
+        env={**os.environ, "DATABASE_URL": database_url,
+             "LEDGER_SNAPSHOT_INTERVAL": "0.5", "LEDGER_SNAPSHOT_MIN_ENTRIES": "20",
+             "VELOCITY_ENABLED": "0", "RATE_LIMIT_ENABLED": "0"},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_server(server, base_url)
+        per_client = [args.transfers // args.clients] * args.clients
+        per_client[0] += args.transfers - sum(per_client)
+
+        started = time.perf_counter()
+        with get_context("spawn").Pool(args.clients) as pool:
+            results = pool.starmap(_client_worker, [
+                (base_url, user_ids, count, args.concurrency, seed) for seed, count in enumerate(per_client)
+            ])
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    statuses: Counter = Counter()
+    for result in results:
+        statuses.update(result)
+    verification = _verify(user_ids)
+    ok = (
+        verification["total_conserved"]
+        and not verification["negative_balances"]
+        and not verification["history_mismatches"]
+        and not verification["ledger_mismatches"]
+    )
+
+    write_report({
+        "benchmark": "transfer_stress",
+        "users": args.users,
+        "transfers": args.transfers,
+        "clients": args.clients,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "results": {
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(args.transfers / elapsed, 1),
+            "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+            "verification": verification,
+            "ok": ok,
+        },
+    }, args.output)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+"""
+Costo de las reglas de velocidad por operación.
+
+- engine: VelocityEngine en proceso, con las reglas de settings, sobre --keys usuarios y
+  tarjetas distintos (µs por chequeo, claves en memoria y claves tras la expiración)
+- shared: la misma operación contra el servidor de contadores (app.commands.counter_server)
+  por socket Unix, levantado en un proceso aparte
+- validators: validate_all_payment_limits con y sin reglas de velocidad, contra SQLite
+
+Uso:
+    python -m benchmarks.velocity [--checks 100000] [--keys 10000] [--shared-checks 5000] [--validator-checks 2000]
+        [--database-url URL] [--output FILE]
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import use_scratch_database, create_schema, seed_users, seed_cards, write_report
+
+
+def _micros(samples: list[int]) -> dict:
+    """p50/p99/media en microsegundos de duraciones en nanosegundos"""
+    cuts = statistics.quantiles(samples, n=100)
+    return {
+        "p50_us": round(cuts[49] / 1000, 2),
+        "p99_us": round(cuts[98] / 1000, 2),
+        "mean_us": round(statistics.fmean(samples) / 1000, 2),
+    }
+
+
+def _timed(calls) -> list[int]:
+    samples = []
+    for call in calls:
+        started = time.perf_counter_ns()
+        call()
+        samples.append(time.perf_counter_ns() - started)
+    return samples
+
+
+def _engine(checks: int, keys: int) -> dict:
+    from app.config import settings
+    from app.services.velocity import PAYMENT, TRANSFER, VelocityEngine
+
+    engine = VelocityEngine(settings.velocity_rules, settings.velocity_buckets, settings.velocity_max_keys)
+    rejected = 0
+
+    def check(i: int):
+        nonlocal rejected
+        subject = random.randrange(keys)
+        if i % 2:
+            outcome = engine.hit(PAYMENT, {"user": subject, "card": subject})
+        else:
+            outcome = engine.hit(TRANSFER, {"user": subject, "receiver": random.randrange(keys)})
+        rejected += outcome is not None
+
+    samples = _timed(lambda i=i: check(i) for i in range(checks))
+    keys_live = len(engine._windows)
+    # Una operación después de la ventana más larga descarta todas las claves inactivas
+    longest = max(rule.window for rule in engine.rules)
+    engine.hit(PAYMENT, {"user": -1}, now=time.monotonic() + longest + 1)
+    return {
+        "checks": checks,
+        **_micros(samples),
+        "rejected": rejected,
+        "keys": keys_live,
+        "keys_after_expiry": len(engine._windows),
+        "evictions": engine.evictions,
+    }
+
+
+def _shared(checks: int, keys: int) -> dict:
+    from app.services.shared_counters import CounterClient
+
+    path = os.path.join(tempfile.mkdtemp(prefix="payments-counters-"), "counters.sock")
+    server = subprocess.Popen([sys.executable, "-m", "app.commands.counter_server", "--socket", path],
+                              stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(path):
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("El servidor de contadores no arrancó")
+            time.sleep(0.05)
+        client = CounterClient(path, timeout=1.0, retry_interval=0)
+        payloads = [
+            {"op": "velocity", "operation": "payment", "subjects": {"user": subject, "card": subject}}
+            for subject in (random.randrange(keys) for _ in range(checks))
+        ]
+        samples = _timed(lambda payload=payload: client.request(payload) for payload in payloads)
+        return {"checks": checks, **_micros(samples), "failures": client.failures}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _validators(checks: int) -> dict:
+    from app.config import settings
+    from app.database import new_session
+    from app.models.card import Card
+    from app.models.user import User
+    from app.services.velocity import velocity_engine
+    from app.services.validators import validate_all_payment_limits
+
+    # Suficientes tarjetas para que ninguna llegue a card_burst durante la medición
+    per_card = settings.velocity_rules.get("card_burst", {}).get("limit", 20) - 1
+    with new_session() as db:
+        cards = seed_cards(db, seed_users(db, checks // per_card + 1))
+        pairs = [(db.get(User, user_id), db.get(Card, card_id)) for user_id, card_id in cards.items()]
+        # Con y sin reglas alternados llamada a llamada, para que el calentamiento no sesgue
+        samples = {False: [], True: []}
+        for i in range(checks * 2):
+            settings.velocity_enabled = enabled = bool(i % 2)
+            started = time.perf_counter_ns()
+            validate_all_payment_limits(*pairs[(i // 2) % len(pairs)], 100, db)
+            samples[enabled].append(time.perf_counter_ns() - started)
+        results = {"without_velocity": _micros(samples[False]), "with_velocity": _micros(samples[True])}
+    results["overhead_us"] = round(results["with_velocity"]["p50_us"] - results["without_velocity"]["p50_us"], 2)
+    results["rejections"] = velocity_engine.rejections
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de reglas de velocidad")
+    parser.add_argument("--checks", type=int, default=100_000, help="Chequeos contra el motor en proceso")
+    parser.add_argument("--keys", type=int, default=10_000, help="Usuarios/tarjetas distintos")
+    parser.add_argument("--shared-checks", type=int, default=5_000, help="Chequeos contra el servidor compartido")
+    parser.add_argument("--validator-checks", type=int, default=2_000, help="Llamadas a validate_all_payment_limits")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    use_scratch_database(args.database_url)
+    from app.database import get_engine
+    create_schema()
+
+    write_report({
+        "benchmark": "velocity",
+        "database": get_engine().url.get_backend_name(),
+        "engine": _engine(args.checks, args.keys),
+        "shared": _shared(args.shared_checks, args.keys),
+        "validators": _validators(args.validator_checks),
+    }, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
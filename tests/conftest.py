@@ -0,0 +1,55 @@
+"""
+Base SQLite temporaria por sesión de pytest (o TEST_DATABASE_URL, que debe ser
+descartable): DATABASE_URL se fija antes de importar la app (settings se lee al
+importar app.config). Los engines se crean en el primer uso (migrate) y el lifespan
+del TestClient los reutiliza; los tests abren sesiones con new_session().
+"""
+import itertools
+import os
+import tempfile
+
+_database = os.path.join(tempfile.mkdtemp(prefix="payments-tests-"), "test.db")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{_database}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+from fastapi.testclient import TestClient
+from app.commands.migrate import main as migrate
+
+_emails = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def client():
+    migrate([])
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """Registra un usuario (con depósito opcional) y retorna (id, headers)"""
+    def make(deposit: float = 0) -> tuple[int, dict]:
+        email = f"user{next(_emails)}@example.com"
+        response = client.post("/users/register", json={"email": email, "name": "Test", "password": "password123"})
+        assert response.status_code == 201, response.text
+        response = client.post("/users/login", json={"email": email, "password": "password123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        if deposit:
+            assert client.post("/users/me/deposit", json={"amount": deposit}, headers=headers).status_code == 200
+        return client.get("/users/me", headers=headers).json()["id"], headers
+    return make
+
+
+@pytest.fixture
+def make_card(client):
+    def make(headers: dict) -> int:
+        response = client.post("/cards/", json={
+            "card_number": "4242424242424242", "card_type": "visa", "expiration_month": 12,
+            "expiration_year": 2030, "holder_name": "Test", "cvv": "123"
+        }, headers=headers)
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+    return make
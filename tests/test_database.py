@@ -0,0 +1,39 @@
+"""
+Engines por proceso: importar o armar la app no crea engines, y un proceso forkeado
+no usa los pools heredados del padre sino engines propios.
+"""
+import os
+import subprocess
+import sys
+from sqlalchemy import text
+from app.database import get_database, new_session
+
+
+def test_create_app_does_not_build_engines():
+    code = (
+        "import app.database as database\n"
+        "from app.main import create_app\n"
+        "create_app()\n"
+        "assert database._database is None\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, env=os.environ.copy())
+
+
+def test_forked_process_builds_its_own_engines(client):
+    parent = get_database()
+    with new_session() as db:
+        db.execute(text("SELECT 1"))
+
+    pid = os.fork()
+    if pid == 0:
+        child = get_database()
+        ok = child is not parent and child.pid == os.getpid() and child.engine is not parent.engine
+        with new_session() as db:
+            ok = ok and db.execute(text("SELECT 1")).scalar() == 1
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert get_database() is parent
+    with new_session() as db:
+        assert db.execute(text("SELECT 1")).scalar() == 1
@@ -0,0 +1,68 @@
+"""
+Group commit: los jobs de un grupo se confirman en una sola transacción, pero cada uno
+corre en su savepoint; el que falla no deja filas, asientos ni invalidaciones pendientes
+y no arrastra al resto del grupo.
+"""
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from app.database import new_session
+from app.models.ledger import LedgerEntry
+from app.models.transfer import Transfer
+from app.models.user import User
+from app.schemas.transfer import TransferCreate
+from app.services.group_commit import GroupCommitter
+from app.services.ledger import USER, account_balance
+from app.services.principal_cache import principal_cache
+from app.services.write_jobs import transfer_write_job
+
+
+def _job(sender_id: int, receiver_id: int, amount: float):
+    return transfer_write_job(sender_id, receiver_id, TransferCreate(receiver_id=receiver_id, amount=amount), None)
+
+
+def _block_and_fail(user_id: int):
+    def job(db):
+        db.get(User, user_id).status = "blocked"
+        db.flush()
+        raise HTTPException(status_code=400, detail="falla a mitad del job")
+    return job
+
+
+def test_failed_job_is_isolated_in_its_savepoint(client, make_user):
+    rich_id, rich_headers = make_user(deposit=50)
+    poor_id, _ = make_user(deposit=1)
+    receiver_id, _ = make_user()
+    # Principal cacheado: una invalidación filtrada del job fallido lo descartaría
+    assert client.get("/cards/", headers=rich_headers).status_code == 200
+    assert principal_cache.get(rich_id) is not None
+
+    committer = GroupCommitter(new_session, window=1.0, max_group_size=4)
+    try:
+        futures = [
+            committer.submit(_job(rich_id, receiver_id, 10)),
+            committer.submit(_job(poor_id, receiver_id, 5)),
+            committer.submit(_block_and_fail(rich_id)),
+            committer.submit(_job(rich_id, receiver_id, 15)),
+        ]
+        assert [future.result().status for future in (futures[0], futures[3])] == ["completed"] * 2
+        for future in futures[1:3]:
+            with pytest.raises(HTTPException) as raised:
+                future.result()
+            assert raised.value.status_code == 400
+    finally:
+        committer.shutdown()
+
+    assert committer.stats()["groups"] == 1
+    assert committer.stats()["fallbacks"] == 0
+    assert principal_cache.get(rich_id) is not None
+    with new_session() as db:
+        assert db.get(User, rich_id).status == "active"
+        assert db.execute(select(func.count()).select_from(Transfer).where(Transfer.sender_id == poor_id)).scalar() == 0
+        assert db.execute(
+            select(func.count()).select_from(LedgerEntry)
+            .where(LedgerEntry.account_type == USER, LedgerEntry.account_id == poor_id)
+        ).scalar() == 1
+        assert account_balance(db, USER, poor_id)["balance"] == 100
+        assert account_balance(db, USER, rich_id)["balance"] == 2500
+        assert account_balance(db, USER, receiver_id)["balance"] == 2500
@@ -0,0 +1,85 @@
+"""
+Idempotency-Key: un reintento con el mismo cuerpo repite la respuesta original sin
+volver a mover dinero; con otro cuerpo se rechaza; un request que falla libera la key.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from app.config import settings
+from app.database import new_session
+from app.models.idempotency_key import IdempotencyKey
+from app.models.transfer import Transfer
+from app.schemas.transfer import TransferCreate
+from app.services.idempotency import IN_PROGRESS, REPLAY_HEADER, request_fingerprint, response_cache
+
+
+def _sent(sender_id: int) -> int:
+    with new_session() as db:
+        return db.execute(select(func.count()).select_from(Transfer).where(Transfer.sender_id == sender_id)).scalar()
+
+
+def test_replay_returns_original_response_once(client, make_user):
+    sender_id, headers = make_user(deposit=50)
+    receiver_id, _ = make_user()
+    request = {"receiver_id": receiver_id, "amount": 10}
+    keyed = {**headers, "Idempotency-Key": "replay-1"}
+
+    first = client.post("/transfers/", json=request, headers=keyed)
+    response_cache.clear()
+    # Sin cache en proceso la respuesta sale de la tabla; la segunda vez, del LRU
+    second = client.post("/transfers/", json=request, headers=keyed)
+    third = client.post("/transfers/", json=request, headers=keyed)
+
+    assert first.status_code == second.status_code == third.status_code == 201
+    assert REPLAY_HEADER not in first.headers
+    assert second.headers[REPLAY_HEADER] == third.headers[REPLAY_HEADER] == "true"
+    assert first.json() == second.json() == third.json()
+    assert _sent(sender_id) == 1
+    assert client.get("/users/me", headers=headers).json()["balance"] == 40
+
+
+def test_same_key_with_another_body_is_rejected(client, make_user):
+    sender_id, headers = make_user(deposit=50)
+    receiver_id, _ = make_user()
+    keyed = {**headers, "Idempotency-Key": "conflict-1"}
+
+    assert client.post("/transfers/", json={"receiver_id": receiver_id, "amount": 10}, headers=keyed).status_code == 201
+    response = client.post("/transfers/", json={"receiver_id": receiver_id, "amount": 11}, headers=keyed)
+
+    assert response.status_code == 422
+    assert _sent(sender_id) == 1
+
+
+def test_failed_request_releases_the_key(client, make_user):
+    sender_id, headers = make_user(deposit=5)
+    receiver_id, _ = make_user()
+    request = {"receiver_id": receiver_id, "amount": 10}
+    keyed = {**headers, "Idempotency-Key": "release-1"}
+
+    assert client.post("/transfers/", json=request, headers=keyed).status_code == 400
+    client.post("/users/me/deposit", json={"amount": 10}, headers=headers)
+    response = client.post("/transfers/", json=request, headers=keyed)
+
+    assert response.status_code == 201
+    assert REPLAY_HEADER not in response.headers
+    assert _sent(sender_id) == 1
+
+
+def test_key_in_progress_answers_conflict(client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_wait_timeout", 0)
+    sender_id, headers = make_user(deposit=50)
+    receiver_id, _ = make_user()
+    request = {"receiver_id": receiver_id, "amount": 10}
+    with new_session() as db:
+        # Otro worker procesando el mismo request
+        db.add(IdempotencyKey(
+            user_id=sender_id, scope="transfers", key="busy-1",
+            request_hash=request_fingerprint(TransferCreate(**request)),
+            status=IN_PROGRESS, expires_at=datetime.utcnow() + timedelta(minutes=1)
+        ))
+        db.commit()
+
+    response = client.post("/transfers/", json=request, headers={**headers, "Idempotency-Key": "busy-1"})
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert _sent(sender_id) == 0
@@ -0,0 +1,124 @@
+"""
+El saldo es el libro mayor: después de transferencias concurrentes cada cuenta suma lo
+mismo en el journal, en account_balance (snapshot + cola) y en GET /users/me; ningún
+saldo queda negativo y el dinero se conserva.
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import DBAPIError
+from app.config import settings
+from app.database import new_session
+from app.models.ledger import LedgerEntry, LedgerSnapshot
+from app.models.user import User
+from app.schemas.transfer import TransferCreate
+from app.services.group_commit import write_and_commit
+from app.services.ledger import (
+    USER, account_balance, has_unopened_accounts, open_accounts, snapshot_account, verify_ledger
+)
+from app.services.write_jobs import transfer_write_job
+
+
+def _journal_sum(db, user_id: int) -> int:
+    return db.execute(
+        select(func.coalesce(func.sum(LedgerEntry.amount), 0))
+        .where(LedgerEntry.account_type == USER, LedgerEntry.account_id == user_id)
+    ).scalar()
+
+
+def _transfer(sender_id: int, receiver_id: int, amount: float):
+    db = new_session()
+    try:
+        job = transfer_write_job(sender_id, receiver_id, TransferCreate(receiver_id=receiver_id, amount=amount), None)
+        write_and_commit(db, job)
+        return 201
+    except HTTPException as exc:
+        return exc.status_code
+    except DBAPIError:
+        # Contención que agotó los reintentos: no debe dejar rastro en el libro mayor
+        return "locked"
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("group_commit", [False, True])
+def test_concurrent_transfers_keep_journal_and_balance_in_sync(client, make_user, monkeypatch, group_commit):
+    monkeypatch.setattr(settings, "group_commit", group_commit)
+    users = [make_user(deposit=50) for _ in range(4)]
+    ids = [user_id for user_id, _ in users]
+    rng = random.Random(7)
+    jobs = [(*rng.sample(ids, 2), rng.choice((5, 12.5, 20))) for _ in range(40)]
+
+    with ThreadPoolExecutor(8) as pool:
+        outcomes = list(pool.map(lambda job: _transfer(*job), jobs))
+    assert 201 in outcomes
+
+    with new_session() as db:
+        balances = {user_id: account_balance(db, USER, user_id)["balance"] for user_id in ids}
+        for user_id in ids:
+            assert _journal_sum(db, user_id) == balances[user_id]
+            assert db.get(User, user_id).balance == 0
+        assert verify_ledger(db) == []
+    assert sum(balances.values()) == 4 * 5000
+    assert min(balances.values()) >= 0
+    for user_id, headers in users:
+        assert client.get("/users/me", headers=headers).json()["balance"] == balances[user_id] / 100
+
+
+def test_concurrent_debits_never_overdraw(client, make_user):
+    sender_id, _ = make_user(deposit=10)
+    receiver_id, _ = make_user()
+
+    with ThreadPoolExecutor(8) as pool:
+        outcomes = list(pool.map(lambda _: _transfer(sender_id, receiver_id, 3), range(8)))
+
+    completed = outcomes.count(201)
+    assert 0 < completed <= 3 and 400 in outcomes
+    with new_session() as db:
+        assert account_balance(db, USER, sender_id)["balance"] == 1000 - 300 * completed
+        assert verify_ledger(db, sender_id) == []
+
+
+def test_snapshot_keeps_balance_and_verify_catches_tampering(client, make_user):
+    sender_id, headers = make_user(deposit=100)
+    receiver_id, _ = make_user()
+    for _ in range(3):
+        assert client.post("/transfers/", json={"receiver_id": receiver_id, "amount": 10}, headers=headers).status_code == 201
+
+    with new_session() as db:
+        written = snapshot_account(db, sender_id)
+        assert written["balance"] == 7000
+        assert client.post("/transfers/", json={"receiver_id": receiver_id, "amount": 5}, headers=headers).status_code == 201
+        current = account_balance(db, USER, sender_id)
+        db.rollback()
+        assert (current["balance"], current["tail"]) == (6500, 1)
+        assert verify_ledger(db, sender_id) == []
+
+        snapshot = LedgerSnapshot.__table__
+        tampered = (snapshot.c.account_type == USER) & (snapshot.c.account_id == sender_id)
+        db.execute(update(snapshot).where(tampered).values(balance=snapshot.c.balance + 1))
+        db.commit()
+        assert [mismatch["type"] for mismatch in verify_ledger(db, sender_id)] == ["snapshot"]
+        db.execute(update(snapshot).where(tampered).values(balance=snapshot.c.balance - 1))
+        db.commit()
+    assert client.get("/users/me", headers=headers).json()["balance"] == 65
+
+
+def test_open_accounts_moves_legacy_balance_into_the_ledger(client, make_user):
+    user_id, headers = make_user(deposit=5)
+    with new_session() as db:
+        # Saldo materializado por la versión anterior: 5 asentados más 12 previos al libro mayor
+        db.execute(update(User).where(User.id == user_id).values(balance=1700))
+        db.commit()
+        assert has_unopened_accounts(db)
+        assert verify_ledger(db, user_id) == [{"type": "unopened", "user_id": user_id, "balance": 1700}]
+
+        assert open_accounts(db) == 1
+        assert open_accounts(db) == 0
+        assert not has_unopened_accounts(db)
+        assert db.get(User, user_id).balance == 0
+        assert account_balance(db, USER, user_id)["balance"] == 1700
+        assert verify_ledger(db) == []
+    assert client.get("/users/me", headers=headers).json()["balance"] == 17
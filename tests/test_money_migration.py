@@ -0,0 +1,75 @@
+"""
+Migración de montos FLOAT a unidades menores: backfill en caliente, filas nuevas
+pendientes hasta la pasada final y reemplazo de columnas en SQLite.
+"""
+from datetime import date
+from sqlalchemy import Float, MetaData, create_engine, inspect, select
+from app.database import Base
+from app.services.money_migration import (
+    MONEY_COLUMNS, add_shadow_columns, backfill_column, finalize, legacy_money_columns, pending_rows
+)
+
+
+def _legacy_engine(path):
+    """Base con el esquema anterior: las columnas de dinero como FLOAT"""
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    for model_table in Base.metadata.sorted_tables:
+        model_table.to_metadata(metadata)
+    for table_name, column_name, _, _ in MONEY_COLUMNS:
+        metadata.tables[table_name].c[column_name].type = Float()
+    metadata.create_all(engine)
+    return engine, metadata
+
+
+def test_backfill_then_finalize_converts_to_minor_units(tmp_path):
+    engine, metadata = _legacy_engine(tmp_path / "legacy.db")
+    users, cards, payments, transfers, windows = (
+        metadata.tables[name] for name in ("users", "cards", "payments", "transfers", "user_spend_windows")
+    )
+    with engine.begin() as conn:
+        conn.execute(users.insert(), [
+            {"id": 1, "email": "a@example.com", "name": "A", "password_hash": "x", "balance": 10.1},
+            {"id": 2, "email": "b@example.com", "name": "B", "password_hash": "x", "balance": 0.0},
+        ])
+        conn.execute(cards.insert().values(
+            id=1, user_id=1, card_number_masked="****4242", card_type="visa",
+            expiration_month=12, expiration_year=2030, holder_name="A"
+        ))
+        conn.execute(payments.insert(), [
+            {"id": 1, "user_id": 1, "card_id": 1, "amount": 12.34, "currency": "USD"},
+            {"id": 2, "user_id": 1, "card_id": 1, "amount": 1500.0, "currency": "JPY"},
+        ])
+        conn.execute(transfers.insert().values(id=1, sender_id=1, receiver_id=2, amount=0.29, currency="USD"))
+        conn.execute(windows.insert().values(id=1, user_id=1, period="day", period_start=date(2024, 1, 1), amount=2.5))
+
+    assert sorted(legacy_money_columns(engine)) == sorted(f"{t}.{c}" for t, c, _, _ in MONEY_COLUMNS)
+    assert pending_rows(engine, "payments.amount") is None
+    assert len(add_shadow_columns(engine)) == len(MONEY_COLUMNS)
+    assert add_shadow_columns(engine) == []
+    assert backfill_column(engine, "payments.amount", batch_size=1) == 2
+    assert pending_rows(engine, "payments.amount") == 0
+
+    with engine.begin() as conn:
+        # Escritura de la app durante la migración (todavía sobre la columna FLOAT)
+        conn.execute(payments.insert().values(id=3, user_id=1, card_id=1, amount=0.07, currency="USD"))
+        # Un saldo que cambia después del backfill se vuelve a copiar al finalizar
+        conn.execute(users.update().where(users.c.id == 2).values(balance=0.29))
+    assert pending_rows(engine, "payments.amount") == 1
+
+    copied = finalize(engine)
+
+    assert copied["payments.amount"] == 1
+    assert legacy_money_columns(engine) == []
+    columns = {info["name"] for info in inspect(engine).get_columns("payments")}
+    assert "amount_minor" not in columns
+    with engine.connect() as conn:
+        assert conn.execute(select(payments.c.id, payments.c.amount).order_by(payments.c.id)).all() == [
+            (1, 1234), (2, 1500), (3, 7)
+        ]
+        assert conn.execute(select(users.c.balance).order_by(users.c.id)).scalars().all() == [1010, 29]
+        assert conn.execute(select(transfers.c.amount)).scalar() == 29
+        assert conn.execute(select(windows.c.amount)).scalar() == 250
+    assert {index["name"] for index in inspect(engine).get_indexes("payments")} >= {
+        "ix_payments_user_created", "ix_payments_user_status_created"
+    }
@@ -0,0 +1,75 @@
+"""
+Paginación por cursor (keyset): recorrer next_cursor devuelve cada fila una sola vez,
+en orden (created_at DESC, id DESC), incluso con created_at repetidos y con el merge
+de enviadas y recibidas.
+"""
+from datetime import datetime, timedelta
+from app.database import new_session
+from app.models.payment import Payment
+from app.models.transfer import Transfer
+
+
+def _walk(client, path: str, headers: dict, limit: int) -> list[dict]:
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get(path, params=params, headers=headers)
+        assert page.status_code == 200, page.text
+        body = page.json()
+        assert len(body["items"]) <= limit
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def _order(items: list[dict]) -> list[tuple]:
+    return [(item["created_at"], item["id"]) for item in items]
+
+
+def test_payment_pages_cover_every_row_once(client, make_user, make_card):
+    user_id, headers = make_user()
+    card_id = make_card(headers)
+    base = datetime(2024, 1, 1)
+    with new_session() as db:
+        # Tres pagos por instante: el desempate por id no debe saltear ni repetir filas
+        db.add_all([
+            Payment(user_id=user_id, card_id=card_id, amount=100 + i, currency="USD", status="approved",
+                    created_at=base + timedelta(minutes=i // 3))
+            for i in range(10)
+        ])
+        db.commit()
+
+    items = _walk(client, "/payments/", headers, limit=4)
+
+    assert len(items) == len({item["id"] for item in items}) == 10
+    assert _order(items) == sorted(_order(items), reverse=True)
+
+
+def test_merged_transfer_pages_cover_sent_and_received(client, make_user):
+    user_id, headers = make_user()
+    other_id, _ = make_user()
+    base = datetime(2024, 1, 1)
+    with new_session() as db:
+        db.add_all([
+            Transfer(sender_id=user_id if i % 3 else other_id, receiver_id=other_id if i % 3 else user_id,
+                     amount=100, currency="USD", status="completed", created_at=base + timedelta(minutes=i // 2))
+            for i in range(9)
+        ])
+        db.commit()
+
+    items = _walk(client, "/transfers/", headers, limit=2)
+    sent = _walk(client, "/transfers/sent", headers, limit=2)
+    received = _walk(client, "/transfers/received", headers, limit=2)
+
+    assert len(items) == len({item["id"] for item in items}) == 9
+    assert _order(items) == sorted(_order(items), reverse=True)
+    assert sorted(item["id"] for item in sent + received) == sorted(item["id"] for item in items)
+    assert len(received) == 3
+
+
+def test_invalid_cursor_is_rejected(client, make_user):
+    _, headers = make_user()
+    response = client.get("/payments/", params={"cursor": "no-es-un-cursor"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor inválido"
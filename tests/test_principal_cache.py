@@ -0,0 +1,43 @@
+"""
+Cache de principals: un cambio de estado confirmado por el ORM invalida el principal
+cacheado; un cambio que se revierte no lo toca.
+"""
+from app.database import new_session
+from app.models.user import User
+from app.services.principal_cache import principal_cache
+
+
+def test_committed_status_change_invalidates_principal(client, make_user):
+    user_id, headers = make_user()
+    assert client.get("/cards/", headers=headers).status_code == 200
+    assert principal_cache.get(user_id) is not None
+
+    with new_session() as db:
+        db.get(User, user_id).status = "blocked"
+        db.flush()
+        # Recolectado en el flush, invalidado recién con el commit
+        assert principal_cache.get(user_id) is not None
+        db.commit()
+
+    assert principal_cache.get(user_id) is None
+    response = client.get("/cards/", headers=headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Usuario blocked. Contacte soporte."
+
+
+def test_rolled_back_change_keeps_principal(client, make_user):
+    user_id, headers = make_user()
+    assert client.get("/cards/", headers=headers).status_code == 200
+    invalidations = principal_cache.stats()["invalidations"]
+
+    with new_session() as db:
+        db.get(User, user_id).status = "blocked"
+        db.flush()
+        db.rollback()
+        # La próxima transacción de la sesión confirma sin arrastrar lo revertido
+        db.get(User, user_id)
+        db.commit()
+
+    assert principal_cache.get(user_id) is not None
+    assert principal_cache.stats()["invalidations"] == invalidations
+    assert client.get("/cards/", headers=headers).status_code == 200
@@ -0,0 +1,205 @@
+"""
+Regresión de planes de consulta: recorre los endpoints de la API, captura cada
+SELECT/UPDATE/DELETE que emiten los routers y ejecuta EXPLAIN QUERY PLAN (SQLite) o
+EXPLAIN (PostgreSQL, MySQL) sobre ella. Falla si alguna consulta recorre una tabla
+completa o, en SQLite, si busca por índice acotando solo el prefijo de igualdad cuando
+la consulta tiene un rango (o un ORDER BY resuelto con un B-tree temporal) sobre la
+columna siguiente del índice: la búsqueda recorre todas las filas del prefijo, que en
+un usuario con mucho historial es casi un recorrido completo.
+
+Con TEST_DATABASE_URL se analiza otra base (descartable: el recorrido crea datos).
+"""
+import re
+import uuid
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from app.database import Base, get_engine
+from app.services.idempotency import response_cache
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+_SQLITE_SEARCH = re.compile(r"^SEARCH (\w+) USING (?:COVERING )?INDEX (\w+) \(([^)]*)\)")
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def _index_columns(conn, index: str) -> list[str]:
+    return [row[2] for row in conn.exec_driver_sql(f"PRAGMA index_info({index})").fetchall()]
+
+
+def _has_range(statement: str, table: str, column: str) -> bool:
+    """La consulta compara `column` por rango, sola o como primer elemento de un row value"""
+    ref = rf"(?<![\w.])(?:{table}\.)?{column}"
+    return bool(
+        re.search(rf"{ref}\s*[<>]", statement)
+        or re.search(rf"{ref}\s+BETWEEN\b", statement, re.IGNORECASE)
+        or re.search(rf"\(\s*{ref}\s*,[^)]*\)\s*[<>]", statement)
+    )
+
+
+def _orders_by(statement: str, table: str, column: str) -> bool:
+    _, _, order_by = statement.upper().rpartition(" ORDER BY ")
+    return bool(order_by) and re.search(rf"(?<![\w.])(?:{table}\.)?{column}\b", order_by, re.IGNORECASE) is not None
+
+
+def _sqlite_prefix_searches(conn, rows: list, statement: str) -> list[str]:
+    """
+    SEARCH que solo acota el prefijo de igualdad del índice cuando la consulta filtra
+    por rango la columna siguiente (o la ordena y SQLite arma un B-tree temporal)
+    """
+    temp_order = any("USE TEMP B-TREE FOR ORDER BY" in row[-1] for row in rows)
+    found = []
+    for row in rows:
+        match = _SQLITE_SEARCH.match(row[-1])
+        if not match:
+            continue
+        table, index, constraints = match.groups()
+        terms = constraints.split(" AND ")
+        if any("<" in term or ">" in term for term in terms):
+            continue
+        columns = _index_columns(conn, index)
+        if len(terms) >= len(columns):
+            continue
+        column = columns[len(terms)]
+        if _has_range(statement, table, column) or (temp_order and _orders_by(statement, table, column)):
+            found.append(f"{table}.{column} ({index})")
+    return found
+
+
+def _plan_problems(conn, dialect: str, statement: str, parameters) -> list[str]:
+    """Tablas del modelo recorridas completas y búsquedas por índice sin el rango (solo SQLite)"""
+    tables = set(Base.metadata.tables)
+    prefix_only = []
+    if dialect == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        matches = [_SQLITE_SCAN.match(row[-1]) for row in rows]
+        scanned = [match.group(1) for match in matches if match]
+        prefix_only = _sqlite_prefix_searches(conn, rows, statement)
+    elif dialect == "postgresql":
+        # Con pocas filas PostgreSQL prefiere Seq Scan aunque exista un índice
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+        scanned = [match.group(1) for row in rows for match in _POSTGRES_SCAN.finditer(row[0])]
+    elif dialect == "mysql":
+        rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().fetchall()
+        scanned = [row["table"] for row in rows if row["type"] == "ALL"]
+    else:
+        pytest.skip(f"Dialecto no soportado: {dialect}")
+    return [f"FULL SCAN {table}" for table in scanned if table in tables] + [
+        f"RANGO SIN ÍNDICE {search}" for search in prefix_only if search.split(".")[0] in tables
+    ]
+
+
+def _exercise_api(client) -> None:
+    """Recorre los endpoints con datos mínimos para que emitan sus consultas"""
+    suffix = uuid.uuid4().hex[:8]
+    tokens = []
+    for name in ("payer", "receiver"):
+        credentials = {"email": f"{name}-{suffix}@example.com", "password": "password123"}
+        client.post("/users/register", json={**credentials, "name": name}).raise_for_status()
+        response = client.post("/users/login", json=credentials)
+        response.raise_for_status()
+        tokens.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+    payer, receiver = tokens
+    receiver_id = client.get("/users/me", headers=receiver).json()["id"]
+
+    client.post("/users/me/deposit", json={"amount": 1000}, headers=payer).raise_for_status()
+    card = client.post("/cards/", headers=payer, json={
+        "card_number": "4111111111111111",
+        "card_type": "visa",
+        "expiration_month": 12,
+        "expiration_year": datetime.utcnow().year + 1,
+        "holder_name": "Payer"
+    })
+    card.raise_for_status()
+    card_id = card.json()["id"]
+
+    steps = [
+        ("post", "/payments/", {"card_id": card_id, "amount": 10}),
+        ("post", "/payments/", {"card_id": card_id, "amount": 10}),
+        ("post", "/payments/batch", {"items": [{"card_id": card_id, "amount": 1}, {"card_id": card_id, "amount": 2}]}),
+        ("post", "/transfers/", {"receiver_id": receiver_id, "amount": 10}),
+        ("post", "/transfers/batch", {"items": [{"receiver_id": receiver_id, "amount": 1}] * 2}),
+        ("get", "/users/me", None),
+        ("get", "/users/me/limits", None),
+        ("get", f"/users/{receiver_id}", None),
+        ("get", "/cards/", None),
+        ("get", f"/cards/{card_id}", None),
+        ("patch", f"/cards/{card_id}/status", {"status": "active"}),
+        ("get", "/payments/", None),
+        ("get", "/payments/?status=approved", None),
+        ("get", "/payments/1", None),
+        ("get", "/transfers/", None),
+        ("get", "/transfers/?status=completed", None),
+        ("get", "/transfers/sent", None),
+        ("get", "/transfers/received", None),
+        ("get", "/transfers/1", None),
+        ("get", "/payments/?created_from=2000-01-01T00:00:00&created_to=2100-01-01T00:00:00", None),
+        ("get", "/transfers/sent?status=completed&created_from=2000-01-01T00:00:00", None),
+        ("get", "/payments/export?status=approved", None),
+        ("get", "/transfers/export?format=csv", None),
+    ]
+    for method, path, body in steps:
+        kwargs = {"headers": payer}
+        if body is not None:
+            kwargs["json"] = body
+        response = getattr(client, method)(path, **kwargs)
+        assert response.status_code < 500, f"{method.upper()} {path}: {response.status_code}"
+
+    # Idempotency-Key: alta de la key y, sin el LRU en proceso, lectura de la respuesta guardada
+    idempotent = {**payer, "Idempotency-Key": f"plan-{suffix}"}
+    for _ in range(2):
+        response_cache.clear()
+        client.post("/transfers/", json={"receiver_id": receiver_id, "amount": 1}, headers=idempotent)
+
+    # Segunda página de cada historial (consultas con cursor)
+    for path in ("/payments/", "/transfers/", "/transfers/sent", "/transfers/received"):
+        cursor = client.get(path, params={"limit": 1}, headers=payer).json()["next_cursor"]
+        if cursor:
+            client.get(path, params={"limit": 1, "cursor": cursor}, headers=payer)
+
+
+@pytest.fixture(scope="module")
+def engine(client):
+    """Engine del primario que usa la app de los tests"""
+    return get_engine()
+
+
+@pytest.fixture(scope="module")
+def captured(client, engine) -> dict:
+    """Sentencias (con sus parámetros) que emiten los endpoints"""
+    statements: dict[str, object] = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.setdefault(statement, parameters)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        _exercise_api(client)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements
+
+
+def test_hot_queries_use_indexes(captured, engine):
+    assert len(captured) > 20
+    problems = []
+    with engine.connect() as conn:
+        for statement, parameters in captured.items():
+            with conn.begin():
+                found = _plan_problems(conn, engine.dialect.name, statement, parameters)
+            if found:
+                problems.append(f"[{'; '.join(found)}] {' '.join(statement.split())}")
+    assert not problems, "\n".join(problems)
+
+
+def test_prefix_only_search_is_flagged(engine):
+    if engine.dialect.name != "sqlite":
+        pytest.skip("Detección de prefijo solo en SQLite")
+    plan = [(0, 0, 0, "SEARCH payments USING INDEX ix_payments_user_created (user_id=?)")]
+    with engine.connect() as conn:
+        ranged = "SELECT id FROM payments WHERE payments.user_id = ? AND (payments.created_at, payments.id) < (?, ?)"
+        assert _sqlite_prefix_searches(conn, plan, ranged) == ["payments.created_at (ix_payments_user_created)"]
+        assert _sqlite_prefix_searches(conn, plan, "SELECT id FROM payments WHERE payments.user_id = ?") == []
+        bound = [(0, 0, 0, "SEARCH payments USING INDEX ix_payments_user_created (user_id=? AND created_at<?)")]
+        assert _sqlite_prefix_searches(conn, bound, ranged) == []
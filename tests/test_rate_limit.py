@@ -0,0 +1,41 @@
+"""
+Headers RateLimit-*: van en toda respuesta permitida, también en las que la ruta arma
+por su cuenta (exportación en streaming, página FastJSONResponse, replay idempotente).
+"""
+from app.services.idempotency import REPLAY_HEADER
+
+
+def _limited(response) -> bool:
+    return all(name in response.headers for name in ("RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Policy"))
+
+
+def test_headers_on_every_kind_of_response(client, make_user):
+    sender_id, headers = make_user(deposit=50)
+    receiver_id, _ = make_user()
+    keyed = {**headers, "Idempotency-Key": "rate-limit-1"}
+    request = {"receiver_id": receiver_id, "amount": 1}
+
+    created = client.post("/transfers/", json=request, headers=keyed)
+    replay = client.post("/transfers/", json=request, headers=keyed)
+    page = client.get("/transfers/", headers=headers)
+    export = client.get("/transfers/export", headers=headers)
+
+    assert replay.headers[REPLAY_HEADER] == "true"
+    for response in (created, replay, page, export):
+        assert response.status_code < 300
+        assert _limited(response), response.request.url
+    assert int(export.headers["RateLimit-Remaining"]) < int(created.headers["RateLimit-Remaining"])
+    assert len(export.headers.get_list("RateLimit-Remaining")) == 1
+
+
+def test_rejected_request_keeps_its_own_headers(client, make_user, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setitem(settings.rate_limit_routes, "GET /cards/", {"capacity": 1, "rate": 0.001})
+    _, headers = make_user()
+    assert client.get("/cards/", headers=headers).status_code == 200
+    response = client.get("/cards/", headers=headers)
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert response.headers.get_list("RateLimit-Remaining") == ["0"]
@@ -0,0 +1,37 @@
+"""
+Contadores de gasto: cada operación suma en el período de su propio created_at, así
+que coinciden con la reconstrucción desde el historial aunque el reloj cruce la medianoche.
+"""
+from datetime import date, datetime
+from app.database import new_session
+from app.models.spend_window import UserSpendWindow
+from app.services import batch_transfers, write_jobs
+from app.services.spend_counters import check_spend_counters
+
+
+class _LastSecondOfJanuary(datetime):
+    @classmethod
+    def utcnow(cls):
+        return datetime(2024, 1, 31, 23, 59, 59, 999999)
+
+
+def test_spend_is_recorded_in_the_period_of_the_row(client, make_user, monkeypatch):
+    monkeypatch.setattr(write_jobs, "datetime", _LastSecondOfJanuary)
+    monkeypatch.setattr(batch_transfers, "datetime", _LastSecondOfJanuary)
+    sender_id, headers = make_user(deposit=100)
+    receiver_id, _ = make_user()
+
+    assert client.post("/transfers/", json={"receiver_id": receiver_id, "amount": 10}, headers=headers).status_code == 201
+    response = client.post("/transfers/batch", json={"items": [
+        {"receiver_id": receiver_id, "amount": 5}, {"receiver_id": receiver_id, "amount": 7}
+    ]}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 2
+
+    with new_session() as db:
+        windows = {
+            (window.period, window.period_start): window.amount
+            for window in db.query(UserSpendWindow).filter(UserSpendWindow.user_id == sender_id)
+        }
+        assert windows == {("day", date(2024, 1, 31)): 2200, ("month", date(2024, 1, 1)): 2200}
+        assert check_spend_counters(db, sender_id) == []
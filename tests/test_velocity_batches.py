@@ -0,0 +1,109 @@
+"""
+Reglas de velocidad en los endpoints batch: cada lote cuenta como una operación
+(payment_batch / transfer_batch), así que un lote grande pasa con la configuración
+por defecto y solo se rechaza con 429 al agotar la ventana de lotes.
+"""
+import sqlite3
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.config import settings
+from app.database import new_session
+from app.models.user import User
+from app.services import batch_transfers, velocity
+from app.services.ledger import lock_accounts
+from app.services.velocity import VelocityEngine
+
+BATCH_RULES = {
+    "card_burst": {"scope": "card", "operation": "payment", "limit": 3, "window": 60},
+    "user_payment_batches": {"scope": "user", "operation": "payment_batch", "limit": 2, "window": 60},
+    "user_transfer_batches": {"scope": "user", "operation": "transfer_batch", "limit": 2, "window": 60},
+}
+
+
+def _engine(monkeypatch, rules: dict) -> VelocityEngine:
+    engine = VelocityEngine(rules, settings.velocity_buckets, max_keys=1000)
+    monkeypatch.setattr(velocity, "velocity_engine", engine)
+    return engine
+
+
+def _receivers(count: int) -> list[int]:
+    with new_session() as db:
+        users = [User(email=f"receiver-{id(db)}-{i}@example.com", name="R", password_hash="x") for i in range(count)]
+        db.add_all(users)
+        db.commit()
+        return [user.id for user in users]
+
+
+def _statuses(response) -> list[int]:
+    return [result["status_code"] for result in response.json()["results"]]
+
+
+def test_large_batches_pass_with_default_rules(client, make_user, make_card, monkeypatch):
+    _engine(monkeypatch, settings.velocity_rules)
+    _, headers = make_user(deposit=5000)
+    card_id = make_card(headers)
+
+    payments = client.post("/payments/batch", json={
+        "items": [{"card_id": card_id, "amount": 1, "description": "batch"} for _ in range(100)]
+    }, headers=headers)
+    assert payments.status_code == 200, payments.text
+    assert set(_statuses(payments)) == {201}
+
+    receivers = _receivers(500)
+    for mode in ("all_or_nothing", "best_effort"):
+        transfers = client.post("/transfers/batch", json={
+            "items": [{"receiver_id": receiver_id, "amount": 0.5} for receiver_id in receivers], "mode": mode
+        }, headers=headers)
+        assert transfers.status_code == 200, transfers.text
+        assert transfers.json()["created"] == len(receivers)
+
+
+def test_payment_batch_rejected_once_window_exhausted(client, make_user, make_card, monkeypatch):
+    engine = _engine(monkeypatch, BATCH_RULES)
+    _, headers = make_user()
+    card_id = make_card(headers)
+    batch = {"items": [{"card_id": card_id, "amount": 1, "description": "batch"} for _ in range(5)]}
+
+    for _ in range(2):
+        response = client.post("/payments/batch", json=batch, headers=headers)
+        assert _statuses(response) == [201] * 5
+
+    response = client.post("/payments/batch", json=batch, headers=headers)
+    assert response.status_code == 429
+    assert "user_payment_batches" in response.json()["detail"]
+    assert "Retry-After" in response.headers
+    # Los ítems de un lote no consumen la ventana de la tarjeta
+    assert engine.stats()["hits"] == 2
+
+
+def test_transfer_batch_rejected_once_window_exhausted(client, make_user, monkeypatch):
+    _engine(monkeypatch, BATCH_RULES)
+    _, headers = make_user(deposit=100)
+    receiver_id, _ = make_user()
+    batch = {"items": [{"receiver_id": receiver_id, "amount": 1} for _ in range(5)], "mode": "best_effort"}
+
+    for _ in range(2):
+        assert client.post("/transfers/batch", json=batch, headers=headers).json()["created"] == 5
+
+    response = client.post("/transfers/batch", json=batch, headers=headers)
+    assert response.status_code == 429
+    assert client.get("/users/me", headers=headers).json()["balance"] == pytest.approx(90)
+
+
+def test_retried_transfer_batch_counts_once(client, make_user, monkeypatch):
+    engine = _engine(monkeypatch, BATCH_RULES)
+    _, headers = make_user(deposit=100)
+    receiver_id, _ = make_user()
+    calls = []
+
+    def locked_once(db, debit_ids=(), credit_ids=()):
+        calls.append(debit_ids)
+        if len(calls) == 1:
+            raise OperationalError("SELECT users", {}, sqlite3.OperationalError("database is locked"))
+        return lock_accounts(db, debit_ids, credit_ids)
+
+    monkeypatch.setattr(batch_transfers, "lock_accounts", locked_once)
+    batch = {"items": [{"receiver_id": receiver_id, "amount": 1}], "mode": "all_or_nothing"}
+    assert client.post("/transfers/batch", json=batch, headers=headers).json()["created"] == 1
+    assert len(calls) == 2
+    assert engine.stats()["hits"] == 1